@@ -39,7 +39,8 @@ def interactive_cli(config, action):
     if action == Action.BUILD:
         database = config_dict["build"]["database"]
         folder = Path(config_dict["build"]["folder"])
-        build_database(folder, database)
+        manifest = config_dict["build"].get("manifest", None)
+        build_database(folder, database, Path(manifest) if manifest is not None else None)
     elif action == Action.LAUNCH:
         database = config_dict["launch"]["database"]
         launch_app(database)
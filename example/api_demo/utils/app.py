@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Any, Dict, Generator
+from typing import Any, AsyncGenerator, Dict
 
 import uvicorn
 from fastapi import FastAPI, status
@@ -28,12 +28,12 @@ def launch_app(database: str) -> None:
     )
     engine = ChatEngine(database)
 
-    def stream_response(input_kwargs: Dict[str, Any]) -> Generator[str, None, None]:
+    async def stream_response(input_kwargs: Dict[str, Any]) -> AsyncGenerator[str, None]:
         choice_data = ChatCompletionResponseStreamChoice(delta=ChatCompletionMessage(role=Role.ASSISTANT, content=""))
         chunk = ChatCompletionResponse(choices=[choice_data])
         yield json.dumps(chunk.model_dump(exclude_unset=True), ensure_ascii=False)
 
-        for new_token in engine.stream_chat(**input_kwargs):
+        async for new_token in engine.astream_chat(**input_kwargs):
             choice_data = ChatCompletionResponseStreamChoice(delta=ChatCompletionMessage(content=new_token))
             chunk = ChatCompletionResponse(choices=[choice_data])
             yield json.dumps(chunk.model_dump(exclude_unset=True), ensure_ascii=False)
@@ -58,7 +58,7 @@ def launch_app(database: str) -> None:
             return EventSourceResponse(stream_response(input_kwargs), media_type="text/event-stream")
 
         response = ""
-        for new_token in engine.stream_chat(**input_kwargs):
+        async for new_token in engine.astream_chat(**input_kwargs):
             response += new_token
 
         choice_data = ChatCompletionResponseChoice(
@@ -1,10 +1,10 @@
-from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from tqdm import tqdm
 
-from cardinal import AutoStorage, AutoVectorStore, CJKTextSplitter, get_logger
+from cardinal import AutoStorage, AutoVectorStore, CJKTextSplitter, Ingestor, get_logger
+from cardinal.ingestion import Deduplicator, Manifest
 
 from .protocol import DocIndex, Document
 
@@ -13,7 +13,13 @@ logger = get_logger(__name__)
 BATCH_SIZE = 1000
 
 
-def build_database(folder: Path, database: str, verbose: Optional[bool] = True) -> None:
+def _build_document(text: str, index: DocIndex) -> Tuple[str, Document]:
+    return index.doc_id, Document(doc_id=index.doc_id, content=text)
+
+
+def build_database(
+    folder: Path, database: str, manifest: Optional[Path] = None, verbose: Optional[bool] = True
+) -> None:
     vectorstore = AutoVectorStore[DocIndex](name=database)
     storage = AutoStorage[Document](name=database)
     splitter = CJKTextSplitter()
@@ -23,34 +29,16 @@ def build_database(folder: Path, database: str, verbose: Optional[bool] = True)
         if path.is_file() and path.suffix == ".txt":
             input_files.append(path)
 
-    file_contents: List[str] = []
-    for file_path in tqdm(input_files, desc="Extract content", disable=(not verbose)):
-        if file_path.suffix == ".txt":
-            with open(file_path, "r", encoding="utf-8") as f:
-                file_contents.append(f.read())
-        else:
-            raise NotImplementedError
-
-    text_chunks = []
-    with Pool(processes=32) as pool:
-        for chunks in tqdm(
-            pool.imap_unordered(splitter.split, file_contents),
-            total=len(file_contents),
-            desc="Split content",
-            disable=(not verbose),
-        ):
-            text_chunks.extend(chunks)
-
-    for i in tqdm(range(0, len(text_chunks), BATCH_SIZE), desc="Build index", disable=(not verbose)):
-        batch_text = text_chunks[i : i + BATCH_SIZE]
-        batch_index, batch_ids, batch_document = [], [], []
-        for text in batch_text:
-            index = DocIndex()
-            document = Document(doc_id=index.doc_id, content=text)
-            batch_ids.append(index.doc_id)
-            batch_index.append(index)
-            batch_document.append(document)
-        vectorstore.insert(batch_text, batch_index)
-        storage.insert(batch_ids, batch_document)
-
+    ingestor = Ingestor[DocIndex](
+        vectorstore,
+        build_index=lambda text: DocIndex(),
+        storage=storage,
+        build_document=_build_document,
+        splitter=splitter,
+        batch_size=BATCH_SIZE,
+        num_split_workers=32,
+        manifest=Manifest(manifest) if manifest is not None else None,  # resumes the previous build if given
+        deduplicator=Deduplicator(),
+    )
+    ingestor.ingest(tqdm(input_files, desc="Build index", disable=(not verbose)))
     logger.info("Build completed.")
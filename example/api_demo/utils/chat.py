@@ -1,6 +1,8 @@
-from typing import TYPE_CHECKING, Generator, Sequence
+import asyncio
+import os
+from typing import TYPE_CHECKING, AsyncGenerator, Generator, Sequence
 
-from cardinal import AssistantMessage, AutoStorage, BaseCollector, ChatOpenAI, DenseRetriever, HumanMessage, Template
+from cardinal import AssistantMessage, AutoStorage, BaseCollector, ChatOpenAI, ContextPacker, DenseRetriever, Template
 
 from .protocol import DocIndex, Document, History
 
@@ -11,26 +13,35 @@ if TYPE_CHECKING:
 
 class ChatEngine:
     def __init__(self, database: str) -> None:
-        self._window_size = 6
         self._chat_model = ChatOpenAI()
+        self._packer = ContextPacker(max_tokens=int(os.environ.get("MAX_PROMPT_TOKENS", "3072")))
         self._collector = BaseCollector[History](storage_name=database)
         self._retriever = DenseRetriever[DocIndex](vectorstore_name=database, threshold=1.0, verbose=True)
         self._storage = AutoStorage[Document](name=database)
         self._kbqa_template = Template("充分理解以下事实描述：{context}\n\n回答下面的问题：{query}")
 
     def stream_chat(self, messages: Sequence["BaseMessage"], **kwargs) -> Generator[str, None, None]:
-        messages = messages[-(self._window_size * 2 + 1) :]
         query = messages[-1].content
-
         indexes = self._retriever.retrieve(query, top_k=2)
         documents = [self._storage.query(index.doc_id).content for index in indexes]
-        if len(documents):
-            query = self._kbqa_template.apply(context="\n".join(documents), query=query)
-
-        augmented_messages = messages[:-1] + [HumanMessage(content=query)]
+        augmented_messages = self._packer.pack(messages, documents, self._kbqa_template).messages
         response = ""
         for new_token in self._chat_model.stream_chat(augmented_messages, **kwargs):
             yield new_token
             response += new_token
 
         self._collector.collect(History(messages=(augmented_messages + [AssistantMessage(content=response)])))
+
+    async def astream_chat(self, messages: Sequence["BaseMessage"], **kwargs) -> AsyncGenerator[str, None]:
+        query = messages[-1].content
+        indexes = await self._retriever.aretrieve(query, top_k=2)
+        documents = await asyncio.gather(*[self._storage.aquery(index.doc_id) for index in indexes])
+        contents = [document.content for document in documents]
+        augmented_messages = self._packer.pack(messages, contents, self._kbqa_template).messages
+        response = ""
+        async for new_token in self._chat_model.astream_chat(augmented_messages, **kwargs):
+            yield new_token
+            response += new_token
+
+        history = History(messages=(augmented_messages + [AssistantMessage(content=response)]))
+        await asyncio.to_thread(self._collector.collect, history)
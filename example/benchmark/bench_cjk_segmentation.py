@@ -0,0 +1,55 @@
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import click
+from bench_splitter import LegacyCJKTextSplitter
+
+from cardinal import CJKTextSplitter
+
+
+def _timeit(segment: Callable[[str], List[str]], texts: List[str]) -> float:
+    start_time = time.perf_counter()
+    for text in texts:
+        segment(text)
+    return time.perf_counter() - start_time
+
+
+@click.command()
+@click.option("--folder", required=True, type=click.Path(exists=True, file_okay=False), help="Folder of .txt files.")
+@click.option("--repeat", default=1, help="Concatenate each file with itself to build larger documents.")
+def main(folder: str, repeat: int):
+    texts = []
+    for path in sorted(Path(folder).rglob("*.txt")):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append("\n\n".join([f.read()] * repeat))
+
+    legacy = LegacyCJKTextSplitter()
+    current = CJKTextSplitter()
+
+    def legacy_segment(text: str) -> List[str]:  # five regex passes, then the paragraphs split into lines
+        paragraphs = legacy._legacy_split_text(legacy._legacy_normalize(text).rstrip(), "\n\n")
+        return [line for paragraph in paragraphs for line in legacy._legacy_split_text(paragraph, "\n")]
+
+    def current_segment(text: str) -> List[str]:  # the normalization and the scan, then the segments split into lines
+        text = current._normalize(text)
+        return [
+            text[line_start:line_end]
+            for start, end in current._split_text(text, 0, len(text), 0)
+            for line_start, line_end in current._split_text(text, start, end, 1)
+        ]
+
+    legacy_time = _timeit(legacy_segment, texts)
+    current_time = _timeit(current_segment, texts)
+    num_legacy = sum(len(legacy_segment(text)) for text in texts)
+    num_current = sum(len(current_segment(text)) for text in texts)
+
+    num_mb = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+    print("documents: {}, size: {:.2f} MB".format(len(texts), num_mb))
+    print("legacy:  {:.3f}s ({:.2f} MB/s), {} segments".format(legacy_time, num_mb / legacy_time, num_legacy))
+    print("current: {:.3f}s ({:.2f} MB/s), {} segments".format(current_time, num_mb / current_time, num_current))
+    print("speedup: {:.2f}x".format(legacy_time / current_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import time
+from typing import Callable, List
+
+import click
+from pydantic import BaseModel
+
+from cardinal.utils.serialize_utils import deserialize, get_serializer
+
+
+class Document(BaseModel):
+    doc_id: str
+    title: str
+    content: str
+    index: int
+    score: float
+
+
+def _timeit(func: Callable[[], List], repeat: int) -> float:
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start_time) / repeat
+
+
+@click.command()
+@click.option("--num_docs", default=10000, help="Number of documents.")
+@click.option("--content_size", default=300, help="Characters of each document.")
+@click.option("--repeat", default=5, help="Number of runs to average.")
+def main(num_docs: int, content_size: int, repeat: int):
+    docs = [
+        Document(
+            doc_id="doc{}".format(i),
+            title="title {}".format(i),
+            content=("检索增强生成 retrieval augmented generation " * content_size)[:content_size],
+            index=i,
+            score=i / num_docs,
+        )
+        for i in range(num_docs)
+    ]
+    print("documents: {}, content size: {}".format(num_docs, content_size))
+    for name in ["pickle", "json"]:
+        serializer = get_serializer(name)
+        payloads = [serializer.dumps(doc) for doc in docs]
+        assert [deserialize(payload) for payload in payloads] == docs
+        encode_time = _timeit(lambda: [serializer.dumps(doc) for doc in docs], repeat)
+        decode_time = _timeit(lambda: [deserialize(payload) for payload in payloads], repeat)
+        num_bytes = sum(len(payload.encode("utf-8")) for payload in payloads) / num_docs
+        print(
+            "{:<7} encode: {:.2f} us/doc, decode: {:.2f} us/doc, size: {:.0f} bytes/doc".format(
+                name, encode_time / num_docs * 1e6, decode_time / num_docs * 1e6, num_bytes
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import re
+import time
+from pathlib import Path
+from typing import List
+
+import click
+
+from cardinal import CJKTextSplitter
+
+
+class LegacyCJKTextSplitter(CJKTextSplitter):
+    r"""
+    The splitter before incremental token accounting and single-pass CJK segmentation, kept as the baseline.
+    """
+
+    @staticmethod
+    def _legacy_normalize(text: str) -> str:
+        text = re.sub(r"\n{3,}", r"\n", text)
+        text = re.sub(r" {3,}", r" ", text)
+        text = re.sub(r"([。！？；])([^’”])", r"\1\n\2", text)
+        text = re.sub(r"(\…{2})([^’”])", r"\1\n\2", text)
+        text = re.sub(r"([。！？；][’”]{0,2})([^，。！？；])", r"\1\n\2", text)
+        return text
+
+    @staticmethod
+    def _legacy_split_text(text: str, separator: str) -> List[str]:
+        splits = text.split(separator) if separator else list(text)
+        return [split for split in splits if split]
+
+    @staticmethod
+    def _join_docs(docs: List[str], separator: str) -> str:
+        return separator.join(docs).strip()
+
+    def split(self, text: str) -> List[str]:
+        return self._split(self._legacy_normalize(text).rstrip(), self._separators)
+
+    def _merge(self, splits: List[str], separator: str) -> List[str]:
+        merged_docs = []
+        inprocess_docs = []
+        for split in splits:
+            text = self._join_docs(inprocess_docs, separator)
+            if self._count(text + split) > self._chunk_size:
+                if len(inprocess_docs) > 0:
+                    merged_docs.append(text)
+
+                    if self._chunk_overlap == 0:
+                        inprocess_docs = []
+                    else:
+                        while self._count(text) > self._chunk_overlap:
+                            inprocess_docs.pop(0)
+                            text = self._join_docs(inprocess_docs, separator)
+
+            inprocess_docs.append(split)
+
+        if len(inprocess_docs) > 0:
+            text = self._join_docs(inprocess_docs, separator)
+            merged_docs.append(text)
+
+        return merged_docs
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        separators = separators[:]
+        separator = separators.pop(0)
+
+        splits = self._legacy_split_text(text, separator)
+        final_chunks = []
+        good_splits = []
+        for split in splits:
+            if self._count(split) < self._chunk_size:
+                good_splits.append(split)
+            else:
+                if good_splits:
+                    final_chunks.extend(self._merge(good_splits, separator))
+                    good_splits = []
+                if not separators:
+                    final_chunks.append(split)
+                else:
+                    final_chunks.extend(self._split(split, separators))
+
+        if good_splits:
+            final_chunks.extend(self._merge(good_splits, separator))
+        return final_chunks
+
+
+def _squeeze(text: str) -> str:  # the legacy CJK splitter inserts line breaks into the chunks
+    return "".join(text.split())
+
+
+def _timeit(splitter: CJKTextSplitter, texts: List[str]) -> float:
+    start_time = time.perf_counter()
+    for text in texts:
+        splitter.split(text)
+    return time.perf_counter() - start_time
+
+
+@click.command()
+@click.option("--folder", required=True, type=click.Path(exists=True, file_okay=False), help="Folder of .txt files.")
+@click.option("--repeat", default=1, help="Concatenate each file with itself to build larger documents.")
+@click.option("--chunk_size", default=300)
+@click.option("--chunk_overlap", default=100)
+def main(folder: str, repeat: int, chunk_size: int, chunk_overlap: int):
+    texts = []
+    for path in sorted(Path(folder).rglob("*.txt")):
+        with open(path, "r", encoding="utf-8") as f:
+            texts.append("\n\n".join([f.read()] * repeat))
+
+    legacy = LegacyCJKTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    current = CJKTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    approximate = CJKTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, approximate=True)
+    legacy_time = _timeit(legacy, texts)
+    current_time = _timeit(current, texts)
+    approximate_time = _timeit(approximate, texts)
+
+    num_chunks, num_same, legacy_max, current_max, approximate_max = 0, 0, 0, 0, 0
+    for text in texts:
+        legacy_chunks, current_chunks = legacy.split(text), current.split(text)
+        num_chunks += max(len(legacy_chunks), len(current_chunks))
+        num_same += len(set(map(_squeeze, legacy_chunks)) & set(map(_squeeze, current_chunks)))
+        legacy_max = max([legacy_max] + [legacy._count(chunk) for chunk in legacy_chunks])
+        current_max = max([current_max] + [current._count(chunk) for chunk in current_chunks])
+        approximate_max = max([approximate_max] + [current._count(chunk) for chunk in approximate.split(text)])
+
+    num_chars = sum(len(text) for text in texts)
+    print("documents: {}, characters: {}".format(len(texts), num_chars))
+    print("legacy:  {:.3f}s ({:.0f} chars/s), max chunk size {}".format(legacy_time, num_chars / legacy_time, legacy_max))
+    print("current: {:.3f}s ({:.0f} chars/s), max chunk size {}".format(current_time, num_chars / current_time, current_max))
+    print(
+        "approximate: {:.3f}s ({:.0f} chars/s), max chunk size {}, estimator error max {:.2%} mean {:.2%}".format(
+            approximate_time,
+            num_chars / approximate_time,
+            approximate_max,
+            approximate._estimator.error,
+            approximate._estimator.mean_error,
+        )
+    )
+    print("speedup: {:.2f}x, identical chunks (ignoring whitespace): {}/{}".format(legacy_time / current_time, num_same, num_chunks))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,12 +11,13 @@ from .common import (
     Template,
 )
 from .logging import get_logger
-from .model import ChatOpenAI, EmbedOpenAI, TokenCounter
+from .model import AutoEmbedder, ChatOpenAI, ContextPacker, EmbedLocal, EmbedOpenAI, TokenCounter, TokenEstimator
 from .retriever import DenseRetriever, HybridRetriever, SparseRetriever, MultiRetriever
 from .splitter import CJKTextSplitter, TextSplitter
 from .storage import AutoStorage
 from .graph import AutoGraphStorage
 from .vectorstore import AutoVectorStore, AutoCondition
+from .ingestion import Ingestor
 
 
 __all__ = [
@@ -31,9 +32,13 @@ __all__ = [
     "SystemMessage",
     "Template",
     "get_logger",
+    "AutoEmbedder",
     "ChatOpenAI",
+    "ContextPacker",
+    "EmbedLocal",
     "EmbedOpenAI",
     "TokenCounter",
+    "TokenEstimator",
     "DenseRetriever",
     "MultiRetriever",
     "HybridRetriever",
@@ -44,5 +49,6 @@ __all__ = [
     "AutoGraphStorage",
     "AutoVectorStore",
     "AutoCondition",
+    "Ingestor",
 ]
 __version__ = "0.4.0"
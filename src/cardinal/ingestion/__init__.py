@@ -0,0 +1,7 @@
+from .dedup import Deduplicator, DedupStats
+from .ingestor import Ingestor
+from .manifest import Manifest
+from .pipeline import Pipeline, Stage, StageStats
+
+
+__all__ = ["Deduplicator", "DedupStats", "Ingestor", "Manifest", "Pipeline", "Stage", "StageStats"]
@@ -0,0 +1,190 @@
+import threading
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..utils.cache_utils import hash_text
+from ..utils.import_utils import is_numpy_available
+
+
+if is_numpy_available():
+    import numpy as np
+
+
+@dataclass
+class DedupStats:
+    num_chunks: int = 0  # the number of chunks seen
+    num_exact: int = 0  # the number of exact duplicates (after normalization)
+    num_near: int = 0  # the number of near duplicates
+    num_chars: int = 0  # the number of characters seen
+    saved_chars: int = 0  # the number of characters dropped, i.e. not embedded
+
+    def __str__(self) -> str:
+        num_dropped = self.num_exact + self.num_near
+        return "dropped {}/{} chunks ({} exact, {} near), saved {:.2%} of characters".format(
+            num_dropped, self.num_chunks, self.num_exact, self.num_near, self.saved_chars / max(self.num_chars, 1)
+        )
+
+
+def normalize_text(text: str) -> str:
+    r"""
+    Normalizes the text for deduplication: NFKC, case folding and collapsing the whitespaces.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class Deduplicator:
+    r"""
+    Detects the duplicated chunks by the hash of the normalized text, and optionally the near duplicates
+    by MinHash with locality-sensitive hashing (LSH) on the character shingles.
+
+    The index is dumped as the (hash, signature) entries of the kept chunks, and loaded by a deduplicator
+    with the same parameters, e.g. to resume an ingestion.
+    """
+
+    def __init__(
+        self,
+        near_duplicate: Optional[bool] = False,
+        threshold: Optional[float] = 0.85,
+        num_perm: Optional[int] = 128,
+        shingle_size: Optional[int] = 5,
+        seed: Optional[int] = 42,
+    ) -> None:
+        r"""
+        Initializes a deduplicator.
+
+        Args:
+            near_duplicate: whether to detect the near duplicates, requires numpy.
+            threshold: the estimated Jaccard similarity of the shingles above which the chunks are near duplicates.
+            num_perm: the number of permutations of MinHash.
+            shingle_size: the number of characters of each shingle.
+            seed: the random seed of the permutations.
+        """
+        if near_duplicate and not is_numpy_available():
+            raise ImportError("Please install numpy for near-duplicate detection.")
+
+        self._near_duplicate = near_duplicate
+        self._threshold = threshold
+        self._shingle_size = shingle_size
+        self._lock = threading.Lock()
+        self._seen: Set[bytes] = set()
+        self._stats = DedupStats()
+        if near_duplicate:
+            rng = np.random.RandomState(seed)
+            self._prime = np.uint64((1 << 61) - 1)
+            self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+            self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+            self._num_bands, self._num_rows = self._optimal_bands(threshold, num_perm)
+            self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(self._num_bands)]
+            self._signatures: List["np.ndarray"] = []
+
+    @staticmethod
+    def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        r"""
+        Chooses the bands and rows of LSH whose S-curve crosses 1/2 closest to the threshold.
+        """
+        candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+        return min(candidates, key=lambda band_rows: abs((1 / band_rows[0]) ** (1 / band_rows[1]) - threshold))
+
+    def _signature(self, text: str) -> "np.ndarray":
+        size = self._shingle_size
+        shingles = {text[i : i + size] for i in range(max(len(text) - size + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % self._prime  # 32-bit operands, thus no overflow
+        return (permuted & np.uint64(0xFFFFFFFF)).min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: "np.ndarray") -> List[bytes]:
+        rows = self._num_rows
+        return [signature[i * rows : (i + 1) * rows].tobytes() for i in range(self._num_bands)]
+
+    def _index(self, signature: "np.ndarray", keys: List[bytes]) -> None:
+        for bucket, key in zip(self._buckets, keys):
+            bucket[key].append(len(self._signatures))
+
+        self._signatures.append(signature)
+
+    def _is_near_duplicate(self, text: str) -> bool:
+        signature = self._signature(text)
+        keys = self._band_keys(signature)
+        candidates = set()
+        for bucket, key in zip(self._buckets, keys):
+            candidates.update(bucket.get(key, ()))
+
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self._threshold:
+                return True
+
+        self._index(signature, keys)
+        return False
+
+    def add(self, text: str) -> bool:
+        r"""
+        Checks the chunk against the chunks added before and adds it if it is new.
+
+        Args:
+            text: the chunk text.
+
+        Returns:
+            is_new: False if the chunk is a duplicate and should be dropped.
+        """
+        normalized = normalize_text(text)
+        key = hash_text(normalized)
+        with self._lock:
+            self._stats.num_chunks += 1
+            self._stats.num_chars += len(text)
+            if key in self._seen:
+                self._stats.num_exact += 1
+                self._stats.saved_chars += len(text)
+                return False
+
+            if self._near_duplicate and self._is_near_duplicate(normalized):
+                self._stats.num_near += 1
+                self._stats.saved_chars += len(text)
+                return False
+
+            self._seen.add(key)
+            return True
+
+    def dump_entries(self, texts: Sequence[str]) -> List[Tuple[bytes, Optional[bytes]]]:
+        r"""
+        Returns the index entries of the kept chunks.
+
+        Args:
+            texts: the chunk texts that were added as new.
+
+        Returns:
+            entries: the (hash, MinHash signature) of each chunk, the signature is None without near duplicates.
+        """
+        entries = []
+        for text in texts:
+            normalized = normalize_text(text)
+            signature = self._signature(normalized).tobytes() if self._near_duplicate else None
+            entries.append((hash_text(normalized), signature))
+
+        return entries
+
+    def load_entries(self, entries: Iterable[Tuple[bytes, Optional[bytes]]]) -> None:
+        r"""
+        Loads the index entries dumped before, the loaded chunks are not counted in the statistics.
+
+        Args:
+            entries: the (hash, MinHash signature) of the kept chunks.
+        """
+        with self._lock:
+            for key, signature in entries:
+                if key in self._seen:
+                    continue
+
+                self._seen.add(key)
+                if self._near_duplicate and signature is not None:
+                    signature = np.frombuffer(signature, dtype=np.uint32)
+                    if len(signature) != len(self._a):
+                        raise ValueError("The signatures were dumped with another number of permutations.")
+
+                    self._index(signature, self._band_keys(signature))
+
+    def stats(self) -> DedupStats:
+        with self._lock:
+            return DedupStats(**self._stats.__dict__)
@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Generator, Generic, Iterable, List, Optional, Sequence, Tuple, Union
+
+from pydantic import BaseModel
+
+from ..logging import get_logger
+from ..model import AutoEmbedder, Embedder
+from ..splitter import CJKTextSplitter, TextSplitter
+from ..storage.schema import Storage
+from ..utils.cache_utils import hash_text
+from ..vectorstore.schema import T, VectorStore
+from .dedup import Deduplicator
+from .manifest import Manifest, hash_file
+from .pipeline import Pipeline, Stage, StageStats
+
+
+logger = get_logger(__name__)
+
+
+Entry = Optional[Tuple[bytes, bytes]]  # the (file key, chunk key) recorded in the manifest
+Chunk = Tuple[str, Entry]
+Batch = Tuple[List[Chunk], Sequence[Sequence[float]]]  # (chunks, embeddings as vectors or a matrix)
+
+
+def _split_file(splitter: TextSplitter, path: Union[str, os.PathLike]) -> List[str]:
+    return list(splitter.split_file(path))
+
+
+def _chunk_keys(texts: Sequence[str]) -> List[bytes]:
+    r"""
+    Returns the manifest keys of the chunks of a file, a repeated chunk is keyed by its occurrence, thus a dropped
+    repeat is never recorded under the key of its first occurrence, which may not be written yet.
+    """
+    counts: Dict[str, int] = defaultdict(int)
+    keys = []
+    for text in texts:
+        keys.append(hash_text(text) if counts[text] == 0 else hash_text("{}\0{}".format(counts[text], text)))
+        counts[text] += 1
+
+    return keys
+
+
+class Ingestor(Generic[T]):
+    r"""
+    Ingests text files into the vector store (and the storage) with a pipeline of split, embed and write stages.
+
+    The files are read and split in worker processes, the batches of chunks are embedded in threads, and the
+    embedded batches are written while the next ones are being split and embedded.
+
+    With a manifest, the written chunks are checkpointed after each batch, and a re-run skips the files
+    and chunks already written, thus only the remaining work is embedded again. With a deduplicator,
+    the duplicated chunks are dropped before embedding, and with both, the index of the deduplicator is
+    checkpointed with the written chunks, thus a re-run still drops the duplicates of the chunks written before.
+    """
+
+    def __init__(
+        self,
+        vectorstore: VectorStore[T],
+        build_index: Callable[[str], T],
+        storage: Optional[Storage] = None,
+        build_document: Optional[Callable[[str, T], Tuple[str, BaseModel]]] = None,
+        splitter: Optional[TextSplitter] = None,
+        embedder: Optional[Embedder] = None,
+        batch_size: Optional[int] = 1000,
+        num_split_workers: Optional[int] = 4,
+        num_embed_workers: Optional[int] = 2,
+        queue_size: Optional[int] = 8,
+        manifest: Optional[Manifest] = None,
+        deduplicator: Optional[Deduplicator] = None,
+    ) -> None:
+        r"""
+        Initializes an ingestor.
+
+        Args:
+            vectorstore: the vector store to write the embeddings into.
+            build_index: the function building the vector store data of a chunk.
+            storage: the storage to write the documents into, optional.
+            build_document: the function building the (key, document) of a chunk and its index, required with storage.
+            splitter: the text splitter, defaults to the CJK text splitter.
+            embedder: the embedding model, defaults to the one selected by the EMBEDDER environment variable.
+            batch_size: the number of chunks embedded and written at once.
+            num_split_workers: the number of processes splitting the files.
+            num_embed_workers: the number of batches being embedded concurrently.
+            queue_size: the number of items buffered between two stages.
+            manifest: the manifest of the written files and chunks for resuming, optional.
+            deduplicator: the deduplicator dropping the duplicated chunks, optional.
+        """
+        if storage is not None and build_document is None:
+            raise ValueError("Document builder is required for storage.")
+
+        self._vectorstore = vectorstore
+        self._build_index = build_index
+        self._storage = storage
+        self._build_document = build_document
+        self._splitter = splitter if splitter is not None else CJKTextSplitter()
+        self._embedder = embedder if embedder is not None else AutoEmbedder()
+        self._batch_size = batch_size
+        self._num_split_workers = num_split_workers
+        self._num_embed_workers = num_embed_workers
+        self._queue_size = queue_size
+        self._manifest = manifest
+        self._deduplicator = deduplicator
+
+    def _dedup(self, chunks: List[Chunk]) -> List[List[Chunk]]:
+        kept_chunks, dropped_entries = [], []
+        for text, entry in chunks:
+            if self._deduplicator.add(text):
+                kept_chunks.append((text, entry))
+            elif entry is not None:
+                dropped_entries.append(entry)
+
+        if self._manifest is not None:  # the dropped chunks count as written
+            self._manifest.commit(dropped_entries)
+
+        return [kept_chunks]
+
+    def _embed(self, chunks: List[Chunk]) -> List[Batch]:
+        return [(chunks, self._embedder.batch_embed([text for text, _ in chunks]))]
+
+    def _write(self, batch: Batch) -> None:
+        chunks, embeddings = batch
+        texts = [text for text, _ in chunks]
+        indexes = [self._build_index(text) for text in texts]
+        self._vectorstore.insert(texts, indexes, embeddings)
+        if self._storage is not None:
+            keys, documents = zip(*[self._build_document(text, index) for text, index in zip(texts, indexes)])
+            self._storage.insert(keys, documents)
+
+        if self._manifest is not None:  # checkpoint after the batch is written
+            dedup_entries = self._deduplicator.dump_entries(texts) if self._deduplicator is not None else []
+            self._manifest.commit([entry for _, entry in chunks], dedup_entries)
+
+    def ingest(self, paths: Iterable[Union[str, os.PathLike]]) -> List[StageStats]:
+        r"""
+        Ingests the text files.
+
+        Args:
+            paths: the paths to the text files.
+
+        Returns:
+            stats: the throughput statistics of the split, (dedup,) batch, embed and write stages.
+        """
+        if self._manifest is not None and self._deduplicator is not None:
+            self._deduplicator.load_entries(self._manifest.dedup_entries())
+
+        pending: List[Chunk] = []  # the chunks not yet batched, only touched by the single batch worker
+        skipped = {"files": 0, "chunks": 0}
+        skipped_lock = threading.Lock()  # updated by the split workers
+
+        def batch(chunks: List[Chunk]) -> Generator[List[Chunk], None, None]:
+            pending.extend(chunks)
+            while len(pending) >= self._batch_size:
+                yield pending[: self._batch_size]
+                del pending[: self._batch_size]
+
+        def flush() -> Generator[List[Chunk], None, None]:
+            if pending:
+                yield list(pending)
+
+        with ProcessPoolExecutor(max_workers=self._num_split_workers) as executor:
+
+            def split(path: Union[str, os.PathLike]) -> List[List[Chunk]]:
+                if self._manifest is None:
+                    return [[(text, None) for text in executor.submit(_split_file, self._splitter, path).result()]]
+
+                file_key = hash_file(path)
+                if self._manifest.is_done(file_key):
+                    with skipped_lock:
+                        skipped["files"] += 1
+
+                    return []
+
+                texts = executor.submit(_split_file, self._splitter, path).result()
+                chunk_keys = _chunk_keys(texts)
+                written_keys = self._manifest.begin_file(file_key, str(path), chunk_keys)
+                chunks = [(text, (file_key, key)) for text, key in zip(texts, chunk_keys) if key not in written_keys]
+                with skipped_lock:
+                    skipped["chunks"] += len(texts) - len(chunks)
+
+                return [chunks]
+
+            stages = [Stage("split", split, num_workers=self._num_split_workers)]
+            if self._deduplicator is not None:
+                stages.append(Stage("dedup", self._dedup, measure=len))
+
+            stages += [
+                Stage("batch", batch, flush=flush, measure=len),
+                Stage("embed", self._embed, num_workers=self._num_embed_workers, measure=len),
+                Stage("write", self._write, measure=lambda batch: len(batch[0])),
+            ]
+            stats = Pipeline(stages, queue_size=self._queue_size).run(paths)
+
+        for stage_stats in stats:
+            logger.info(str(stage_stats))
+
+        if self._manifest is not None:
+            logger.info("Skipped {} files and {} chunks written before.".format(skipped["files"], skipped["chunks"]))
+
+        if self._deduplicator is not None:
+            logger.info("Deduplication: {}.".format(self._deduplicator.stats()))
+
+        return stats
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+
+def hash_file(path: Union[str, os.PathLike], block_size: int = 1 << 20) -> bytes:
+    r"""
+    Returns the digest of the file content, used as the key of the file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+
+    return digest.digest()
+
+
+class Manifest:
+    r"""
+    A local SQLite manifest of the ingested files and chunks keyed by their content hashes.
+
+    The chunks are recorded after they are written, and a file is done when all its chunks are recorded,
+    thus a re-run after a failure skips the done files and the written chunks of the partially ingested files.
+    The index entries of the deduplicator are recorded along with the written chunks, to be loaded by the re-run.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]) -> None:
+        r"""
+        Initializes a manifest.
+
+        Args:
+            path: the path to the SQLite database, created if not exists.
+        """
+        self._lock = threading.Lock()  # the connection is shared by the stage threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files "
+                "(file_key BLOB PRIMARY KEY, path TEXT, num_chunks INTEGER, done INTEGER DEFAULT 0)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (file_key BLOB, chunk_key BLOB, PRIMARY KEY (file_key, chunk_key))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS dedup (key BLOB PRIMARY KEY, signature BLOB)")
+
+    def is_done(self, file_key: bytes) -> bool:
+        r"""
+        Checks if all the chunks of the file have been written.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT done FROM files WHERE file_key = ?", (file_key,)).fetchone()
+
+        return row is not None and row[0] == 1
+
+    def begin_file(self, file_key: bytes, path: str, chunk_keys: Sequence[bytes]) -> Set[bytes]:
+        r"""
+        Registers a file with its chunks and returns the keys of the chunks already written.
+
+        Args:
+            file_key: the content hash of the file.
+            path: the path of the file, for reference only.
+            chunk_keys: the content hashes of the chunks of the file.
+
+        Returns:
+            written_keys: the chunk keys recorded in the previous runs.
+        """
+        chunk_keys = set(chunk_keys)
+        num_chunks = len(chunk_keys)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (file_key, path, num_chunks, done) VALUES (?, ?, ?, ?)",
+                (file_key, path, num_chunks, int(num_chunks == 0)),
+            )
+            rows = self._conn.execute("SELECT chunk_key FROM chunks WHERE file_key = ?", (file_key,)).fetchall()
+            stale_keys = {row[0] for row in rows} - chunk_keys  # split with another configuration
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE file_key = ? AND chunk_key = ?", [(file_key, key) for key in stale_keys]
+            )
+
+        written_keys = {row[0] for row in rows} & chunk_keys
+        if num_chunks > 0 and written_keys.issuperset(chunk_keys):  # crashed before marking the file as done
+            self._complete([file_key])
+
+        return written_keys
+
+    def commit(
+        self,
+        entries: Iterable[Tuple[bytes, bytes]],
+        dedup_entries: Iterable[Tuple[bytes, Optional[bytes]]] = (),
+    ) -> None:
+        r"""
+        Records the written chunks and marks the completed files as done.
+
+        Args:
+            entries: the (file key, chunk key) of the written chunks.
+            dedup_entries: the index entries of the deduplicator for the written chunks, in the same transaction.
+        """
+        entries, dedup_entries = list(entries), list(dedup_entries)
+        if entries or dedup_entries:
+            with self._lock, self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO chunks (file_key, chunk_key) VALUES (?, ?)", entries)
+                self._conn.executemany("INSERT OR IGNORE INTO dedup (key, signature) VALUES (?, ?)", dedup_entries)
+
+        if entries:
+            self._complete(list({file_key for file_key, _ in entries}))
+
+    def dedup_entries(self) -> List[Tuple[bytes, Optional[bytes]]]:
+        r"""
+        Returns the index entries of the deduplicator recorded in the previous runs.
+        """
+        with self._lock:
+            return self._conn.execute("SELECT key, signature FROM dedup ORDER BY rowid").fetchall()
+
+    def _complete(self, file_keys: List[bytes]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE files SET done = 1 WHERE file_key = ? AND num_chunks <= "
+                "(SELECT COUNT(*) FROM chunks WHERE chunks.file_key = files.file_key)",
+                [(file_key,) for file_key in file_keys],
+            )
+
+    def reset(self) -> None:
+        r"""
+        Forgets all the ingested files and chunks.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM dedup")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,173 @@
+import threading
+import time
+from dataclasses import dataclass
+from queue import Queue
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+
+_STOP = object()  # the sentinel closing a queue, one per worker of the next stage
+
+
+@dataclass
+class StageStats:
+    name: str
+    num_items: int = 0  # the number of items processed
+    num_units: int = 0  # the number of units (e.g. chunks) processed, measured by the stage
+    busy_time: float = 0.0  # the seconds spent in the stage function, summed over the workers
+    blocked_time: float = 0.0  # the seconds spent waiting for the next stage to accept outputs (backpressure)
+    elapsed_time: float = 0.0  # the wall-clock seconds of the pipeline run
+
+    @property
+    def throughput(self) -> float:
+        r"""
+        Returns the number of units processed per second of wall-clock time.
+        """
+        return self.num_units / self.elapsed_time if self.elapsed_time > 0 else 0.0
+
+    def __str__(self) -> str:
+        return "{}: {} items, {} units, {:.1f} units/s, busy {:.2f}s, blocked {:.2f}s".format(
+            self.name, self.num_items, self.num_units, self.throughput, self.busy_time, self.blocked_time
+        )
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Optional[Iterable[Any]]],
+        num_workers: Optional[int] = 1,
+        flush: Optional[Callable[[], Iterable[Any]]] = None,
+        measure: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        r"""
+        Initializes a stage of the pipeline.
+
+        Args:
+            name: the name of the stage.
+            func: the function mapping an input item to an iterable of output items, or None for no outputs.
+            num_workers: the number of threads running the function.
+            flush: the function returning the remaining outputs after all the inputs are processed.
+            measure: the function returning the number of units in an input item, defaults to 1.
+        """
+        self.name = name
+        self.func = func
+        self.num_workers = num_workers
+        self.flush = flush
+        self.measure = measure
+
+
+class Pipeline:
+    r"""
+    Runs the stages concurrently in threads connected by bounded queues.
+
+    A stage blocks when the next stage falls behind, thus the memory is bounded by the queue size
+    and the slowest stage sets the pace (backpressure). The first error stops the pipeline and is re-raised.
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: Optional[int] = 8) -> None:
+        self._stages = list(stages)
+        self._queue_size = queue_size
+
+    def run(self, source: Iterable[Any]) -> List[StageStats]:
+        r"""
+        Feeds the items of the source through the stages.
+
+        Args:
+            source: the input items of the first stage.
+
+        Returns:
+            stats: the throughput statistics of each stage.
+        """
+        queues: List[Queue] = [Queue(maxsize=self._queue_size) for _ in self._stages]
+        stats = [StageStats(name=stage.name) for stage in self._stages]
+        remaining = [stage.num_workers for stage in self._stages]
+        lock = threading.Lock()
+        failed = threading.Event()
+        errors: List[BaseException] = []
+
+        def emit(index: int, outputs: Optional[Iterable[Any]]) -> float:
+            blocked_time = 0.0
+            for output in outputs if outputs is not None else ():
+                if failed.is_set():
+                    break
+
+                if index + 1 < len(self._stages):
+                    start_time = time.perf_counter()
+                    queues[index + 1].put(output)
+                    blocked_time += time.perf_counter() - start_time
+
+            with lock:
+                stats[index].blocked_time += blocked_time
+
+            return blocked_time
+
+        def close(index: int) -> None:
+            with lock:
+                remaining[index] -= 1
+                if remaining[index] > 0:
+                    return
+
+            stage = self._stages[index]
+            if stage.flush is not None and not failed.is_set():
+                try:
+                    emit(index, stage.flush())
+                except BaseException as e:
+                    errors.append(e)
+                    failed.set()
+
+            if index + 1 < len(self._stages):
+                for _ in range(self._stages[index + 1].num_workers):
+                    queues[index + 1].put(_STOP)
+
+        def work(index: int) -> None:
+            stage = self._stages[index]
+            while True:
+                item = queues[index].get()
+                if item is _STOP:
+                    close(index)
+                    return
+
+                if failed.is_set():  # keep draining the queue to unblock the previous stages
+                    continue
+
+                try:
+                    start_time = time.perf_counter()
+                    blocked_time = emit(index, stage.func(item))  # the function may be a lazy generator
+                    with lock:
+                        stats[index].busy_time += time.perf_counter() - start_time - blocked_time
+                        stats[index].num_items += 1
+                        stats[index].num_units += stage.measure(item) if stage.measure is not None else 1
+                except BaseException as e:
+                    errors.append(e)
+                    failed.set()
+
+        threads = [
+            threading.Thread(target=work, args=(index,), daemon=True)
+            for index, stage in enumerate(self._stages)
+            for _ in range(stage.num_workers)
+        ]
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in source:
+                if failed.is_set():
+                    break
+
+                queues[0].put(item)
+        finally:
+            for _ in range(self._stages[0].num_workers):
+                queues[0].put(_STOP)
+
+            for thread in threads:
+                thread.join()
+
+        elapsed_time = time.perf_counter() - start_time
+        for stage_stats in stats:
+            stage_stats.elapsed_time = elapsed_time
+
+        if errors:
+            raise errors[0]
+
+        return stats
@@ -1,6 +1,24 @@
+from .auto import AutoEmbedder
 from .chat_openai import ChatOpenAI
+from .context_packer import ContextPacker
+from .embed_local import EmbedLocal
 from .embed_openai import EmbedOpenAI
+from .micro_batcher import MicroBatcher
+from .response_cache import ResponseCache
+from .schema import Embedder
 from .token_counter import TokenCounter
+from .token_estimator import TokenEstimator
 
 
-__all__ = ["ChatOpenAI", "EmbedOpenAI", "TokenCounter"]
+__all__ = [
+    "AutoEmbedder",
+    "ChatOpenAI",
+    "ContextPacker",
+    "EmbedLocal",
+    "EmbedOpenAI",
+    "Embedder",
+    "MicroBatcher",
+    "ResponseCache",
+    "TokenCounter",
+    "TokenEstimator",
+]
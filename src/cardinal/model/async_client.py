@@ -0,0 +1,25 @@
+import asyncio
+import weakref
+from typing import Dict, Tuple
+
+from openai import AsyncOpenAI
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[int, float], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)  # the connections of a client are bound to its event loop
+
+
+def get_async_client(max_retries: int, timeout: float) -> AsyncOpenAI:
+    r"""
+    Returns the async client shared by the models on the running event loop, thus they share one connection pool.
+
+    Args:
+        max_retries: the max number of retries of the client.
+        timeout: the timeout of the requests in seconds.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if (max_retries, timeout) not in clients:
+        clients[(max_retries, timeout)] = AsyncOpenAI(max_retries=max_retries, timeout=timeout)
+
+    return clients[(max_retries, timeout)]
@@ -0,0 +1,55 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from .config import settings
+from .embed_local import EmbedLocal
+from .embed_openai import EmbedOpenAI
+from .micro_batcher import MicroBatcher
+from .schema import Embedder, Embeddings
+
+
+class AutoEmbedder(Embedder):
+    def __init__(self, model: Optional[str] = None) -> None:
+        if settings.embed_batch_wait > 0:
+            self._embedder = _get_micro_batcher(model)
+        else:
+            self._embedder = _get_embedder()(model=model)
+
+    def batch_embed(self, texts: Sequence[str]) -> Embeddings:
+        return self._embedder.batch_embed(texts)
+
+    async def abatch_embed(self, texts: Sequence[str]) -> Embeddings:
+        return await self._embedder.abatch_embed(texts)
+
+
+_embedders: Dict[str, Type["Embedder"]] = {}
+
+
+def _add_embedder(name: str, embedder: Type["Embedder"]) -> None:
+    _embedders[name] = embedder
+
+
+def _list_embedders() -> List[str]:
+    return list(map(str, _embedders.keys()))
+
+
+def _get_embedder() -> Type["Embedder"]:
+    if settings.embedder not in _embedders:
+        raise ValueError("Embedder not found, should be one of {}.".format(_list_embedders()))
+
+    return _embedders[settings.embedder]
+
+
+_micro_batchers: Dict[Tuple[str, Optional[str]], MicroBatcher] = {}  # shared by the vector stores of a process
+
+
+def _get_micro_batcher(model: Optional[str]) -> MicroBatcher:
+    if (settings.embedder, model) not in _micro_batchers:
+        _micro_batchers[(settings.embedder, model)] = MicroBatcher(
+            _get_embedder()(model=model), settings.embed_batch_wait, settings.embed_batch_max_size
+        )
+
+    return _micro_batchers[(settings.embedder, model)]
+
+
+_add_embedder("openai", EmbedOpenAI)
+_add_embedder("local", EmbedLocal)
@@ -1,22 +1,36 @@
+import asyncio
 import json
-from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Union
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict, Generator, List, Optional, Union
 
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+from openai import BadRequestError, OpenAI
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_random_exponential
 
 from ..common import BaseMessage, FunctionAvailable, FunctionCall
+from .async_client import get_async_client
 from .config import settings
+from .response_cache import ResponseCache, replay_stream
 
 
 if TYPE_CHECKING:
-    from openai import Stream
+    from openai import AsyncStream, Stream
     from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
 
 class ChatOpenAI:
-    def __init__(self, model: Optional[str] = None) -> None:
+    def __init__(self, model: Optional[str] = None, response_cache: Optional[ResponseCache] = None) -> None:
+        r"""
+        Initializes a chat model.
+
+        Args:
+            model: the name of the model.
+            response_cache: the cache of the responses to the same or similar queries, optional.
+        """
         self._client = OpenAI(max_retries=5, timeout=30.0)
         self._model = model if model is not None else settings.default_chat_model
+        self._response_cache = response_cache
+
+    def _use_cache(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> bool:
+        return self._response_cache is not None and ResponseCache.cacheable(messages, kwargs)
 
     def _parse_messages(self, messages: List[BaseMessage]) -> List[Dict[str, str]]:
         return [message.model_dump() for message in messages]
@@ -24,7 +38,11 @@ class ChatOpenAI:
     def _parse_tools(self, tools: List[FunctionAvailable]) -> List[Dict[str, Any]]:
         return [tool.model_dump() for tool in tools]
 
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(5))
+    @retry(
+        retry=retry_if_not_exception_type(BadRequestError),  # e.g. the prompt is too long, which never succeeds
+        wait=wait_random_exponential(min=1, max=60),
+        stop=stop_after_attempt(5),
+    )
     def _completion_with_backoff(
         self,
         messages: List[BaseMessage],
@@ -38,16 +56,94 @@ class ChatOpenAI:
 
         return self._client.chat.completions.create(**request_kwargs, **kwargs)
 
+    @retry(
+        retry=retry_if_not_exception_type(BadRequestError),  # e.g. the prompt is too long, which never succeeds
+        wait=wait_random_exponential(min=1, max=60),
+        stop=stop_after_attempt(5),
+    )
+    async def _acompletion_with_backoff(
+        self,
+        messages: List[BaseMessage],
+        stream: bool = False,
+        tools: Optional[List[FunctionAvailable]] = None,
+        **kwargs,
+    ) -> Union["ChatCompletion", "AsyncStream[ChatCompletionChunk]"]:
+        request_kwargs = {"messages": self._parse_messages(messages), "model": self._model, "stream": stream}
+        if tools is not None:
+            request_kwargs["tools"] = self._parse_tools(tools)
+
+        client = get_async_client(max_retries=5, timeout=30.0)
+        return await client.chat.completions.create(**request_kwargs, **kwargs)
+
     def chat(self, messages: List[BaseMessage], **kwargs) -> str:
-        return self._completion_with_backoff(messages=messages, **kwargs).choices[0].message.content
+        if not self._use_cache(messages, kwargs):
+            return self._completion_with_backoff(messages=messages, **kwargs).choices[0].message.content
+
+        response = self._response_cache.lookup(self._model, messages, **kwargs)
+        if response is None:
+            response = self._completion_with_backoff(messages=messages, **kwargs).choices[0].message.content
+            if response is not None:
+                self._response_cache.put(self._model, messages, response, **kwargs)
+
+        return response
 
     def stream_chat(self, messages: List[BaseMessage], **kwargs) -> Generator[str, None, None]:
+        use_cache = self._use_cache(messages, kwargs)
+        if use_cache:
+            response = self._response_cache.lookup(self._model, messages, **kwargs)
+            if response is not None:
+                yield from replay_stream(response)
+                return
+
+        pieces = []
         for chunk in self._completion_with_backoff(messages=messages, stream=True, **kwargs):
             if chunk.choices[0].delta.content is not None:
+                pieces.append(chunk.choices[0].delta.content)
                 yield chunk.choices[0].delta.content
 
+        if use_cache:  # only the completed streams are cached
+            self._response_cache.put(self._model, messages, "".join(pieces), **kwargs)
+
     def function_call(self, messages: List[BaseMessage], tools: List[FunctionAvailable], **kwargs) -> FunctionCall:
         tool_call = (
             self._completion_with_backoff(messages=messages, tools=tools, **kwargs).choices[0].message.tool_calls[0]
         )  # current only support a single tool
         return FunctionCall(name=tool_call.function.name, arguments=json.loads(tool_call.function.arguments))
+
+    async def achat(self, messages: List[BaseMessage], **kwargs) -> str:
+        if not self._use_cache(messages, kwargs):
+            return (await self._acompletion_with_backoff(messages=messages, **kwargs)).choices[0].message.content
+
+        response = await self._response_cache.alookup(self._model, messages, **kwargs)
+        if response is None:
+            response = (await self._acompletion_with_backoff(messages=messages, **kwargs)).choices[0].message.content
+            if response is not None:
+                await asyncio.to_thread(self._response_cache.put, self._model, messages, response, **kwargs)
+
+        return response
+
+    async def astream_chat(self, messages: List[BaseMessage], **kwargs) -> AsyncGenerator[str, None]:
+        use_cache = self._use_cache(messages, kwargs)
+        if use_cache:
+            response = await self._response_cache.alookup(self._model, messages, **kwargs)
+            if response is not None:
+                for piece in replay_stream(response):
+                    yield piece
+
+                return
+
+        pieces = []
+        async for chunk in await self._acompletion_with_backoff(messages=messages, stream=True, **kwargs):
+            if chunk.choices[0].delta.content is not None:
+                pieces.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+
+        if use_cache:
+            await asyncio.to_thread(self._response_cache.put, self._model, messages, "".join(pieces), **kwargs)
+
+    async def afunction_call(
+        self, messages: List[BaseMessage], tools: List[FunctionAvailable], **kwargs
+    ) -> FunctionCall:
+        response = await self._acompletion_with_backoff(messages=messages, tools=tools, **kwargs)
+        tool_call = response.choices[0].message.tool_calls[0]  # current only support a single tool
+        return FunctionCall(name=tool_call.function.name, arguments=json.loads(tool_call.function.arguments))
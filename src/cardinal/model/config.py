@@ -8,10 +8,36 @@ class Config:
     default_embed_model: str
     default_chat_model: str
     hf_tokenizer_path: Optional[str]
+    token_cache_size: int
+    embed_cache_size: int
+    embed_cache_path: Optional[str]
+    embed_concurrency: int
+    embed_max_tokens_per_request: int
+    embed_max_tokens_per_input: int
+    embed_as_numpy: bool
+    embedder: str
+    default_local_embed_model: str
+    local_embed_backend: str
+    local_embed_workers: int
+    embed_batch_wait: float
+    embed_batch_max_size: int
 
 
 settings = Config(
     default_embed_model=os.environ.get("DEFAULT_EMBED_MODEL", "text-embedding-ada-002"),
     default_chat_model=os.environ.get("DEFAULT_CHAT_MODEL", "gpt-3.5-turbo"),
     hf_tokenizer_path=os.environ.get("HF_TOKENIZER_PATH", None),
+    token_cache_size=int(os.environ.get("TOKEN_CACHE_SIZE", "0")),
+    embed_cache_size=int(os.environ.get("EMBED_CACHE_SIZE", "0")),
+    embed_cache_path=os.environ.get("EMBED_CACHE_PATH", None) or None,
+    embed_concurrency=int(os.environ.get("EMBED_CONCURRENCY", "1")),
+    embed_max_tokens_per_request=int(os.environ.get("EMBED_MAX_TOKENS_PER_REQUEST", "0")),
+    embed_max_tokens_per_input=int(os.environ.get("EMBED_MAX_TOKENS_PER_INPUT", "8191")),
+    embed_as_numpy=os.environ.get("EMBED_AS_NUMPY", "false").lower() in ["true", "1"],
+    embedder=os.environ.get("EMBEDDER", "openai"),
+    default_local_embed_model=os.environ.get("DEFAULT_LOCAL_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+    local_embed_backend=os.environ.get("LOCAL_EMBED_BACKEND", "sentence_transformers"),
+    local_embed_workers=int(os.environ.get("LOCAL_EMBED_WORKERS", "2")),
+    embed_batch_wait=float(os.environ.get("EMBED_BATCH_WAIT_MS", "0")) / 1000,
+    embed_batch_max_size=int(os.environ.get("EMBED_BATCH_MAX_SIZE", "64")),
 )
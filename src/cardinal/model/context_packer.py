@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from ..common import BaseMessage, HumanMessage, Role, Template
+from .token_counter import TokenCounter
+
+
+@dataclass
+class PackedPrompt:
+    messages: List[BaseMessage]  # the system messages, the kept history and the augmented query
+    num_tokens: int  # the estimated number of tokens of the prompt
+    num_documents: int  # the number of documents kept, including the truncated one
+    num_dropped_messages: int  # the number of history messages dropped
+    truncated: bool  # whether a document or the query was truncated
+
+
+class ContextPacker:
+    r"""
+    Packs the chat history and the retrieved documents into a token budget.
+
+    The system messages and the query are always kept, the documents are packed in the order of priority up to
+    a share of the remaining budget, and the most recent history fills the rest. Each message and document is
+    counted once with a batched call of the tokenizer, and the prompt size is the sum of the counts, thus the
+    prompt is never re-tokenized as a whole.
+    """
+
+    _boundaries = ["\n", "。", "！", "？", ". ", "! ", "? "]
+
+    def __init__(
+        self,
+        max_tokens: int,
+        counter: Optional[TokenCounter] = None,
+        context_ratio: Optional[float] = 0.7,
+        min_document_tokens: Optional[int] = 32,
+        tokens_per_message: Optional[int] = 4,
+    ) -> None:
+        r"""
+        Initializes a context packer.
+
+        Args:
+            max_tokens: the max number of tokens of the prompt, excluding the completion.
+            counter: the token counter, defaults to the tokenizer of the default chat model.
+            context_ratio: the max share of the remaining budget for the documents if there is history.
+            min_document_tokens: the min number of tokens of a truncated document, otherwise it is dropped.
+            tokens_per_message: the number of tokens added by the chat format to each message.
+        """
+        self._max_tokens = max_tokens
+        self._counter = counter if counter is not None else TokenCounter()
+        self._context_ratio = context_ratio
+        self._min_document_tokens = min_document_tokens
+        self._tokens_per_message = tokens_per_message
+        self._priming_tokens = 3  # the reply is primed with the assistant role
+
+    def _truncate(self, text: str, max_tokens: int) -> Tuple[str, int]:
+        r"""
+        Truncates the text to the token budget, preferably at the end of a sentence.
+        """
+        piece = self._counter.split_tokens(text, max_tokens)[0]
+        end = max(piece.rfind(boundary) + len(boundary) for boundary in self._boundaries)
+        if end >= len(piece) // 2:  # otherwise cutting at the sentence loses too much
+            piece = piece[:end]
+
+        return piece, self._counter(piece)
+
+    def pack(
+        self,
+        messages: Sequence[BaseMessage],
+        documents: Sequence[str],
+        template: Optional[Template] = None,
+        separator: Optional[str] = "\n",
+    ) -> PackedPrompt:
+        r"""
+        Packs the messages and the documents into the token budget.
+
+        Args:
+            messages: the chat messages, the last one is the query.
+            documents: the retrieved documents, in the order of priority.
+            template: the template with the `context` and `query` fields to augment the query with documents.
+            separator: the separator of the documents.
+
+        Returns:
+            packed_prompt: the messages to send and the statistics of the packing.
+        """
+        template = template if template is not None else Template("{context}\n\n{query}")
+        num_system = 0
+        while num_system < len(messages) - 1 and messages[num_system].role == Role.SYSTEM:
+            num_system += 1
+
+        system, history, query = messages[:num_system], messages[num_system:-1], messages[-1].content
+        counts = self._counter.count_many([message.content for message in messages] + list(documents))
+        system_counts, history_counts = counts[:num_system], counts[num_system : len(messages) - 1]
+        query_count, document_counts = counts[len(messages) - 1], counts[len(messages) :]
+
+        truncated = False
+        fixed = self._priming_tokens + sum(system_counts) + self._tokens_per_message * (num_system + 1)
+        if fixed >= self._max_tokens:
+            raise ValueError("System messages exceed the token budget of {}.".format(self._max_tokens))
+
+        if fixed + query_count > self._max_tokens:
+            query, query_count = self._truncate(query, self._max_tokens - fixed)
+            truncated = True
+
+        remaining = self._max_tokens - fixed - query_count
+        document_budget = int(remaining * self._context_ratio) if len(history) else remaining
+        overhead = self._counter(template.apply(context="", query="")) if len(documents) else 0
+        separator_count = self._counter(separator) if len(documents) > 1 else 0
+        kept_documents: List[str] = []
+        document_used = 0
+        for document, count in zip(documents, document_counts):
+            cost = overhead if len(kept_documents) == 0 else separator_count
+            if document_used + cost + count <= document_budget:
+                kept_documents.append(document)
+                document_used += cost + count
+            elif document_budget - document_used - cost >= self._min_document_tokens:
+                document, count = self._truncate(document, document_budget - document_used - cost)
+                kept_documents.append(document)
+                document_used += cost + count
+                truncated = True
+                break
+
+        history_budget = remaining - document_used
+        history_used, num_kept = 0, 0
+        for count in reversed(history_counts):  # the most recent messages first
+            if history_used + count + self._tokens_per_message > history_budget:
+                break
+
+            history_used += count + self._tokens_per_message
+            num_kept += 1
+
+        kept_history = list(history[len(history) - num_kept :])
+        if len(kept_history) and kept_history[0].role == Role.ASSISTANT:  # an answer without its question
+            history_used -= history_counts[len(history) - num_kept] + self._tokens_per_message
+            kept_history = kept_history[1:]
+
+        if len(kept_documents):
+            query = template.apply(context=separator.join(kept_documents), query=query)
+
+        return PackedPrompt(
+            messages=list(system) + kept_history + [HumanMessage(content=query)],
+            num_tokens=fixed + query_count + document_used + history_used,
+            num_documents=len(kept_documents),
+            num_dropped_messages=len(history) - len(kept_history),
+            truncated=truncated,
+        )
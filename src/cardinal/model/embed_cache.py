@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..utils.cache_utils import LRUCache, hash_text
+
+
+def _to_array(embedding: Sequence[float]) -> "array[float]":
+    if isinstance(embedding, array):
+        return embedding
+
+    vector = array("f")
+    if hasattr(embedding, "astype"):  # a numpy vector, copied without creating the python floats
+        vector.frombytes(embedding.astype("float32").tobytes())
+    else:
+        vector.extend(embedding)
+
+    return vector
+
+
+class EmbedCacheInfo(NamedTuple):
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    memory_size: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total > 0 else 0.0
+
+
+class EmbedCache:
+    r"""
+    A two-tier cache of embeddings keyed by the hash of (model, text): an in-memory LRU tier
+    in front of an on-disk SQLite tier, which is shared by the processes. Both tiers store float32 vectors.
+    """
+
+    def __init__(self, maxsize: int, path: Optional[str] = None) -> None:
+        r"""
+        Initializes an embedding cache.
+
+        Args:
+            maxsize: the number of embeddings kept in memory, 0 to disable the memory tier.
+            path: the path to the SQLite database, None to disable the disk tier.
+        """
+        self._memory = LRUCache["array[float]"](maxsize=maxsize) if maxsize > 0 else None
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._disk_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hash_text("{}\0{}".format(model, text))
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():  # a connection must not be shared with forked children
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, embedding BLOB)")
+            self._pid = os.getpid()
+
+        return self._conn
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional["array[float]"]]:
+        r"""
+        Returns the cached float32 vectors of the keys, None for the misses.
+        """
+        results: List[Optional["array[float]"]] = [None] * len(keys)
+        if self._memory is not None:
+            results = [self._memory.get(key) for key in keys]
+
+        missing_ids = [i for i, result in enumerate(results) if result is None]
+        if missing_ids and self._path is not None:
+            found: Dict[bytes, bytes] = {}
+            with self._lock:
+                conn = self._connect()
+                missing_keys = list({keys[i] for i in missing_ids})
+                for i in range(0, len(missing_keys), 500):  # bounded by the max number of SQL variables
+                    batch_keys = missing_keys[i : i + 500]
+                    placeholders = ",".join("?" * len(batch_keys))
+                    rows = conn.execute(
+                        "SELECT key, embedding FROM embeddings WHERE key IN ({})".format(placeholders), batch_keys
+                    ).fetchall()
+                    found.update(rows)
+
+            for i in missing_ids:
+                if keys[i] in found:
+                    results[i] = array("f")
+                    results[i].frombytes(found[keys[i]])
+                    if self._memory is not None:
+                        self._memory.put(keys[i], results[i])
+
+        num_disk_hits = sum(1 for i in missing_ids if results[i] is not None)
+        with self._lock:
+            self._disk_hits += num_disk_hits
+            self._misses += len(missing_ids) - num_disk_hits
+
+        return results
+
+    def put_many(self, items: Sequence[Tuple[bytes, Sequence[float]]]) -> None:
+        items = [(key, _to_array(embedding)) for key, embedding in items]
+        if self._memory is not None:
+            for key, embedding in items:
+                self._memory.put(key, embedding)
+
+        if self._path is not None and items:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, embedding) VALUES (?, ?)",
+                        [(key, embedding.tobytes()) for key, embedding in items],
+                    )
+
+    def info(self) -> EmbedCacheInfo:
+        memory_info = self._memory.info() if self._memory is not None else None
+        with self._lock:
+            return EmbedCacheInfo(
+                memory_hits=memory_info.hits if memory_info is not None else 0,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                memory_size=memory_info.currsize if memory_info is not None else 0,
+            )
+
+
+_embed_caches: Dict[Tuple[int, Optional[str]], EmbedCache] = {}  # shared by the embedders of a process
+
+
+def get_embed_cache(maxsize: int, path: Optional[str] = None) -> Optional[EmbedCache]:
+    if maxsize <= 0 and path is None:
+        return None
+
+    if (maxsize, path) not in _embed_caches:
+        _embed_caches[(maxsize, path)] = EmbedCache(maxsize, path)
+
+    return _embed_caches[(maxsize, path)]
+
+
+def _reinit_embed_caches_after_fork() -> None:
+    for cache in _embed_caches.values():
+        cache._lock = threading.Lock()  # the parent may have held the lock when forking
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_embed_caches_after_fork)
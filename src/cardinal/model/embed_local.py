@@ -0,0 +1,142 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional, Sequence
+
+from ..logging import get_logger
+from ..utils.import_utils import (
+    is_numpy_available,
+    is_onnxruntime_available,
+    is_sentence_transformers_available,
+    is_transformers_available,
+)
+from .config import settings
+from .schema import Embedder, Embeddings
+
+
+if is_numpy_available():
+    import numpy as np
+
+if is_sentence_transformers_available():
+    from sentence_transformers import SentenceTransformer
+
+if is_onnxruntime_available():
+    import onnxruntime
+
+if is_transformers_available():
+    from transformers import AutoTokenizer
+
+
+logger = get_logger(__name__)
+
+
+class EmbedLocal(Embedder):
+    r"""
+    Embeds the texts on CPU with a local sentence-transformers or ONNX model, without any remote API.
+
+    The texts are sorted by length to reduce the padding, and the batches are run by a pool of worker threads,
+    the inference releases the GIL thus the batches are computed in parallel.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        batch_size: Optional[int] = 32,
+        backend: Optional[Literal["sentence_transformers", "onnx"]] = None,
+        num_workers: Optional[int] = None,
+        normalize: Optional[bool] = True,
+        as_numpy: Optional[bool] = None,
+    ) -> None:
+        r"""
+        Initializes a local embedding model.
+
+        Args:
+            model: the name or path of the model, a directory with `model.onnx` and the tokenizer for ONNX.
+            batch_size: the max number of texts of a forward pass.
+            backend: the inference backend, sentence_transformers or onnx.
+            num_workers: the number of batches computed in parallel.
+            normalize: whether to normalize the embeddings to unit length.
+            as_numpy: whether to return a float32 matrix instead of lists.
+        """
+        if not is_numpy_available():
+            raise ImportError("Please install numpy to use the local embedding models.")
+
+        self._model_name = model if model is not None else settings.default_local_embed_model
+        self._batch_size = batch_size
+        self._backend = backend if backend is not None else settings.local_embed_backend
+        self._num_workers = num_workers if num_workers is not None else settings.local_embed_workers
+        self._normalize = normalize
+        self._as_numpy = as_numpy if as_numpy is not None else settings.embed_as_numpy
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        if self._backend == "sentence_transformers":
+            if not is_sentence_transformers_available():
+                raise ImportError("Please install sentence-transformers: pip install sentence-transformers")
+
+            self._model = SentenceTransformer(self._model_name, device="cpu")
+        elif self._backend == "onnx":
+            if not is_onnxruntime_available() or not is_transformers_available():
+                raise ImportError("Please install onnxruntime and transformers: pip install onnxruntime transformers")
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self._num_workers)  # shared by the workers
+            self._session = onnxruntime.InferenceSession(
+                os.path.join(self._model_name, "model.onnx"), options, providers=["CPUExecutionProvider"]
+            )
+            self._input_names = {node.name for node in self._session.get_inputs()}
+            self._tokenizer = AutoTokenizer.from_pretrained(self._model_name)
+        else:
+            raise ValueError("Backend not found, should be one of ['sentence_transformers', 'onnx'].")
+
+        logger.info("Loaded local embedding model {} with {}.".format(self._model_name, self._backend))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._num_workers)
+
+            return self._executor
+
+    def _forward_onnx(self, batch_text: Sequence[str]) -> "np.ndarray":
+        inputs = self._tokenizer(list(batch_text), padding=True, truncation=True, return_tensors="np")
+        outputs = self._session.run(None, {k: v for k, v in inputs.items() if k in self._input_names})
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        embeddings = (outputs[0] * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)  # mean pooling
+        if self._normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+        return embeddings.astype(np.float32)
+
+    def _forward(self, batch_text: Sequence[str]) -> "np.ndarray":
+        if self._backend == "onnx":
+            return self._forward_onnx(batch_text)
+
+        return self._model.encode(
+            list(batch_text),
+            batch_size=len(batch_text),
+            convert_to_numpy=True,
+            normalize_embeddings=self._normalize,
+            show_progress_bar=False,
+        ).astype(np.float32)
+
+    def batch_embed(self, texts: Sequence[str]) -> Embeddings:
+        if len(texts) == 0:
+            return np.empty((0, 0), dtype=np.float32) if self._as_numpy else []
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))  # similar lengths, less padding
+        batches = [
+            [texts[j] for j in order[i : i + self._batch_size]] for i in range(0, len(texts), self._batch_size)
+        ]
+        if len(batches) == 1 or self._num_workers <= 1:
+            results = [self._forward(batch) for batch in batches]
+        else:
+            results = list(self._get_executor().map(self._forward, batches))
+
+        sorted_embeddings = np.concatenate(results)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings if self._as_numpy else embeddings.tolist()
+
+    def __del__(self) -> None:
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=False)
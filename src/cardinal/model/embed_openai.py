@@ -1,26 +1,394 @@
-from typing import List, Optional, Sequence
+import asyncio
+import base64
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, List, Literal, Optional, Sequence, Tuple
 
-from openai import OpenAI
+from openai import OpenAI, RateLimitError
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
+from ..logging import get_logger
+from ..utils.import_utils import is_numpy_available
+from .async_client import get_async_client
 from .config import settings
+from .embed_cache import EmbedCache, EmbedCacheInfo, get_embed_cache
+from .schema import Embedder, Embeddings
+from .token_counter import TokenCounter
 
 
-class EmbedOpenAI:
-    def __init__(self, model: Optional[str] = None, batch_size: Optional[int] = 1000) -> None:
+if is_numpy_available():
+    import numpy as np
+
+
+logger = get_logger(__name__)
+
+
+class _AdaptiveLimiter:
+    r"""
+    Limits the requests in flight, halving the limit on rate limit errors and increasing it additively on success.
+
+    The limit is shared by the threads and the event loops, the coroutines wait on futures woken by the releases
+    instead of blocking their event loop.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._max_concurrency = max_concurrency
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._waiters: List["asyncio.Future[None]"] = []
+
+    def _try_acquire(self) -> bool:
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return True
+
+        return False
+
+    def _on_success(self) -> None:
+        with self._cond:
+            self._limit = min(float(self._max_concurrency), self._limit + 1 / self._limit)
+
+    def _on_rate_limit(self) -> None:
+        with self._cond:
+            self._limit = max(1.0, self._limit / 2)
+            logger.warning("Rate limited, reduced the concurrency to {}.".format(int(self._limit)))
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+
+        for waiter in waiters:  # the waiters retry the acquire on their own event loops
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    @contextmanager
+    def slot(self) -> Generator[None, None, None]:
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+
+        try:
+            yield
+        except RateLimitError:
+            self._on_rate_limit()
+            raise
+        else:
+            self._on_success()
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncGenerator[None, None]:
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    break
+
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+
+            await waiter
+
+        try:
+            yield
+        except RateLimitError:
+            self._on_rate_limit()
+            raise
+        else:
+            self._on_success()
+        finally:
+            self._release()
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():  # the waiter may be cancelled
+        waiter.set_result(None)
+
+
+def pack_by_tokens(lengths: Sequence[int], max_tokens: int, max_items: int) -> List[Tuple[int, int]]:
+    r"""
+    Packs the consecutive items into batches within the token and item budgets.
+
+    Args:
+        lengths: the number of tokens of each item.
+        max_tokens: the max number of tokens of a batch, an item exceeding it forms a batch alone.
+        max_items: the max number of items of a batch.
+
+    Returns:
+        ranges: the (start, end) indices of the batches.
+    """
+    ranges = []
+    start, total = 0, 0
+    for i, length in enumerate(lengths):
+        if i > start and (total + length > max_tokens or i - start >= max_items):
+            ranges.append((start, i))
+            start, total = i, 0
+
+        total += length
+
+    if start < len(lengths):
+        ranges.append((start, len(lengths)))
+
+    return ranges
+
+
+def _average(embeddings: Sequence[List[float]], weights: Sequence[int]) -> List[float]:
+    r"""
+    Returns the weighted average of the embeddings, normalized to unit length.
+    """
+    average = [sum(weight * value for weight, value in zip(weights, values)) for values in zip(*embeddings)]
+    norm = math.sqrt(sum(value * value for value in average)) or 1.0
+    return [value / norm for value in average]
+
+
+class EmbedOpenAI(Embedder):
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        batch_size: Optional[int] = 1000,
+        cache_size: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        max_tokens_per_request: Optional[int] = None,
+        max_tokens_per_input: Optional[int] = None,
+        oversized: Optional[Literal["truncate", "split"]] = "truncate",
+        as_numpy: Optional[bool] = None,
+    ) -> None:
+        r"""
+        Initializes an embedding model.
+
+        Args:
+            model: the name of the model.
+            batch_size: the max number of texts of a request.
+            cache_size: the number of embeddings cached in memory, 0 to disable.
+            cache_path: the path to the on-disk embedding cache, None to disable.
+            concurrency: the max number of requests in flight.
+            max_tokens_per_request: the max number of tokens of a request, 0 to batch by the number of texts only.
+            max_tokens_per_input: the max number of tokens of a text, the longer texts are truncated or split.
+            oversized: truncate the oversized texts, or split them and average the embeddings of the pieces.
+            as_numpy: whether to return a float32 matrix decoded from the base64 response, requires numpy.
+        """
         self._batch_size = batch_size
-        self._client = OpenAI(max_retries=5, timeout=30.0)
+        self._client = OpenAI(max_retries=0, timeout=30.0)  # retried per batch below, to see the rate limits
         self._model = model if model is not None else settings.default_embed_model
+        self._concurrency = concurrency if concurrency is not None else settings.embed_concurrency
+        self._limiter = _AdaptiveLimiter(max(self._concurrency, 1))
+        self._max_tokens_per_request = (
+            max_tokens_per_request if max_tokens_per_request is not None else settings.embed_max_tokens_per_request
+        )
+        self._max_tokens_per_input = (
+            max_tokens_per_input if max_tokens_per_input is not None else settings.embed_max_tokens_per_input
+        )
+        self._oversized = oversized
+        self._as_numpy = as_numpy if as_numpy is not None else settings.embed_as_numpy
+        if self._as_numpy and not is_numpy_available():
+            raise ImportError("Please install numpy to return the embeddings as numpy arrays.")
+
+        self._counter: Optional[TokenCounter] = None
+        self._cache = get_embed_cache(
+            cache_size if cache_size is not None else settings.embed_cache_size,
+            cache_path if cache_path is not None else settings.embed_cache_path,
+        )
 
     @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(5))
-    def _get_embeddings(self, batch_text: Sequence[str]) -> List[List[float]]:
-        # replace newlines, which can negatively affect performance
-        batch_text = [text.replace("\n", " ") for text in batch_text]
-        data = self._client.embeddings.create(input=batch_text, model=self._model).data
+    def _get_embeddings(self, batch_text: Sequence[str]) -> Embeddings:
+        if self._as_numpy:  # the base64 string is the raw float32 buffer, skipping the json floats
+            with self._limiter.slot():
+                data = self._client.embeddings.create(
+                    input=batch_text, model=self._model, encoding_format="base64"
+                ).data
+
+            return np.stack([np.frombuffer(base64.b64decode(d.embedding), dtype=np.float32) for d in data])
+
+        with self._limiter.slot():
+            data = self._client.embeddings.create(input=batch_text, model=self._model).data
+
         return [d.embedding for d in data]
 
-    def batch_embed(self, texts: Sequence[str]) -> List[List[float]]:
-        embeddings = []
-        for i in range(0, len(texts), self._batch_size):
-            embeddings.extend(self._get_embeddings(texts[i : i + self._batch_size]))
-        return embeddings
+    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(5))
+    async def _aget_embeddings(self, batch_text: Sequence[str]) -> Embeddings:
+        client = get_async_client(max_retries=0, timeout=30.0)
+        if self._as_numpy:
+            async with self._limiter.aslot():
+                response = await client.embeddings.create(
+                    input=batch_text, model=self._model, encoding_format="base64"
+                )
+
+            return np.stack([np.frombuffer(base64.b64decode(d.embedding), dtype=np.float32) for d in response.data])
+
+        async with self._limiter.aslot():
+            response = await client.embeddings.create(input=batch_text, model=self._model)
+
+        return [d.embedding for d in response.data]
+
+    def _stack(self, vectors: Sequence[Any]) -> Embeddings:
+        r"""
+        Converts the vectors (lists, float32 arrays or numpy vectors) to the return type.
+        """
+        if self._as_numpy:
+            if len(vectors) == 0:
+                return np.empty((0, 0), dtype=np.float32)
+
+            return np.stack([np.asarray(vector, dtype=np.float32) for vector in vectors])
+
+        return [vector if isinstance(vector, list) else vector.tolist() for vector in vectors]
+
+    def _get_counter(self) -> TokenCounter:
+        if self._counter is None:
+            try:
+                self._counter = TokenCounter(self._model)
+            except KeyError:  # not an OpenAI model, approximated with the default tokenizer
+                self._counter = TokenCounter()
+
+        return self._counter
+
+    def _split_batches(self, texts: Sequence[str]) -> Tuple[List[Sequence[str]], List[int], List[int]]:
+        r"""
+        Splits (or truncates) the oversized texts, and packs the pieces into batches by the token budget of requests,
+        or by the number of texts only without a budget.
+
+        Returns:
+            batches: the batches of the pieces.
+            owners: the index of the text of each piece.
+            lengths: the number of tokens of each piece, only counted for the split pieces without a budget.
+        """
+        counter = self._get_counter()
+        if self._max_tokens_per_request > 0:
+            text_lengths = counter.count_many(texts)
+        else:  # a token has at least one byte, thus only the longer texts may exceed the input budget
+            text_lengths = [0] * len(texts)
+            long_ids = [i for i, text in enumerate(texts) if len(text.encode("utf-8")) > self._max_tokens_per_input]
+            for i, length in zip(long_ids, counter.count_many([texts[i] for i in long_ids])):
+                text_lengths[i] = length
+
+        pieces, owners, lengths = [], [], []
+        for i, (text, length) in enumerate(zip(texts, text_lengths)):
+            if length <= self._max_tokens_per_input:
+                pieces.append(text)
+                owners.append(i)
+                lengths.append(length)
+                continue
+
+            text_pieces = counter.split_tokens(text, self._max_tokens_per_input)
+            if self._oversized == "truncate":
+                text_pieces = text_pieces[:1]
+
+            for piece in text_pieces:
+                pieces.append(piece)
+                owners.append(i)
+                lengths.append(counter(piece))
+
+        if self._max_tokens_per_request > 0:
+            ranges = pack_by_tokens(lengths, self._max_tokens_per_request, self._batch_size)
+        else:
+            ranges = [(i, min(i + self._batch_size, len(pieces))) for i in range(0, len(pieces), self._batch_size)]
+
+        return [pieces[start:end] for start, end in ranges], owners, lengths
+
+    def _merge_batches(
+        self,
+        texts: Sequence[str],
+        results: Sequence[Embeddings],
+        owners: List[int],
+        lengths: List[int],
+    ) -> Embeddings:
+        if self._as_numpy:
+            embeddings = np.concatenate(results) if results else np.empty((0, 0), dtype=np.float32)
+        else:
+            embeddings = [embedding for result in results for embedding in result]
+
+        if len(owners) == len(texts):  # no text was split
+            return embeddings
+
+        grouped: List[List[int]] = [[] for _ in texts]
+        for piece_id, owner in enumerate(owners):
+            grouped[owner].append(piece_id)
+
+        return self._stack(
+            [
+                embeddings[ids[0]]
+                if len(ids) == 1
+                else _average([embeddings[j] for j in ids], [lengths[j] for j in ids])
+                for ids in grouped
+            ]
+        )
+
+    def _embed(self, texts: Sequence[str]) -> Embeddings:
+        batches, owners, lengths = self._split_batches(texts)
+        if self._concurrency <= 1 or len(batches) <= 1:
+            results = [self._get_embeddings(batch) for batch in batches]
+        else:  # keeps up to `concurrency` requests in flight, the results are collected in order
+            with ThreadPoolExecutor(max_workers=min(self._concurrency, len(batches))) as executor:
+                results = list(executor.map(self._get_embeddings, batches))
+
+        return self._merge_batches(texts, results, owners, lengths)
+
+    async def _aembed(self, texts: Sequence[str]) -> Embeddings:
+        batches, owners, lengths = self._split_batches(texts)
+        # the requests in flight are limited by the shared limiter, the results are gathered in order
+        results = await asyncio.gather(*[self._aget_embeddings(batch) for batch in batches])
+        return self._merge_batches(texts, results, owners, lengths)
+
+    def _lookup(self, texts: Sequence[str]) -> Tuple[List[bytes], List[Optional[Any]], Dict[bytes, int]]:
+        r"""
+        Looks up the cache.
+
+        Returns:
+            keys: the cache keys of the texts.
+            embeddings: the cached embeddings, None for the misses.
+            missing_ids: the index of the first occurrence of each missing key, only these texts are sent.
+        """
+        keys = [EmbedCache.key(self._model, text) for text in texts]
+        embeddings = self._cache.get_many(keys)
+        missing_ids: Dict[bytes, int] = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None and keys[i] not in missing_ids:
+                missing_ids[keys[i]] = i
+
+        return keys, embeddings, missing_ids
+
+    def _fill(
+        self,
+        keys: List[bytes],
+        embeddings: List[Optional[Any]],
+        missing_ids: Dict[bytes, int],
+        new_embeddings: Embeddings,
+    ) -> Embeddings:
+        if missing_ids:
+            self._cache.put_many(list(zip(missing_ids.keys(), new_embeddings)))
+            key_to_embedding = dict(zip(missing_ids.keys(), new_embeddings))
+            embeddings = [
+                embedding if embedding is not None else key_to_embedding[key]
+                for key, embedding in zip(keys, embeddings)
+            ]
+
+        return self._stack(embeddings)
+
+    def batch_embed(self, texts: Sequence[str]) -> Embeddings:
+        # replace newlines, which can negatively affect performance
+        texts = [text.replace("\n", " ") for text in texts]
+        if self._cache is None:
+            return self._embed(texts)
+
+        keys, embeddings, missing_ids = self._lookup(texts)
+        new_embeddings = self._embed([texts[i] for i in missing_ids.values()]) if missing_ids else []
+        return self._fill(keys, embeddings, missing_ids, new_embeddings)
+
+    async def abatch_embed(self, texts: Sequence[str]) -> Embeddings:
+        texts = [text.replace("\n", " ") for text in texts]
+        if self._cache is None:
+            return await self._aembed(texts)
+
+        keys, embeddings, missing_ids = self._lookup(texts)  # the cache is local, thus looked up inline
+        new_embeddings = await self._aembed([texts[i] for i in missing_ids.values()]) if missing_ids else []
+        return self._fill(keys, embeddings, missing_ids, new_embeddings)
+
+    def cache_info(self) -> Optional[EmbedCacheInfo]:
+        r"""
+        Returns the hit/miss statistics of the embedding cache in this process, None if the cache is disabled.
+        """
+        return self._cache.info() if self._cache is not None else None
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .schema import Embedder, Embeddings
+
+
+class _Request(NamedTuple):
+    texts: Sequence[str]
+    future: "Future[Embeddings]"
+
+
+class MicroBatcher(Embedder):
+    r"""
+    Coalesces the small embedding requests arriving within a short window into one call of the embedder,
+    and fans the results back out, thus many concurrent queries cost a few API calls instead of one each.
+
+    The requests are collected by a background thread, and the coalesced batches are embedded in a thread pool,
+    thus a slow batch does not delay the collection of the next one. Both the sync and async callers are batched.
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        max_wait: Optional[float] = 0.005,
+        max_batch_size: Optional[int] = 64,
+        max_concurrency: Optional[int] = 4,
+    ) -> None:
+        r"""
+        Initializes a micro-batcher.
+
+        Args:
+            embedder: the embedder to call with the coalesced batches.
+            max_wait: the max seconds a request waits for the others after the first one of a batch.
+            max_batch_size: the max number of texts of a batch, the larger requests are not batched.
+            max_concurrency: the max number of batches being embedded at the same time.
+        """
+        self._embedder = embedder
+        self._max_wait = max_wait
+        self._max_batch_size = max_batch_size
+        self._max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue[_Request]"
+        self._executor: ThreadPoolExecutor
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():  # the threads are not inherited by forked children
+                self._queue = queue.Queue()
+                self._executor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+                threading.Thread(target=self._collect, args=(self._queue, self._executor), daemon=True).start()
+                self._pid = os.getpid()
+
+    def _collect(self, requests_queue: "queue.Queue[_Request]", executor: ThreadPoolExecutor) -> None:
+        while True:
+            requests = [requests_queue.get()]
+            size = len(requests[0].texts)
+            deadline = time.monotonic() + self._max_wait
+            while size < self._max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+
+                try:
+                    request = requests_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                requests.append(request)
+                size += len(request.texts)
+
+            executor.submit(self._flush, requests)
+
+    def _flush(self, requests: List[_Request]) -> None:
+        text_to_id: Dict[str, int] = {}  # the same query of concurrent users is embedded once
+        for request in requests:
+            for text in request.texts:
+                text_to_id.setdefault(text, len(text_to_id))
+
+        try:
+            embeddings = self._embedder.batch_embed(list(text_to_id.keys()))
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+
+            return
+
+        for request in requests:
+            ids = [text_to_id[text] for text in request.texts]
+            if isinstance(embeddings, list):
+                request.future.set_result([embeddings[i] for i in ids])
+            else:
+                request.future.set_result(embeddings[ids])
+
+    def _submit(self, texts: Sequence[str]) -> "Future[Embeddings]":
+        self._start()
+        future: "Future[Embeddings]" = Future()
+        self._queue.put(_Request(texts=texts, future=future))
+        return future
+
+    def batch_embed(self, texts: Sequence[str]) -> Embeddings:
+        if len(texts) >= self._max_batch_size:
+            return self._embedder.batch_embed(texts)
+
+        return self._submit(texts).result()
+
+    async def abatch_embed(self, texts: Sequence[str]) -> Embeddings:
+        if len(texts) >= self._max_batch_size:
+            return await self._embedder.abatch_embed(texts)
+
+        return await asyncio.wrap_future(self._submit(texts))
@@ -0,0 +1,253 @@
+import json
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, List, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from ..common import BaseMessage
+from ..utils.cache_utils import LRUCache, hash_text
+
+
+if TYPE_CHECKING:
+    from ..storage.schema import Storage
+    from ..vectorstore.schema import Condition, Operator, VectorStore
+
+
+class CachedResponse(BaseModel):
+    key: str  # the hash of the model, the messages and the request arguments
+    context: str  # the hash of the above except the last message, only the queries in the same context are similar
+    query: str
+    response: str
+    created_at: float
+
+
+class ResponseCacheInfo(NamedTuple):
+    exact_hits: int
+    similar_hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / total if total > 0 else 0.0
+
+
+def replay_stream(response: str) -> Generator[str, None, None]:
+    r"""
+    Replays a cached response as a stream of word-sized pieces.
+    """
+    for piece in re.findall(r"\s*\S+|\s+$", response):
+        yield piece
+
+
+class ResponseCache:
+    r"""
+    A semantic cache of the chat responses, looked up by the exact hash of the request first, and then by
+    the similarity of the last message among the requests sharing the same model, previous messages and arguments.
+
+    The responses are stored in a vector store, and by their hashes in a key-value storage if configured, thus the
+    exact hits survive the restarts without a similarity search. The recent ones are also kept in memory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: Optional[float] = 0.1,
+        ttl: Optional[float] = None,
+        maxsize: Optional[int] = 1024,
+        vectorstore: Optional["VectorStore[CachedResponse]"] = None,
+        storage: Optional["Storage[CachedResponse]"] = None,
+        validate: Optional[Callable[[Sequence[BaseMessage], CachedResponse], bool]] = None,
+    ) -> None:
+        r"""
+        Initializes a response cache.
+
+        Args:
+            name: the name of the vector store.
+            threshold: the max distance (in the score of the vector store) of a similar query.
+            ttl: the seconds a response stays valid, None to never expire.
+            maxsize: the number of responses kept in memory.
+            vectorstore: the vector store of the responses, defaults to the auto vector store, note that Milvus
+                limits the length of the string fields.
+            storage: the key-value storage of the responses by their hashes, defaults to the auto storage if
+                `STORAGE` is set.
+            validate: the hook to reject a cached response of the messages, the rejected one is invalidated.
+        """
+        from ..storage import AutoStorage
+        from ..storage.config import settings as storage_settings
+        from ..vectorstore import AutoVectorStore  # the vector stores depend on the embedders of this package
+
+        self._vectorstore = vectorstore if vectorstore is not None else AutoVectorStore[CachedResponse](name=name)
+        if storage is None and storage_settings.storage is not None:
+            storage = AutoStorage[CachedResponse](name=name)
+
+        self._storage = storage
+        self._threshold = threshold
+        self._ttl = ttl
+        self._memory = LRUCache[CachedResponse](maxsize=maxsize)
+        self._validate = validate
+        self._lock = threading.Lock()
+        self._exact_hits = 0
+        self._similar_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _hash(model: str, messages: Sequence[BaseMessage], kwargs: Dict[str, Any]) -> str:
+        request = {"model": model, "messages": [message.model_dump() for message in messages], "kwargs": kwargs}
+        return hash_text(json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)).hex()
+
+    def _keys(self, model: str, messages: Sequence[BaseMessage], kwargs: Dict[str, Any]) -> Tuple[str, str, str]:
+        return self._hash(model, messages, kwargs), self._hash(model, messages[:-1], kwargs), messages[-1].content
+
+    def _condition(self, key: str, value: Any, op: Optional["Operator"] = None) -> "Condition":
+        from ..vectorstore import AutoCondition
+        from ..vectorstore.schema import Operator
+
+        return AutoCondition(key=key, value=value, op=op if op is not None else Operator.Eq)
+
+    def _drop(self, key: str) -> None:
+        self._memory.put(key, None)  # a tombstone, read as a miss
+        if self._storage is not None:
+            self._storage.delete(key)
+
+        try:
+            self._vectorstore.delete(self._condition("key", key))
+        except ValueError:  # nothing cached yet
+            pass
+
+    def _is_fresh(self, entry: CachedResponse) -> bool:
+        return self._ttl is None or time.time() - entry.created_at <= self._ttl
+
+    def _select(self, key: str, hits: List[Tuple[CachedResponse, float]]) -> Tuple[Optional[CachedResponse], bool]:
+        fresh_hits = [(entry, score) for entry, score in hits if self._is_fresh(entry)]
+        for entry, _ in fresh_hits:
+            if entry.key == key:
+                return entry, True
+
+        for entry, score in fresh_hits:
+            if score <= self._threshold:
+                return entry, False
+
+        return None, False
+
+    def _accept(self, messages: Sequence[BaseMessage], entry: Optional[CachedResponse], exact: bool) -> Optional[str]:
+        if entry is not None and self._validate is not None and not self._validate(messages, entry):
+            self._drop(entry.key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            elif exact:
+                self._exact_hits += 1
+            else:
+                self._similar_hits += 1
+
+        return entry.response if entry is not None else None
+
+    @staticmethod
+    def cacheable(messages: Sequence[BaseMessage], kwargs: Dict[str, Any]) -> bool:
+        r"""
+        Checks if the request can be cached: a text query without tools.
+        """
+        return len(messages) > 0 and isinstance(messages[-1].content, str) and "tools" not in kwargs
+
+    def lookup(self, model: str, messages: Sequence[BaseMessage], **kwargs) -> Optional[str]:
+        r"""
+        Looks up the cached response of the request.
+
+        Args:
+            model: the name of the chat model.
+            messages: the messages of the request.
+            kwargs: the other arguments of the request.
+
+        Returns:
+            response: the cached response, None if not found.
+        """
+        key, context, query = self._keys(model, messages, kwargs)
+        entry = self._memory.get(key)
+        if entry is None and self._storage is not None:
+            entry = self._storage.query(key)
+            if entry is not None:
+                self._memory.put(key, entry)
+
+        if entry is not None and self._is_fresh(entry):
+            return self._accept(messages, entry, True)
+
+        try:
+            hits = self._vectorstore.search(query, top_k=4, condition=self._condition("context", context))
+        except ValueError:  # nothing cached yet
+            hits = []
+
+        return self._accept(messages, *self._select(key, hits))
+
+    async def alookup(self, model: str, messages: Sequence[BaseMessage], **kwargs) -> Optional[str]:
+        key, context, query = self._keys(model, messages, kwargs)
+        entry = self._memory.get(key)
+        if entry is None and self._storage is not None:
+            entry = await self._storage.aquery(key)
+            if entry is not None:
+                self._memory.put(key, entry)
+
+        if entry is not None and self._is_fresh(entry):
+            return self._accept(messages, entry, True)
+
+        try:
+            hits = await self._vectorstore.asearch(query, top_k=4, condition=self._condition("context", context))
+        except ValueError:  # nothing cached yet
+            hits = []
+
+        return self._accept(messages, *self._select(key, hits))
+
+    def put(self, model: str, messages: Sequence[BaseMessage], response: str, **kwargs) -> None:
+        r"""
+        Caches the response of the request.
+
+        Args:
+            model: the name of the chat model.
+            messages: the messages of the request.
+            response: the response to cache.
+            kwargs: the other arguments of the request.
+        """
+        key, context, query = self._keys(model, messages, kwargs)
+        entry = CachedResponse(key=key, context=context, query=query, response=response, created_at=time.time())
+        self._memory.put(key, entry)
+        if self._storage is not None:
+            self._storage.insert([key], [entry])
+
+        self._vectorstore.insert([query], [entry])
+
+    def invalidate(self, model: str, messages: Sequence[BaseMessage], **kwargs) -> None:
+        r"""
+        Drops the cached response of the request.
+        """
+        self._drop(self._keys(model, messages, kwargs)[0])
+
+    def evict_expired(self) -> None:
+        r"""
+        Drops the expired responses from the vector store.
+        """
+        if self._ttl is not None:
+            from ..vectorstore.schema import Operator
+
+            try:
+                self._vectorstore.delete(self._condition("created_at", time.time() - self._ttl, Operator.Lt))
+            except ValueError:  # nothing cached yet
+                pass
+
+    def clear(self) -> None:
+        r"""
+        Drops all the cached responses.
+        """
+        self._memory.clear()
+        if self._storage is not None and self._storage.exists():
+            self._storage.destroy()
+
+        if self._vectorstore.exists():
+            self._vectorstore.destroy()
+
+    def info(self) -> ResponseCacheInfo:
+        with self._lock:
+            return ResponseCacheInfo(self._exact_hits, self._similar_hits, self._misses)
@@ -0,0 +1,38 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, List, Sequence, Union
+
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+
+Embeddings = Union[List[List[float]], "NDArray[np.float32]"]  # a list of vectors or a (num_texts, dim) matrix
+
+
+class Embedder(ABC):
+    @abstractmethod
+    def batch_embed(self, texts: Sequence[str]) -> Embeddings:
+        r"""
+        Embeds the texts.
+
+        Args:
+            texts: the texts to embed.
+
+        Returns:
+            embeddings: the embeddings of the texts, in the same order.
+        """
+        ...
+
+    async def abatch_embed(self, texts: Sequence[str]) -> Embeddings:
+        r"""
+        Embeds the texts without blocking the event loop, runs `batch_embed` in a thread by default.
+
+        Args:
+            texts: the texts to embed.
+
+        Returns:
+            embeddings: the embeddings of the texts, in the same order.
+        """
+        return await asyncio.to_thread(self.batch_embed, texts)
@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from ..utils.cache_utils import CacheInfo, LRUCache, hash_text
 from ..utils.import_utils import is_tiktoken_available, is_transformers_available
 from .config import settings
 
@@ -11,18 +12,100 @@ if is_transformers_available():
     from transformers import AutoTokenizer
 
 
+_token_caches: Dict[Tuple[str, int], LRUCache[int]] = {}  # shared by the counters of a process
+
+
+def _get_token_cache(name: str, cache_size: int) -> Optional[LRUCache[int]]:
+    if cache_size <= 0:
+        return None
+
+    if (name, cache_size) not in _token_caches:
+        _token_caches[(name, cache_size)] = LRUCache[int](maxsize=cache_size)
+
+    return _token_caches[(name, cache_size)]
+
+
 class TokenCounter:
-    def __init__(self, model: Optional[str] = None) -> None:
+    def __init__(self, model: Optional[str] = None, cache_size: Optional[int] = None) -> None:
         if settings.hf_tokenizer_path is not None:
+            self._name = settings.hf_tokenizer_path
             self._encoding = AutoTokenizer.from_pretrained(
                 settings.hf_tokenizer_path,
                 trust_remote_code=True,
             )
         else:
-            self._encoding = tiktoken.encoding_for_model(model if model is not None else settings.default_chat_model)
+            self._name = model if model is not None else settings.default_chat_model
+            self._encoding = tiktoken.encoding_for_model(self._name)
 
-    def __call__(self, text: str) -> int:
+        self._cache_size = cache_size if cache_size is not None else settings.token_cache_size
+        self._cache = _get_token_cache(self._name, self._cache_size)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_cache"] = None  # re-attached to the cache of the unpickling process
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._cache = _get_token_cache(self._name, self._cache_size)
+
+    def _encode(self, text: str) -> int:
         if settings.hf_tokenizer_path is not None:
             return len(self._encoding.tokenize(text))
         else:
             return len(self._encoding.encode(text))
+
+    def _encode_batch(self, texts: List[str]) -> List[int]:
+        if settings.hf_tokenizer_path is not None:
+            return [len(ids) for ids in self._encoding(texts, add_special_tokens=False)["input_ids"]]
+        else:
+            return [len(ids) for ids in self._encoding.encode_batch(texts)]
+
+    def split_tokens(self, text: str, max_tokens: int) -> List[str]:
+        r"""
+        Splits the text into pieces of at most `max_tokens` tokens, the first piece is the truncated text.
+        """
+        if settings.hf_tokenizer_path is not None:
+            ids = self._encoding(text, add_special_tokens=False)["input_ids"]
+        else:
+            ids = self._encoding.encode(text)
+
+        return [self._encoding.decode(ids[i : i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+
+    def __call__(self, text: str) -> int:
+        if self._cache is None:
+            return self._encode(text)
+
+        key = hash_text(text)
+        count = self._cache.get(key)
+        if count is None:
+            count = self._encode(text)
+            self._cache.put(key, count)
+
+        return count
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        r"""
+        Counts the tokens of a batch of texts with a single batched call of the tokenizer.
+        """
+        if len(texts) == 0:
+            return []
+
+        if self._cache is None:
+            return self._encode_batch(list(texts))
+
+        keys = [hash_text(text) for text in texts]
+        counts = [self._cache.get(key) for key in keys]
+        missing_ids = [i for i, count in enumerate(counts) if count is None]
+        if missing_ids:
+            for i, count in zip(missing_ids, self._encode_batch([texts[i] for i in missing_ids])):
+                counts[i] = count
+                self._cache.put(keys[i], count)
+
+        return counts
+
+    def cache_info(self) -> Optional[CacheInfo]:
+        r"""
+        Returns the hit/miss statistics of the token count cache in this process, None if the cache is disabled.
+        """
+        return self._cache.info() if self._cache is not None else None
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from ..logging import get_logger
 from ..vectorstore import AutoVectorStore
@@ -23,9 +23,9 @@ class DenseRetriever(Retriever[T]):
         self._threshold = threshold
         self._verbose = verbose
 
-    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+    def _filter_hits(self, hits_with_scores: List[Tuple[T, float]]) -> List[T]:
         results = []
-        for hit, score in self._vectorstore.search(query, top_k, condition):
+        for hit, score in hits_with_scores:
             if self._verbose:
                 logger.info("Hit with score {:.4f}".format(score))
 
@@ -33,3 +33,11 @@ class DenseRetriever(Retriever[T]):
                 results.append(hit)
 
         return results
+
+    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+        return self._filter_hits(self._vectorstore.search(query, top_k, condition))
+
+    async def aretrieve(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[T]:
+        return self._filter_hits(await self._vectorstore.asearch(query, top_k, condition))
@@ -1,4 +1,5 @@
-from typing import TYPE_CHECKING, List, Optional
+import asyncio
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from ..logging import get_logger
 from ..storage import AutoStorage
@@ -38,14 +39,13 @@ class HybridRetriever(Retriever[T]):
         self._threshold = threshold
         self._verbose = verbose
 
-    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+    def _combine(self, sparse_hits: List[Tuple[T, float]], dense_hits: List[Tuple[T, float]], top_k: int) -> List[T]:
         # First step: Get candidate documents using sparse retrieval
-        sparse_top_k = top_k * self._sparse_multiplier
         candidates = []
         seen_docs = set()
         
         # Get initial candidates from sparse retrieval
-        for hit, score in self._storage.search(query, sparse_top_k):
+        for hit, score in sparse_hits:
             if self._verbose:
                 logger.info("Sparse hit with score {:.4f}".format(score))
             
@@ -60,7 +60,7 @@ class HybridRetriever(Retriever[T]):
         if candidates:
             # Create a condition to only search within candidate documents
             # Note: This assumes the vectorstore supports searching within specific documents
-            for hit, score in self._vectorstore.search(query, top_k, condition):
+            for hit, score in dense_hits:
                 if self._verbose:
                     logger.info("Dense hit with score {:.4f}".format(score))
 
@@ -68,3 +68,18 @@ class HybridRetriever(Retriever[T]):
                     results.append(hit)
 
         return results[:top_k]
+
+    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+        sparse_hits = self._storage.search(query, top_k * self._sparse_multiplier)
+        dense_hits = self._vectorstore.search(query, top_k, condition) if sparse_hits else []
+        return self._combine(sparse_hits, dense_hits, top_k)
+
+    async def aretrieve(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[T]:
+        # the dense search does not depend on the sparse candidates, thus both are searched concurrently
+        sparse_hits, dense_hits = await asyncio.gather(
+            self._storage.asearch(query, top_k * self._sparse_multiplier),
+            self._vectorstore.asearch(query, top_k, condition),
+        )
+        return self._combine(sparse_hits, dense_hits, top_k)
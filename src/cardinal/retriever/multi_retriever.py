@@ -1,5 +1,6 @@
+import asyncio
 from collections import defaultdict
-from typing import TYPE_CHECKING, Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from ..logging import get_logger
 from ..vectorstore import AutoVectorStore
@@ -57,15 +58,15 @@ class MultiRetriever(Retriever[T]):
         results = sorted(rrf_scores.keys(), key=lambda x: rrf_scores[x], reverse=True)
         return results
 
-    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+    def _fuse_hits(self, all_hits_with_scores: List[List[Tuple[T, float]]], top_k: int) -> List[T]:
         hit_id = 0
         id_to_hit: Dict[int, T] = {}
         feat_to_id: Dict[str, int] = {}
         all_hit_ids: List[List[int]] = []
-        for vectorstore in self._vectorstores:
+        for hits_with_scores in all_hits_with_scores:
             current_feats: Set[str] = set()
             hit_ids: List[int] = []
-            for hit, score in vectorstore.search(query, top_k=max(8, top_k * 2), condition=condition):
+            for hit, score in hits_with_scores:
                 if self._verbose:
                     logger.info("Hit with score {:.4f}".format(score))
 
@@ -87,3 +88,21 @@ class MultiRetriever(Retriever[T]):
         results = [id_to_hit[hit_id] for hit_id in fused_ids]
 
         return results
+
+    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+        all_hits_with_scores = [
+            vectorstore.search(query, top_k=max(8, top_k * 2), condition=condition)
+            for vectorstore in self._vectorstores
+        ]
+        return self._fuse_hits(all_hits_with_scores, top_k)
+
+    async def aretrieve(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[T]:
+        all_hits_with_scores = await asyncio.gather(
+            *[
+                vectorstore.asearch(query, top_k=max(8, top_k * 2), condition=condition)
+                for vectorstore in self._vectorstores
+            ]
+        )  # the vector stores are searched concurrently, thus the latency is the max rather than the sum
+        return self._fuse_hits(all_hits_with_scores, top_k)
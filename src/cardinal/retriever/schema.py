@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Generic, List, Optional, TypeVar
 
@@ -26,3 +27,19 @@ class Retriever(Generic[T], ABC):
             results: the retrieved results.
         """
         ...
+
+    async def aretrieve(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[T]:
+        r"""
+        Performs a search on a query without blocking the event loop, runs `retrieve` in a thread by default.
+
+        Args:
+            query: the query string being searched.
+            top_k: the number of results to return.
+            condition: the conditional expression.
+
+        Returns:
+            results: the retrieved results.
+        """
+        return await asyncio.to_thread(self.retrieve, query, top_k, condition)
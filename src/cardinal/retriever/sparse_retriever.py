@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from ..logging import get_logger
 from ..storage import AutoStorage
@@ -17,15 +17,26 @@ class SparseRetriever(Retriever[T]):
         self._storage = AutoStorage[T](name=storage_name)
         self._verbose = verbose
 
-    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
-        if condition is not None:
-            raise ValueError("Condition is not applicable in sparse retriever.")
-
+    def _collect_hits(self, hits_with_scores: List[Tuple[T, float]]) -> List[T]:
         results = []
-        for hit, score in self._storage.search(query, top_k):
+        for hit, score in hits_with_scores:
             if self._verbose:
                 logger.info("Hit with score {:.4f}".format(score))
 
             results.append(hit)
 
         return results
+
+    def retrieve(self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None) -> List[T]:
+        if condition is not None:
+            raise ValueError("Condition is not applicable in sparse retriever.")
+
+        return self._collect_hits(self._storage.search(query, top_k))
+
+    async def aretrieve(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[T]:
+        if condition is not None:
+            raise ValueError("Condition is not applicable in sparse retriever.")
+
+        return self._collect_hits(await self._storage.asearch(query, top_k))
@@ -1,102 +1,465 @@
+import math
+import os
 import re
-from typing import List, Optional
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, Generator, Iterable, List, Optional, Tuple, Union
 
 from ..logging import get_logger
-from ..model import TokenCounter
+from ..model import TokenCounter, TokenEstimator
 from .config import settings
 
 
 logger = get_logger(__name__)
 
 
+Span = Tuple[int, int]  # the (start, end) character offsets in the text
+
+
+_CJK_PUNCTUATION_RUN = re.compile(r"[。！？；…\n][。！？；…’”\n]*")  # starts with a charset for a fast scan
+_CJK_STOP = re.compile(r"[。！？；]|…{2}")
+_CJK_LINE_BREAKS = re.compile(r"\n{3,}")
+_CJK_SPACES = re.compile(r" {3,}")
+
+
 class TextSplitter:
     r"""
     Modified from:
     https://github.com/langchain-ai/langchain/blob/v0.1.5/libs/langchain/langchain/text_splitter.py
+
+    The splits are represented by character offsets into the original text, strings are only created
+    for token counting and for the final chunks.
+
+    In the approximate mode, the token counts are estimated from the character classes with the weights
+    calibrated on the first text, and only the splits and chunks close to the chunk size are counted exactly.
+
+    By default, a split is appended to the merged text if the stripped merged text directly followed by the split
+    fits in the chunk size, as the separator is not counted, a chunk may exceed the chunk size by a few tokens.
+    With `count_separators`, the merged text is measured with the separator as in the chunk, thus the chunks never
+    exceed the chunk size unless a single split does.
     """
 
-    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> None:
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        approximate: Optional[bool] = False,
+        count_separators: Optional[bool] = False,
+    ) -> None:
         self._separators = ["\n\n", "\n", ". ", ", ", " ", ""]
         self._chunk_size = chunk_size if chunk_size is not None else settings.default_chunk_size
         self._chunk_overlap = chunk_overlap if chunk_overlap is not None else settings.default_chunk_overlap
         assert self._chunk_overlap < self._chunk_size, "chunk overlap must be larger than chunk size"
         self._counter = TokenCounter()
+        self._joint_window = 16
+        self._prefix_batch_size = 32
+        self._count_batch_size = 256
+        self._estimator = TokenEstimator(self._counter) if approximate else None
+        self._margin = 0  # the estimates within the margin of the chunk size are counted exactly
+        self._calibration_size = 1 << 16
+        self._count_separators = count_separators
 
-    @staticmethod
-    def _split_text(text: str, separator: str) -> List[str]:
-        splits = text.split(separator) if separator else list(text)  # do not use re.split
-        return [split for split in splits if split]
+    def _split_text(self, text: str, start: int, end: int, level: int) -> Generator[Span, None, None]:
+        separator = self._separators[level]
+        if not separator:
+            for i in range(start, end):
+                yield (i, i + 1)
+            return
+
+        while start < end:  # do not use re.split
+            index = text.find(separator, start, end)
+            if index == -1:
+                index = end
+
+            if index > start:
+                yield (start, index)
+
+            start = index + len(separator)
 
     @staticmethod
-    def _join_docs(docs: List[str], separator: str) -> str:
-        return separator.join(docs).strip()
+    def _strip_span(text: str, start: int, end: int) -> Span:
+        while start < end and text[start].isspace():
+            start += 1
+
+        while end > start and text[end - 1].isspace():
+            end -= 1
+
+        return (start, end)
 
     def _count(self, text: str) -> int:
         return self._counter(text)
 
-    def _merge(self, splits: List[str], separator: str) -> List[str]:
+    def _count_many(self, texts: List[str]) -> List[float]:
+        if self._estimator is not None:
+            return self._estimator.estimate_many(texts)  # not rounded, thus the sums do not drift
+
+        return self._counter.count_many(texts)
+
+    def _near_boundary(self, length: float) -> bool:
+        return self._estimator is not None and abs(length - self._chunk_size) <= self._margin
+
+    def _calibrate(self, text: str) -> None:
+        r"""
+        Calibrates the token estimator on chunk-sized pieces of the (first) text in the approximate mode.
+        """
+        if self._estimator is None or self._estimator.calibrated:
+            return
+
+        piece_size = self._chunk_size * 4
+        sample = text[: self._calibration_size]
+        error = self._estimator.calibrate([sample[i : i + piece_size] for i in range(0, len(sample), piece_size)])
+        self._margin = math.ceil(self._chunk_size * error) + 1
+        logger.info(
+            "Calibrated token estimator: max error {:.2%}, mean error {:.2%}, exact counting within {} tokens.".format(
+                error, self._estimator.mean_error, self._margin
+            )
+        )
+
+    def _count_splits(self, text: str, splits: Iterable[Span]) -> Generator[Tuple[Span, int], None, None]:
+        splits = iter(splits)
+        while True:
+            batch = list(islice(splits, self._count_batch_size))  # bounds the number of live substrings
+            if not batch:
+                return
+
+            lengths = self._count_many([text[start:end] for start, end in batch])
+            exact_ids = [i for i, length in enumerate(lengths) if self._near_boundary(length)]
+            if exact_ids:
+                exact_lengths = self._counter.count_many([text[batch[i][0] : batch[i][1]] for i in exact_ids])
+                for i, length in zip(exact_ids, exact_lengths):
+                    lengths[i] = length
+
+            yield from zip(batch, lengths)
+
+    def _joint_counts(self, text: str, splits: List[Span], lengths: List[int]) -> Tuple[List[float], List[float]]:
+        r"""
+        Returns the number of tokens added (or merged away) by joining each split with the previous one, with the
+        separator as in the chunks, and without it as the merged text is measured before appending a split, i.e.
+        the merged text stripped and directly followed by the split.
+
+        Tokenizers only merge across the separators locally, so it is measured on a short window around the joint.
+        The characters merge with the whole word they belong to instead, see `_merge_chars`.
+        """
+        window = self._joint_window
+        head_lengths, tail_lengths = list(lengths), list(lengths)
+        long_ids = [i for i, (start, end) in enumerate(splits) if end - start > window]
+        if long_ids:
+            heads = [text[splits[i][0] : splits[i][0] + window] for i in long_ids]
+            tails = [text[splits[i][1] - window : splits[i][1]] for i in long_ids]
+            counts = self._count_many(heads + tails)
+            for i, head_length, tail_length in zip(long_ids, counts, counts[len(long_ids) :]):
+                head_lengths[i], tail_lengths[i] = head_length, tail_length
+
+        joined, contexts, appended = [], [], []
+        for i, ((left_start, left_end), (right_start, right_end)) in enumerate(zip(splits, splits[1:])):
+            left, right = max(left_start, left_end - window), min(right_end, right_start + window)
+            joined.append(text[left:right])
+            # measured after the previous split, the merged text of a single split is counted exactly instead
+            context = max(splits[i - 1][0] if i > 0 else left_start, left_end - window)
+            contexts.append(text[context:left_end])
+            appended.append(text[context:left_end].rstrip() + text[right_start:right])
+
+        num_joints = len(joined)
+        counts = self._count_many(joined + contexts + appended)
+        joints, appends = [0], [0]
+        for i in range(num_joints):
+            joints.append(counts[i] - tail_lengths[i] - head_lengths[i + 1])
+            appends.append(counts[2 * num_joints + i] - counts[num_joints + i] - head_lengths[i + 1])
+
+        return joints, appends
+
+    def _strip_counts(self, text: str, splits: List[Span]) -> Tuple[Dict[int, float], Dict[int, float]]:
+        r"""
+        Returns the number of tokens removed by stripping the leading and the trailing spaces of the splits,
+        only the splits starting or ending with spaces are counted.
+        """
+        window = self._joint_window
+        head_ids = [i for i, (start, end) in enumerate(splits) if text[start].isspace()]
+        tail_ids = [i for i, (start, end) in enumerate(splits) if text[end - 1].isspace()]
+        heads = [text[splits[i][0] : min(splits[i][1], splits[i][0] + window)] for i in head_ids]
+        tails = [text[max(splits[i][0], splits[i][1] - window) : splits[i][1]] for i in tail_ids]
+        counts = self._count_many(heads + tails + [head.lstrip() for head in heads] + [tail.rstrip() for tail in tails])
+        num_edges = len(heads) + len(tails)
+        deltas = [count - stripped_count for count, stripped_count in zip(counts[:num_edges], counts[num_edges:])]
+        return dict(zip(head_ids, deltas)), dict(zip(tail_ids, deltas[len(heads) :]))
+
+    def _merge(self, text: str, splits: List[Span], lengths: List[int]) -> List[Span]:
+        merged_docs = []
+        inprocess_docs: Deque[int] = deque()  # the indices of the splits
+        joints, appends = self._joint_counts(text, splits, lengths)
+        leads, trails = self._strip_counts(text, splits)
+        total = 0  # the token count of the text covered by the in-process docs, before stripping
+
+        def stripped(first: int, last: int) -> str:
+            return text[slice(*self._strip_span(text, splits[first][0], splits[last][1]))]
+
+        for i, (split, length) in enumerate(zip(splits, lengths)):
+            if inprocess_docs:
+                first, last = inprocess_docs[0], inprocess_docs[-1]
+                if self._count_separators:  # the merged text with the split as in the chunk
+                    size = total + joints[i] + length
+                    if self._near_boundary(size):  # the estimate may be wrong either way
+                        size = self._count(text[splits[first][0] : split[1]])
+                else:  # the stripped merged text directly followed by the split
+                    size = total - leads.get(first, 0) + appends[i] + length
+                    if self._near_boundary(size) or first == last:  # the joint of a single split is not in context
+                        size = self._count(stripped(first, last) + text[split[0] : split[1]])
+
+                if size > self._chunk_size:
+                    merged_size = total - leads.get(first, 0) - trails.get(last, 0)
+                    if merged_size > self._chunk_size + self._chunk_overlap + self._margin:  # avoid too many warnings
+                        logger.warning("Created a chunk of size {} > {}".format(round(merged_size), self._chunk_size))
+
+                    merged_docs.append(self._strip_span(text, splits[first][0], splits[last][1]))
+                    if self._chunk_overlap == 0:
+                        inprocess_docs.clear()
+                        total = 0
+
+                    while inprocess_docs:
+                        first = inprocess_docs[0]
+                        merged_size = total - leads.get(first, 0) - trails.get(last, 0)
+                        if self._near_boundary(merged_size) or (first == last and (first in leads or last in trails)):
+                            merged_size = self._count(stripped(first, last))
+
+                        if merged_size <= self._chunk_overlap:
+                            break
+
+                        total -= lengths[inprocess_docs.popleft()]
+                        if inprocess_docs:
+                            total -= joints[inprocess_docs[0]]
+
+            total += joints[i] + length if inprocess_docs else length
+            inprocess_docs.append(i)
+
+        if len(inprocess_docs) > 0:
+            merged_docs.append(self._strip_span(text, splits[inprocess_docs[0]][0], splits[inprocess_docs[-1]][1]))
+
+        return merged_docs
+
+    def _merge_chars(self, text: str, splits: List[Span], lengths: List[int]) -> List[Span]:
+        r"""
+        Merges the characters of a word longer than the chunk size.
+
+        A character may merge with any number of the previous ones into a token, thus the joints are not local,
+        and the running merged text is counted instead. The counts of the extended texts are batched, and the
+        start of the text only moves when a chunk is emitted.
+        """
         merged_docs = []
-        inprocess_docs = []
-        for split in splits:
-            text = self._join_docs(inprocess_docs, separator)
-            if self._count(text + split) > self._chunk_size:
-                if self._count(text) > self._chunk_size + self._chunk_overlap:  # avoid too many warnings
-                    logger.warning("Created a chunk of size {} > {}".format(self._count(text), self._chunk_size))
+        inprocess_docs: Deque[Span] = deque()
+        sizes: Dict[int, float] = {}  # the token counts of the in-process text extended by the next splits
+        for i, split in enumerate(splits):
+            if inprocess_docs:
+                start = inprocess_docs[0][0]
+                if i not in sizes:
+                    ids = range(i, min(i + self._prefix_batch_size, len(splits)))
+                    texts = [self._append_text(text, start, splits[j - 1][1], splits[j]) for j in ids]
+                    sizes = dict(zip(ids, self._count_many(texts)))
 
-                if len(inprocess_docs) > 0:
-                    merged_docs.append(text)
+                size = sizes[i]
+                if self._near_boundary(size):
+                    size = self._count(self._append_text(text, start, splits[i - 1][1], split))
 
+                if size > self._chunk_size:
+                    merged_docs.append(self._strip_span(text, start, inprocess_docs[-1][1]))
                     if self._chunk_overlap == 0:
-                        inprocess_docs = []
+                        inprocess_docs.clear()
                     else:
-                        while self._count(text) > self._chunk_overlap:
-                            inprocess_docs.pop(0)
-                            text = self._join_docs(inprocess_docs, separator)
+                        self._pop_overlap(text, inprocess_docs)
+
+                    sizes = {}
 
             inprocess_docs.append(split)
 
         if len(inprocess_docs) > 0:
-            text = self._join_docs(inprocess_docs, separator)
-            merged_docs.append(text)
+            merged_docs.append(self._strip_span(text, inprocess_docs[0][0], inprocess_docs[-1][1]))
 
         return merged_docs
 
+    def _append_text(self, text: str, start: int, end: int, split: Span) -> str:
+        r"""
+        Returns the merged text of text[start:end] stripped and directly followed by the split.
+        """
+        start, end = self._strip_span(text, start, end)
+        return text[start:end] + text[split[0] : split[1]]
+
+    def _pop_overlap(self, text: str, inprocess_docs: Deque[Span]) -> None:
+        r"""
+        Pops the first docs until the remaining (stripped) text fits in the chunk overlap.
+        """
+        end = inprocess_docs[-1][1]
+        while inprocess_docs:
+            starts = [start for start, _ in islice(inprocess_docs, self._prefix_batch_size)]
+            for size in self._count_many([text[slice(*self._strip_span(text, start, end))] for start in starts]):
+                if self._near_boundary(size):
+                    size = self._count(text[slice(*self._strip_span(text, inprocess_docs[0][0], end))])
+
+                if size <= self._chunk_overlap:
+                    return
+
+                inprocess_docs.popleft()
+
+    def _normalize(self, text: str, final: Optional[bool] = True) -> str:
+        r"""
+        Normalizes the text before splitting, the final text reaches the end of the whole text.
+        """
+        return text
+
     def split(self, text: str) -> List[str]:
-        return self._split(text, self._separators)
+        text = self._normalize(text)
+        self._calibrate(text)
+        return [text[start:end] for start, end in self._split(text, 0, len(text), 0)]
+
+    def split_offsets(self, text: str) -> List[Span]:
+        r"""
+        Splits the text into chunks and returns their character offsets.
+
+        Args:
+            text: the text to split.
+
+        Returns:
+            offsets: the (start, end) offsets of the chunks, `text[start:end]` is the chunk.
+                For splitters normalizing the text (e.g. CJKTextSplitter), the offsets refer to the normalized text.
+        """
+        text = self._normalize(text)
+        self._calibrate(text)
+        return self._split(text, 0, len(text), 0)
+
+    @staticmethod
+    def _find_cut(text: str) -> int:
+        r"""
+        Finds the position after the last run of line breaks (preferring paragraphs) to cut the window.
+        """
+        limit = len(text.rstrip("\n"))  # a trailing run of line breaks may continue in the next window
+        for separator in ["\n\n", "\n"]:
+            index = text.rfind(separator, 0, limit)
+            if index != -1:
+                while text[index] == "\n":
+                    index += 1
+
+                return index
+
+        return len(text)
+
+    def split_stream(self, stream: Iterable[str], window_size: Optional[int] = 1000000) -> Generator[str, None, None]:
+        r"""
+        Splits the text from an iterable of pieces into chunks, reading at most about `window_size` characters at once.
+
+        The last chunk of each window is carried over to the next window, thus the chunk overlap is kept
+        across the window boundaries.
+
+        Args:
+            stream: the pieces of the text, e.g. lines of a file.
+            window_size: the number of characters being split at once.
 
-    def _split(self, text: str, separators: List[str]) -> List[str]:
-        separators = separators[:]  #  deepcopy
-        separator = separators.pop(0)
+        Returns:
+            chunks: the generator of chunks.
+        """
+        carry = ""  # the normalized text carried over from the previous window
+        pieces, pending_size = [], 0
+        for piece in stream:
+            pieces.append(piece)
+            pending_size += len(piece)
+            if pending_size < window_size:
+                continue
 
-        splits = self._split_text(text, separator)
+            pending = "".join(pieces)
+            cut = self._find_cut(pending)
+            pieces, pending_size = [pending[cut:]], len(pending) - cut
+            text = carry + self._normalize(pending[:cut], final=False)
+            self._calibrate(text)
+            offsets = self._split(text, 0, len(text), 0)
+            if len(offsets) < 2:
+                carry = text
+                continue
+
+            for start, end in offsets[:-1]:
+                yield text[start:end]
+
+            carry = text[offsets[-1][0] :]
+
+        text = self._normalize(carry + "".join(pieces))
+        self._calibrate(text)
+        for start, end in self._split(text, 0, len(text), 0):
+            yield text[start:end]
+
+    def split_file(
+        self, path: Union[str, os.PathLike], encoding: Optional[str] = "utf-8", window_size: Optional[int] = 1000000
+    ) -> Generator[str, None, None]:
+        r"""
+        Splits a text file into chunks without loading the whole file into memory.
+
+        Args:
+            path: the path to the text file.
+            encoding: the encoding of the file.
+            window_size: the number of characters being split at once.
+
+        Returns:
+            chunks: the generator of chunks.
+        """
+        block_size = min(window_size, 1 << 16)
+        with open(path, "r", encoding=encoding) as f:
+            yield from self.split_stream(iter(lambda: f.read(block_size), ""), window_size)
+
+    def _split(self, text: str, start: int, end: int, level: int) -> List[Span]:
+        merge = self._merge if self._separators[level] else self._merge_chars
         final_chunks = []
-        good_splits = []
-        for split in splits:
-            if self._count(split) < self._chunk_size:
+        good_splits, good_lengths = [], []
+        for split, length in self._count_splits(text, self._split_text(text, start, end, level)):
+            if length < self._chunk_size:
                 good_splits.append(split)
+                good_lengths.append(length)
             else:
                 if good_splits:
-                    merged_text = self._merge(good_splits, separator)
+                    merged_text = merge(text, good_splits, good_lengths)
                     final_chunks.extend(merged_text)
-                    good_splits = []
-                if not separators:
+                    good_splits, good_lengths = [], []
+                if level + 1 == len(self._separators):
                     final_chunks.append(split)
                 else:
-                    extra_chunks = self._split(split, separators)
+                    extra_chunks = self._split(text, split[0], split[1], level + 1)
                     final_chunks.extend(extra_chunks)
 
         if good_splits:
-            merged_text = self._merge(good_splits, separator)
+            merged_text = merge(text, good_splits, good_lengths)
             final_chunks.extend(merged_text)
         return final_chunks
 
 
 class CJKTextSplitter(TextSplitter):
-    def split(self, text: str) -> List[str]:
-        text = re.sub(r"\n{3,}", r"\n", text)
-        text = re.sub(r" {3,}", r" ", text)
-        text = re.sub(r"([。！？；])([^’”])", r"\1\n\2", text)  # split with CJK stops
-        text = re.sub(r"(\…{2})([^’”])", r"\1\n\2", text)  # split with CJK ellipsis
-        text = re.sub(r"([。！？；][’”]{0,2})([^，。！？；])", r"\1\n\2", text)
-        text = text.rstrip()
-        return super().split(text)
+    r"""
+    Splits the text at the end of CJK sentences before the line breaks.
+
+    The sentence ends (a run of stops or an ellipsis with the closing quotes, unless followed by a comma)
+    and the blank lines are found in a single scan, and they share the top level of the separators.
+
+    The runs of three or more line breaks or spaces are collapsed into one before splitting, as before, thus the
+    offsets of `split_offsets` refer to the normalized text.
+    """
+
+    def _normalize(self, text: str, final: Optional[bool] = True) -> str:
+        text = _CJK_LINE_BREAKS.sub("\n", text)
+        text = _CJK_SPACES.sub(" ", text)
+        return text.rstrip() if final else text
+
+    def _split_text(self, text: str, start: int, end: int, level: int) -> Generator[Span, None, None]:
+        if level != 0:
+            yield from super()._split_text(text, start, end, level)
+            return
+
+        for match in _CJK_PUNCTUATION_RUN.finditer(text, start, end):
+            sentence_end = match.start() + len(match.group().rstrip("\n"))
+            separator_end = match.end()
+            if separator_end - sentence_end < 2:  # not a blank line, check for the sentence end
+                if sentence_end == match.start() or not _CJK_STOP.search(text, match.start(), sentence_end):
+                    continue
+
+                if separator_end < end and text[separator_end] in "，,":
+                    continue
+
+            if sentence_end > start:
+                yield (start, sentence_end)
+
+            start = separator_end
+
+        if end > start:
+            yield (start, end)
@@ -22,6 +22,15 @@ class AutoStorage(Storage[T]):
     def search(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
         return self._storage.search(query, top_k)
 
+    async def aquery(self, key: str) -> Optional[T]:
+        return await self._storage.aquery(key)
+
+    async def asearch(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
+        return await self._storage.asearch(query, top_k)
+
+    async def aclose(self) -> None:
+        return await self._storage.aclose()
+
     def exists(self) -> bool:
         return self._storage.exists()
 
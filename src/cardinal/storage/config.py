@@ -9,6 +9,7 @@ class Config:
     search_target: Optional[str]
     redis_uri: Optional[str]
     elasticsearch_uri: Optional[str]
+    serializer: str
 
 
 settings = Config(
@@ -16,4 +17,5 @@ settings = Config(
     search_target=os.environ.get("SEARCH_TARGET"),
     redis_uri=os.environ.get("REDIS_URI"),
     elasticsearch_uri=os.environ.get("ELASTICSEARCH_URI"),
+    serializer=os.environ.get("SERIALIZER", "json"),
 )
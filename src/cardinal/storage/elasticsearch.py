@@ -1,14 +1,15 @@
-import base64
-import pickle
-from typing import List, Optional, Sequence, Tuple
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from ..utils.async_utils import aclose_on_loop, close_on_loop
 from ..utils.import_utils import is_elasticsearch_available
+from ..utils.serialize_utils import deserialize, get_serializer
 from .config import settings
 from .schema import Storage, T
 
 
 if is_elasticsearch_available():
-    from elasticsearch import Elasticsearch
+    from elasticsearch import AsyncElasticsearch, Elasticsearch, NotFoundError
     from elasticsearch.helpers import bulk
 
 
@@ -22,17 +23,39 @@ class ElasticsearchStorage(Storage[T]):
         self._unique_key = "_unique_key"
         self._batch_size = 1000
         self._search_target = search_target
+        self._elasticsearch_uri = elasticsearch_uri
+        self._async_database: Optional["AsyncElasticsearch"] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._serializer = get_serializer(settings.serializer)
 
         try:
             self.database.ping()
         except Exception:
             raise Exception("Unable to connect with the Elasticsearch server.")
 
+    def _get_async_database(self) -> "AsyncElasticsearch":
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:  # the connections are bound to the event loop
+            if self._async_database is not None:
+                close_on_loop(self._async_loop, self._async_database.close)
+
+            self._async_database = AsyncElasticsearch(
+                hosts=[self._elasticsearch_uri], max_retries=3, request_timeout=30.0
+            )
+            self._async_loop = loop
+
+        return self._async_database
+
+    async def aclose(self) -> None:
+        if self._async_database is not None:
+            await aclose_on_loop(self._async_loop, self._async_database.close)
+            self._async_database, self._async_loop = None, None
+
     def _try_create_index(self) -> None:
         if self.database.indices.exists(index=self.name):
             return
 
-        mappings = {"properties": {"data": {"type": "text"}}}
+        mappings = {"properties": {"data": {"type": "text", "index": False}}}  # the payload is not searched
         index_settings = None
         if self._search_target is not None:
             index_settings = {
@@ -62,7 +85,7 @@ class ElasticsearchStorage(Storage[T]):
         for i in range(0, len(values), self._batch_size):
             actions = []
             for key, value in zip(keys[i : i + self._batch_size], values[i : i + self._batch_size]):
-                source = {"data": base64.b64encode(pickle.dumps(value)).decode("ascii")}
+                source = {"data": self._serializer.dumps(value)}
                 value_dict = value.model_dump()
                 if self._search_target is not None and self._search_target in value_dict:
                     source[self._search_target] = value_dict.get(self._search_target)
@@ -79,7 +102,26 @@ class ElasticsearchStorage(Storage[T]):
         self._check_exists()
         if self.database.exists(index=self.name, id=key):
             result = self.database.get(index=self.name, id=key)
-            return pickle.loads(base64.b64decode(result["_source"]["data"]))
+            return deserialize(result["_source"]["data"])
+
+    async def aquery(self, key: str) -> Optional[T]:
+        database = self._get_async_database()
+        if not await database.indices.exists(index=self.name):
+            raise ValueError("Index {} does not exist.".format(self.name))
+
+        try:
+            result = await database.get(index=self.name, id=key)
+        except NotFoundError:
+            return None
+
+        return deserialize(result["_source"]["data"])
+
+    def _parse_hits(self, result: Dict[str, Any]) -> List[Tuple[T, float]]:
+        ret = []
+        for hit in result["hits"]["hits"]:
+            ret.append((deserialize(hit["_source"]["data"]), hit["_score"]))
+
+        return ret
 
     def search(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
         if self._search_target is None:
@@ -91,12 +133,22 @@ class ElasticsearchStorage(Storage[T]):
             query={"match": {self._search_target: query}},
             size=top_k,
         )
+        return self._parse_hits(result)
 
-        ret = []
-        for hit in result["hits"]["hits"]:
-            ret.append((pickle.loads(base64.b64decode(hit["_source"]["data"])), hit["_score"]))
+    async def asearch(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
+        if self._search_target is None:
+            raise ValueError("`SEARCH_TARGET` is not defined.")
 
-        return ret
+        database = self._get_async_database()
+        if not await database.indices.exists(index=self.name):
+            raise ValueError("Index {} does not exist.".format(self.name))
+
+        result = await database.search(
+            index=self.name,
+            query={"match": {self._search_target: query}},
+            size=top_k,
+        )
+        return self._parse_hits(result)
 
     def exists(self) -> bool:
         return self.database.indices.exists(index=self.name)
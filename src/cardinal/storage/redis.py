@@ -1,7 +1,9 @@
-import pickle
+import asyncio
 from typing import List, Optional, Sequence, Tuple
 
+from ..utils.async_utils import aclose_on_loop, close_on_loop
 from ..utils.import_utils import is_redis_available
+from ..utils.serialize_utils import deserialize, get_serializer
 from .config import settings
 from .schema import Storage, T
 
@@ -9,6 +11,7 @@ from .schema import Storage, T
 if is_redis_available():
     import redis
     from redis import Redis
+    from redis.asyncio import Redis as AsyncRedis
 
 
 class RedisStorage(Storage[T]):
@@ -18,6 +21,10 @@ class RedisStorage(Storage[T]):
         self.database = Redis.from_url(url=redis_uri)
         self.searchable = False
         self._unique_key = "_unique_key"
+        self._redis_uri = redis_uri
+        self._async_database: Optional["AsyncRedis"] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._serializer = get_serializer(settings.serializer)
 
         try:
             self.database.ping()
@@ -26,16 +33,37 @@ class RedisStorage(Storage[T]):
 
     def insert(self, keys: Sequence[str], values: Sequence[T]) -> None:
         for key, value in zip(keys, values):
-            encoded_value = pickle.dumps(value)
+            encoded_value = self._serializer.dumps(value)
             self.database.hset(self.name, key, encoded_value)
 
+    def _get_async_database(self) -> "AsyncRedis":
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:  # the connections are bound to the event loop
+            if self._async_database is not None:
+                close_on_loop(self._async_loop, self._async_database.aclose)
+
+            self._async_database = AsyncRedis.from_url(url=self._redis_uri)
+            self._async_loop = loop
+
+        return self._async_database
+
+    async def aclose(self) -> None:
+        if self._async_database is not None:
+            await aclose_on_loop(self._async_loop, self._async_database.aclose)
+            self._async_database, self._async_loop = None, None
+
     def delete(self, key: str) -> None:
         return self.database.hdel(self.name, key)
 
     def query(self, key: str) -> Optional[T]:
         encoded_value = self.database.hget(self.name, key)
         if encoded_value is not None:
-            return pickle.loads(encoded_value)
+            return deserialize(encoded_value)
+
+    async def aquery(self, key: str) -> Optional[T]:
+        encoded_value = await self._get_async_database().hget(self.name, key)
+        if encoded_value is not None:
+            return deserialize(encoded_value)
 
     def search(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
         raise NotImplementedError
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
 
@@ -63,6 +64,34 @@ class Storage(Generic[T], ABC):
         """
         ...
 
+    async def aquery(self, key: str) -> Optional[T]:
+        r"""
+        Gets the value associated with the given key without blocking the event loop.
+
+        Args:
+            key: the key to query.
+        """
+        return await asyncio.to_thread(self.query, key)
+
+    async def asearch(self, query: str, top_k: Optional[int] = 10) -> List[Tuple[T, float]]:
+        r"""
+        Performs a search on the `search_target` field without blocking the event loop.
+
+        Args:
+            query: the query text being searched.
+            top_k: the number of results to return.
+
+        Returns:
+            hits_with_scores: the hit results with scores (larger is better).
+        """
+        return await asyncio.to_thread(self.search, query, top_k)
+
+    async def aclose(self) -> None:
+        r"""
+        Closes the async connections of the storage, the ones of a previous event loop are closed on that loop.
+        """
+        return None
+
     @abstractmethod
     def exists(self) -> bool:
         r"""
@@ -0,0 +1,28 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Optional
+
+
+def close_on_loop(loop: Optional[asyncio.AbstractEventLoop], close: Callable[[], Awaitable[Any]]) -> None:
+    r"""
+    Schedules the close of an async client on the event loop its connections are bound to.
+
+    Args:
+        loop: the event loop of the client, the client of a closed loop cannot be closed anymore.
+        close: the coroutine function closing the client.
+    """
+    if loop is not None and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(close(), loop)
+
+
+async def aclose_on_loop(loop: Optional[asyncio.AbstractEventLoop], close: Callable[[], Awaitable[Any]]) -> None:
+    r"""
+    Closes an async client, awaited if it is bound to the running event loop.
+
+    Args:
+        loop: the event loop of the client.
+        close: the coroutine function closing the client.
+    """
+    if loop is asyncio.get_running_loop():
+        await close()
+    else:
+        close_on_loop(loop, close)
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Generic, Hashable, NamedTuple, Optional, TypeVar
+
+
+V = TypeVar("V")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache(Generic[V]):
+    r"""
+    A bounded, thread-safe LRU cache with hit/miss statistics.
+
+    The lock is re-created in forked children (e.g. the workers of `multiprocessing.Pool`),
+    so a cache warmed up in the parent process can be used by the workers safely.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        _caches.add(self)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
+    def _reinit_after_fork(self) -> None:
+        self._lock = threading.Lock()  # the parent may have held the lock when forking
+        self._hits = 0
+        self._misses = 0
+
+
+_caches: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+
+def _reinit_caches_after_fork() -> None:
+    for cache in list(_caches):
+        cache._reinit_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_caches_after_fork)
+
+
+def hash_text(text: str) -> bytes:
+    r"""
+    Returns a compact digest of the text, used as the cache key.
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
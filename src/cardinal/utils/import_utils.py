@@ -32,3 +32,19 @@ def is_tiktoken_available():
 
 def is_transformers_available():
     return _is_package_available("transformers")
+
+
+def is_numpy_available():
+    return _is_package_available("numpy")
+
+
+def is_sentence_transformers_available():
+    return _is_package_available("sentence_transformers")
+
+
+def is_onnxruntime_available():
+    return _is_package_available("onnxruntime")
+
+
+def is_hnswlib_available():
+    return _is_package_available("hnswlib")
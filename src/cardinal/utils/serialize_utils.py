@@ -0,0 +1,138 @@
+import base64
+import pickle
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type, Union
+
+from pydantic import BaseModel
+
+
+class Serializer(ABC):
+    prefix = ""  # the tag of the payloads, never a character of base64
+
+    @abstractmethod
+    def dumps(self, value: BaseModel) -> str:
+        r"""
+        Encodes the data as a text payload, stored in the text fields of the databases.
+        """
+        ...
+
+    @abstractmethod
+    def loads(self, payload: Union[str, bytes]) -> BaseModel:
+        r"""
+        Decodes the data from a payload of this serializer.
+        """
+        ...
+
+
+class JSONSerializer(Serializer):
+    r"""
+    Encodes the data as the JSON of pydantic, tagged with the import path of the model, thus it is decoded by
+    the compiled validator of the schema instead of unpickling the objects.
+
+    The path is never imported, the decoded models are the registered ones or the models defined in the process.
+    """
+
+    prefix = "j|"
+
+    def dumps(self, value: BaseModel) -> str:
+        model = type(value)
+        if "<locals>" in model.__qualname__:
+            raise ValueError("Model {} is defined in a function, thus cannot be decoded.".format(model.__qualname__))
+
+        if model.__module__ == "__main__":  # another process has a different main module
+            return _serializers["pickle"].dumps(value)
+
+        path = register_model(model)
+        return "{}{}|{}".format(self.prefix, path, value.model_dump_json())
+
+    def loads(self, payload: Union[str, bytes]) -> BaseModel:
+        if isinstance(payload, bytes):
+            payload = payload.decode("utf-8")
+
+        path, _, data = payload[len(self.prefix) :].partition("|")
+        return _get_model(path).model_validate_json(data)
+
+
+class PickleSerializer(Serializer):
+    r"""
+    Encodes the data as the base64 of pickle, the format of the previous versions.
+    """
+
+    def dumps(self, value: BaseModel) -> str:
+        return base64.b64encode(pickle.dumps(value)).decode("ascii")
+
+    def loads(self, payload: Union[str, bytes]) -> BaseModel:
+        if isinstance(payload, bytes) and payload.startswith(b"\x80"):  # the raw pickle of the redis storage
+            return pickle.loads(payload)
+
+        return pickle.loads(base64.b64decode(payload))
+
+
+_models: Dict[str, Type[BaseModel]] = {}
+_serializers: Dict[str, Serializer] = {}
+
+
+def _get_path(model: Type[BaseModel]) -> str:
+    return "{}:{}".format(model.__module__, model.__qualname__)
+
+
+def register_model(model: Type[BaseModel]) -> str:
+    r"""
+    Registers a model decoded from the JSON payloads, the models are also registered when they are encoded.
+
+    Returns:
+        path: the path of the model in the payloads.
+    """
+    if not (isinstance(model, type) and issubclass(model, BaseModel)):
+        raise TypeError("Expected a subclass of BaseModel, got {}.".format(model))
+
+    path = _get_path(model)
+    _models.setdefault(path, model)
+    return path
+
+
+def _get_model(path: str) -> Type[BaseModel]:
+    if path not in _models:  # searches the models defined in this process instead of importing the path
+        subclasses = BaseModel.__subclasses__()
+        while subclasses:
+            model = subclasses.pop()
+            if _get_path(model) == path:
+                _models[path] = model
+                break
+
+            subclasses.extend(model.__subclasses__())
+        else:
+            raise ValueError("Model {} is not registered.".format(path))
+
+    return _models[path]
+
+
+def _add_serializer(name: str, serializer: Serializer) -> None:
+    _serializers[name] = serializer
+
+
+def _list_serializers() -> List[str]:
+    return list(map(str, _serializers.keys()))
+
+
+def get_serializer(name: str) -> Serializer:
+    if name not in _serializers:
+        raise ValueError("Serializer not found, should be one of {}.".format(_list_serializers()))
+
+    return _serializers[name]
+
+
+def deserialize(payload: Union[str, bytes]) -> BaseModel:
+    r"""
+    Decodes the data from a payload of any serializer, the untagged payloads are the pickles of the previous versions.
+    """
+    for serializer in _serializers.values():
+        prefix = serializer.prefix
+        if prefix and payload.startswith(prefix if isinstance(payload, str) else prefix.encode("ascii")):
+            return serializer.loads(payload)
+
+    return _serializers["pickle"].loads(payload)
+
+
+_add_serializer("json", JSONSerializer())
+_add_serializer("pickle", PickleSerializer())
@@ -2,5 +2,6 @@ from .auto import AutoCondition, AutoVectorStore
 from .chroma import Chroma
 from .milvus import Milvus
 from .elasticsearch import Elasticsearch
+from .local import LocalVectorStore
 
-__all__ = ["AutoCondition", "AutoVectorStore", "Chroma", "Milvus", "Elasticsearch"]
+__all__ = ["AutoCondition", "AutoVectorStore", "Chroma", "Milvus", "Elasticsearch", "LocalVectorStore"]
@@ -5,11 +5,13 @@ from typing_extensions import Self
 from .chroma import Chroma, ChromaCondition
 from .config import settings
 from .elasticsearch import Elasticsearch, ESCondition
+from .local import LocalCondition, LocalVectorStore
 from .milvus import Milvus, MilvusCondition
 from .schema import Condition, T, VectorStore
 
 
 if TYPE_CHECKING:
+    from ..model import Embedder
     from .schema import Operator
 
 
@@ -22,15 +24,17 @@ class AutoCondition(Condition):
 
 
 class AutoVectorStore(VectorStore[T]):
-    def __init__(self, name: str) -> None:
-        self._vectorstore = _get_vectorstore()(name)
+    def __init__(self, name: str, embedder: Optional["Embedder"] = None) -> None:
+        self._vectorstore = _get_vectorstore()(name, embedder=embedder)
 
     @classmethod
     def create(cls, name: str, texts: Sequence[str], data: Sequence[T], drop_old: Optional[bool] = False) -> Self:
         return _get_vectorstore().create(name, texts, data, drop_old)
 
-    def insert(self, texts: Sequence[str], data: Sequence[T]) -> None:
-        return self._vectorstore.insert(texts, data)
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        return self._vectorstore.insert(texts, data, embeddings)
 
     def delete(self, condition: "Condition") -> None:
         return self._vectorstore.delete(condition)
@@ -40,6 +44,19 @@ class AutoVectorStore(VectorStore[T]):
     ) -> List[Tuple[T, float]]:
         return self._vectorstore.search(query, top_k, condition)
 
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[Tuple[T, float]]:
+        return await self._vectorstore.asearch(query, top_k, condition)
+
+    async def aclose(self) -> None:
+        return await self._vectorstore.aclose()
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        return self._vectorstore.batch_search(queries, top_k, condition)
+
     def exists(self) -> bool:
         return self._vectorstore.exists()
 
@@ -80,3 +97,4 @@ def _get_vectorstore() -> Type["VectorStore"]:
 _add_vectorstore("chroma", Chroma, ChromaCondition)
 _add_vectorstore("milvus", Milvus, MilvusCondition)
 _add_vectorstore("elasticsearch", Elasticsearch, ESCondition)
+_add_vectorstore("local", LocalVectorStore, LocalCondition)
@@ -1,12 +1,12 @@
-import base64
-import pickle
+import asyncio
 import uuid
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
 from typing_extensions import Self
 
-from ..model import EmbedOpenAI
+from ..model import AutoEmbedder, Embedder
 from ..utils.import_utils import is_chroma_available
+from ..utils.serialize_utils import deserialize, get_serializer
 from .config import settings
 from .schema import Condition, Operator, T, VectorStore
 
@@ -45,13 +45,14 @@ class ChromaCondition(Condition):
 
 
 class Chroma(VectorStore[T]):
-    def __init__(self, name: str, chroma_path: str=None) -> None:
+    def __init__(self, name: str, chroma_path: str=None, embedder: Optional[Embedder] = None) -> None:
         self.name = name
         self.chroma_path = chroma_path if chroma_path else settings.chroma_path
         self.store = None
         self._batch_size = 1000
-        self._vectorizer = EmbedOpenAI(batch_size=self._batch_size)
+        self._vectorizer = embedder if embedder is not None else AutoEmbedder()
         self._data_field = "_data"
+        self._serializer = get_serializer(settings.serializer)
 
     def _init(self) -> None:
         client = self._get_chroma_client()
@@ -85,8 +86,12 @@ class Chroma(VectorStore[T]):
         chroma.insert(texts, data)
         return chroma
 
-    def insert(self, texts: Sequence[str], data: Sequence[T]) -> None:
-        embeddings = self._vectorizer.batch_embed(texts)
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        if embeddings is None:
+            embeddings = self._vectorizer.batch_embed(texts)
+
         if self.store is None:
             self._init()
 
@@ -101,7 +106,7 @@ class Chroma(VectorStore[T]):
                 else:
                     raise ValueError("Expected str, int, float or bool, got {}".format(type(v)))
 
-            example_dict[self._data_field] = base64.b64encode(pickle.dumps(example)).decode("ascii")
+            example_dict[self._data_field] = self._serializer.dumps(example)
             metadatas.append(example_dict)
 
         for i in range(0, len(metadatas), self._batch_size):
@@ -118,19 +123,37 @@ class Chroma(VectorStore[T]):
     def search(
         self, query: str, top_k: Optional[int] = 4, condition: Optional["ChromaCondition"] = None
     ) -> List[Tuple[T, float]]:
+        return self._search_by_embeddings(self._vectorizer.batch_embed([query]), top_k, condition)[0]
+
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["ChromaCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        # the client of chroma is blocking, thus only the query embedding is awaited natively
+        query_embeddings = await self._vectorizer.abatch_embed([query])
+        return (await asyncio.to_thread(self._search_by_embeddings, query_embeddings, top_k, condition))[0]
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["ChromaCondition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        return self._search_by_embeddings(self._vectorizer.batch_embed(queries), top_k, condition)
+
+    def _search_by_embeddings(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int, condition: Optional["ChromaCondition"]
+    ) -> List[List[Tuple[T, float]]]:
         self._try_init_and_check_exists()
 
         result = self.store.query(
-            query_embeddings=self._vectorizer.batch_embed([query]),
+            query_embeddings=query_embeddings,
             n_results=top_k,
             where=condition.to_filter() if condition is not None else None,
             include=["metadatas", "distances"],
         )
 
         ret = []
-        for metadata, score in zip(result["metadatas"][0], result["distances"][0]):
-            example = pickle.loads(base64.b64decode(metadata[self._data_field]))
-            ret.append((example, score))
+        for metadatas, distances in zip(result["metadatas"], result["distances"]):  # the hits of each query
+            hits = [(deserialize(metadata[self._data_field]), score) for metadata, score in zip(metadatas, distances)]
+            ret.append(hits)
+
         return ret
 
     def exists(self) -> bool:
@@ -1,6 +1,7 @@
+import json
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -9,7 +10,20 @@ class Config:
     chroma_path: Optional[str]
     milvus_uri: Optional[str]
     milvus_token: Optional[str]
+    milvus_index_type: str
+    milvus_index_params: Optional[Dict[str, Any]]
+    milvus_search_params: Optional[Dict[str, Any]]
     elasticsearch_uri: Optional[str]
+    elasticsearch_knn: bool
+    elasticsearch_hnsw_m: int
+    elasticsearch_hnsw_ef_construction: int
+    elasticsearch_num_candidates: int
+    local_vectorstore_path: str
+    local_vectorstore_index: str
+    local_hnsw_m: int
+    local_hnsw_ef_construction: int
+    local_hnsw_ef_search: int
+    serializer: str
 
 
 settings = Config(
@@ -17,5 +31,18 @@ settings = Config(
     chroma_path=os.environ.get("CHROMA_PATH"),
     milvus_uri=os.environ.get("MILVUS_URI"),
     milvus_token=os.environ.get("MILVUS_TOKEN"),
+    milvus_index_type=os.environ.get("MILVUS_INDEX_TYPE", "IVF_FLAT"),
+    milvus_index_params=json.loads(os.environ.get("MILVUS_INDEX_PARAMS", "null")),
+    milvus_search_params=json.loads(os.environ.get("MILVUS_SEARCH_PARAMS", "null")),
     elasticsearch_uri=os.environ.get("ELASTICSEARCH_URI"),
+    elasticsearch_knn=os.environ.get("ELASTICSEARCH_KNN", "true").lower() in ["true", "1"],
+    elasticsearch_hnsw_m=int(os.environ.get("ELASTICSEARCH_HNSW_M", "16")),
+    elasticsearch_hnsw_ef_construction=int(os.environ.get("ELASTICSEARCH_HNSW_EF_CONSTRUCTION", "100")),
+    elasticsearch_num_candidates=int(os.environ.get("ELASTICSEARCH_NUM_CANDIDATES", "100")),
+    local_vectorstore_path=os.environ.get("LOCAL_VECTORSTORE_PATH", "./vectorstore"),
+    local_vectorstore_index=os.environ.get("LOCAL_VECTORSTORE_INDEX", "flat"),
+    local_hnsw_m=int(os.environ.get("LOCAL_HNSW_M", "16")),
+    local_hnsw_ef_construction=int(os.environ.get("LOCAL_HNSW_EF_CONSTRUCTION", "200")),
+    local_hnsw_ef_search=int(os.environ.get("LOCAL_HNSW_EF_SEARCH", "64")),
+    serializer=os.environ.get("SERIALIZER", "json"),
 )
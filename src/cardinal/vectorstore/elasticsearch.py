@@ -1,21 +1,28 @@
-import base64
+import asyncio
 import json
-import pickle
+import math
 from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from typing_extensions import Self
 
-from ..model import EmbedOpenAI
+from ..logging import get_logger
+from ..model import AutoEmbedder, Embedder
+from ..utils.async_utils import aclose_on_loop, close_on_loop
 from ..utils.import_utils import is_elasticsearch_available
+from ..utils.serialize_utils import deserialize, get_serializer
 from .config import settings
 from .schema import Condition, Operator, T, VectorStore
 
 
 if is_elasticsearch_available():
+    from elasticsearch import AsyncElasticsearch
     from elasticsearch import Elasticsearch as ES
     from elasticsearch.helpers import bulk
 
 
+logger = get_logger(__name__)
+
+
 class ESCondition(Condition):
     def __init__(self, key: str, value: Any, op: "Operator") -> None:
         self._key = key
@@ -45,7 +52,12 @@ class ESCondition(Condition):
                 }
             }
         elif self._op == "must_not":
+            if isinstance(self._value, list):
+                return {"bool": {"must_not": {"terms": {self._key: self._value}}}}
+
             return {"bool": {"must_not": {"term": {self._key: self._value}}}}
+        elif self._op == "term":
+            return {"term": {self._key: self._value}}
         elif self._op == "terms":
             return {"terms": {self._key: self._value}}
         else:
@@ -53,14 +65,22 @@ class ESCondition(Condition):
 
 
 class Elasticsearch(VectorStore[T]):
-    def __init__(self, name: str, elasticsearch_uri: str=None) -> None:
+    r"""
+    The Elasticsearch vector store, searched with the approximate kNN on the HNSW graph of the embeddings,
+    or with an exact L2 script over all the documents if `ELASTICSEARCH_KNN` is false.
+    """
+
+    def __init__(self, name: str, elasticsearch_uri: str=None, embedder: Optional[Embedder] = None) -> None:
         self.name = name
         self.elasticsearch_uri = elasticsearch_uri if elasticsearch_uri else settings.elasticsearch_uri
         self.store: Optional["ES"] = None
+        self._async_store: Optional["AsyncElasticsearch"] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
         self._batch_size = 1000
-        self._vectorizer = EmbedOpenAI(batch_size=self._batch_size)
+        self._vectorizer = embedder if embedder is not None else AutoEmbedder()
         self._data_field = "_data"
         self._embedding_field = "_embedding"
+        self._serializer = get_serializer(settings.serializer)
         self._index_params = {
             "settings": {
                 "index": {
@@ -69,6 +89,13 @@ class Elasticsearch(VectorStore[T]):
                 }
             }
         }
+        self._knn = settings.elasticsearch_knn
+        self._hnsw_params = {
+            "type": "hnsw",
+            "m": settings.elasticsearch_hnsw_m,
+            "ef_construction": settings.elasticsearch_hnsw_ef_construction,
+        }
+        self._num_candidates = settings.elasticsearch_num_candidates
 
     def _init(self, embedding: Optional[Sequence[float]] = None) -> None:
         if self.store is None:
@@ -82,26 +109,43 @@ class Elasticsearch(VectorStore[T]):
         if embedding is not None and not self.store.indices.exists(index=self.name):
             mappings = {
                 "properties": {
-                    self._data_field: {"type": "keyword"},
+                    self._data_field: {"type": "keyword", "index": False, "doc_values": False},  # not searched
                     self._embedding_field: {
                         "type": "dense_vector",
                         "dims": len(embedding),
                         "index": True,
-                        "similarity": "l2_norm"
+                        "similarity": "l2_norm",
+                        "index_options": self._hnsw_params
                     }
                 }
             }
             try:
-                print("Creating index with mappings:", json.dumps(mappings, indent=2))
+                logger.info("Creating index {} with mappings: {}".format(self.name, json.dumps(mappings)))
                 self.store.indices.create(
                     index=self.name,
                     mappings=mappings,
                     settings=self._index_params["settings"]
                 )
             except Exception as e:
-                print("Error creating index:", str(e))
+                logger.error("Error creating index: {}".format(e))
                 raise
 
+    def _get_async_store(self) -> "AsyncElasticsearch":
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:  # the connections are bound to the event loop
+            if self._async_store is not None:
+                close_on_loop(self._async_loop, self._async_store.close)
+
+            self._async_store = AsyncElasticsearch(hosts=[self.elasticsearch_uri])
+            self._async_loop = loop
+
+        return self._async_store
+
+    async def aclose(self) -> None:
+        if self._async_store is not None:
+            await aclose_on_loop(self._async_loop, self._async_store.close)
+            self._async_store, self._async_loop = None, None
+
     def _try_init_and_check_exists(self) -> None:
         if self.store is None:
             self._init()
@@ -109,15 +153,6 @@ class Elasticsearch(VectorStore[T]):
         if not self.store.indices.exists(index=self.name):
             raise ValueError("Index {} does not exist.".format(self.name))
 
-    def _get_index_info(self) -> None:
-        """打印索引信息用于调试"""
-        try:
-            print("\nIndex settings:", json.dumps(self.store.indices.get_settings(index=self.name), indent=2))
-            print("\nIndex mappings:", json.dumps(self.store.indices.get_mapping(index=self.name), indent=2))
-            print("\nIndex stats:", json.dumps(self.store.indices.stats(index=self.name), indent=2))
-        except Exception as e:
-            print("Error getting index info:", str(e))
-
     @classmethod
     def create(cls, name: str, texts: Sequence[str], data: Sequence[T], drop_old: Optional[bool] = False) -> Self:
         es = cls(name=name)
@@ -129,8 +164,12 @@ class Elasticsearch(VectorStore[T]):
         es.insert(texts, data)
         return es
 
-    def insert(self, texts: Sequence[str], data: Sequence[T]) -> None:
-        embeddings = self._vectorizer.batch_embed(texts)
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        if embeddings is None:
+            embeddings = self._vectorizer.batch_embed(texts)
+
         if self.store is None:
             self._init(embedding=embeddings[0])
 
@@ -138,7 +177,7 @@ class Elasticsearch(VectorStore[T]):
         for embedding, example in zip(embeddings, data):
             doc = {
                 self._embedding_field: embedding,
-                self._data_field: base64.b64encode(pickle.dumps(example)).decode("ascii")
+                self._data_field: self._serializer.dumps(example)
             }
             # Add metadata fields
             for k, v in example.model_dump().items():
@@ -154,19 +193,19 @@ class Elasticsearch(VectorStore[T]):
 
             if len(actions) >= self._batch_size:
                 try:
-                    print("Bulk inserting {} documents".format(len(actions)))
+                    logger.debug("Bulk inserting {} documents.".format(len(actions)))
                     bulk(self.store, actions)
                 except Exception as e:
-                    print("Error during bulk insert:", str(e))
+                    logger.error("Error during bulk insert: {}".format(e))
                     raise
                 actions = []
 
         if actions:
             try:
-                print("Bulk inserting remaining {} documents".format(len(actions)))
+                logger.debug("Bulk inserting remaining {} documents.".format(len(actions)))
                 bulk(self.store, actions)
             except Exception as e:
-                print("Error during bulk insert:", str(e))
+                logger.error("Error during bulk insert: {}".format(e))
                 raise
 
         # 刷新索引以确保数据可见
@@ -175,27 +214,30 @@ class Elasticsearch(VectorStore[T]):
     def delete(self, condition: "ESCondition") -> None:
         self._try_init_and_check_exists()
         try:
-            print("Deleting documents with query:", json.dumps(condition.to_filter(), indent=2))
+            logger.debug("Deleting documents with query: {}".format(json.dumps(condition.to_filter())))
             self.store.delete_by_query(
                 index=self.name,
                 query=condition.to_filter()
             )
         except Exception as e:
-            print("Error during delete:", str(e))
+            logger.error("Error during delete: {}".format(e))
             raise
 
-    def search(
-        self, query: str, top_k: Optional[int] = 4, condition: Optional["ESCondition"] = None
-    ) -> List[Tuple[T, float]]:
-        self._try_init_and_check_exists()
-
-        # 打印索引信息
-        self._get_index_info()
+    def _build_search_query(
+        self, query_embedding: Sequence[float], top_k: int, condition: Optional["ESCondition"] = None
+    ) -> Dict[str, Any]:
+        if self._knn:  # the filter is applied during the graph search, thus the top k hits all match it
+            knn_query = {
+                "field": self._embedding_field,
+                "query_vector": query_embedding,
+                "k": top_k,
+                "num_candidates": max(self._num_candidates, top_k),
+            }
+            if condition is not None:
+                knn_query["filter"] = condition.to_filter()
 
-        # Get query embedding
-        query_embedding = self._vectorizer.batch_embed([query])[0]
+            return {"knn": knn_query}
 
-        # Build search query
         search_query = {
             "query": {
                 "script_score": {
@@ -232,28 +274,74 @@ class Elasticsearch(VectorStore[T]):
                 }
             }
 
-        # 先尝试解释查询
-        explain = self.store.indices.validate_query(
-            index=self.name,
-            query=search_query["query"],
-            explain=True
-        )
+        return search_query
+
+    def _parse_hits(self, result: Dict[str, Any]) -> List[Tuple[T, float]]:
+        ret = []
+        for hit in result["hits"]["hits"]:
+            example = deserialize(hit["_source"][self._data_field])
+            score = hit["_score"]
+            if self._knn:  # the score of l2_norm is 1 / (1 + l2^2), converted back to the L2 distance
+                score = math.sqrt(max(1.0 / score - 1.0, 0.0))
+
+            ret.append((example, score))
+
+        return ret
+
+    def search(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["ESCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        self._try_init_and_check_exists()
+
+        # Get query embedding
+        query_embedding = self._vectorizer.batch_embed([query])[0]
 
         # 执行搜索
         result = self.store.search(
             index=self.name,
-            body=search_query,
+            body=self._build_search_query(query_embedding, top_k, condition),
             size=top_k,
             _source=[self._data_field]
         )
 
+        return self._parse_hits(result)
 
-        # Process results
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["ESCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        store = self._get_async_store()
+        query_embedding, index_exists = await asyncio.gather(
+            self._vectorizer.abatch_embed([query]), store.indices.exists(index=self.name)
+        )
+        if not index_exists:
+            raise ValueError("Index {} does not exist.".format(self.name))
+
+        result = await store.search(
+            index=self.name,
+            body=self._build_search_query(query_embedding[0], top_k, condition),
+            size=top_k,
+            _source=[self._data_field]
+        )
+        return self._parse_hits(result)
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["ESCondition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        self._try_init_and_check_exists()
+        query_embeddings = self._vectorizer.batch_embed(queries)
+        searches = []
+        for query_embedding in query_embeddings:  # a header and a body for each query of the multi search
+            searches.append({"index": self.name})
+            body = self._build_search_query(query_embedding, top_k, condition)
+            searches.append({**body, "size": top_k, "_source": [self._data_field]})
+
+        result = self.store.msearch(searches=searches)
         ret = []
-        for hit in result["hits"]["hits"]:
-            example = pickle.loads(base64.b64decode(hit["_source"][self._data_field]))
-            score = hit["_score"]
-            ret.append((example, score))
+        for response in result["responses"]:
+            if "error" in response:
+                raise Exception("Search failed: {}".format(response["error"]))
+
+            ret.append(self._parse_hits(response))
 
         return ret
 
@@ -267,18 +355,18 @@ class Elasticsearch(VectorStore[T]):
     def destroy(self) -> None:
         self._try_init_and_check_exists()
         try:
-            print("Deleting index:", self.name)
+            logger.info("Deleting index {}.".format(self.name))
             self.store.indices.delete(index=self.name)
         except Exception as e:
-            print("Error during index deletion:", str(e))
+            logger.error("Error during index deletion: {}".format(e))
             raise
         self.store = None
 
     def flush(self) -> None:
         if self.exists():
             try:
-                print("Refreshing index:", self.name)
+                logger.debug("Refreshing index {}.".format(self.name))
                 self.store.indices.refresh(index=self.name)
             except Exception as e:
-                print("Error during index refresh:", str(e))
+                logger.error("Error during index refresh: {}".format(e))
                 raise
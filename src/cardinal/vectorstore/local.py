@@ -0,0 +1,508 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+from collections import defaultdict
+from functools import reduce
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from typing_extensions import Self
+
+from ..model import AutoEmbedder, Embedder
+from ..utils.import_utils import is_hnswlib_available, is_numpy_available
+from ..utils.serialize_utils import deserialize, get_serializer
+from .config import settings
+from .schema import Condition, Operator, T, VectorStore
+
+
+if is_numpy_available():
+    import numpy as np
+
+if is_hnswlib_available():
+    import hnswlib
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+    Columns = Dict[str, NDArray]
+
+
+class LocalCondition(Condition):
+    def __init__(self, key: str, value: Any, op: "Operator") -> None:
+        r"""
+        Initializes a condition of the local vector store, the And and Or operators combine the list
+        of local conditions given as the value, the key is ignored.
+        """
+        self._key = key
+        self._op = op
+        if isinstance(value, list) and op in [Operator.In, Operator.Notin]:
+            self._value = value
+        elif isinstance(value, list) and op in [Operator.And, Operator.Or]:
+            if not all(isinstance(condition, LocalCondition) for condition in value):
+                raise ValueError("Expected a list of local conditions for {}".format(op.name))
+
+            self._value = value
+        elif isinstance(value, (str, int, float)) and op < Operator.In:
+            self._value = value
+        else:
+            raise ValueError("Unsupported operation {} for value {}".format(Operator(op).name, value))
+
+    def to_filter(self) -> Callable[["Columns"], "NDArray"]:
+        return self._mask
+
+    def _mask(self, columns: "Columns") -> "NDArray":
+        if self._op == Operator.And:
+            return reduce(np.logical_and, [condition._mask(columns) for condition in self._value])
+        elif self._op == Operator.Or:
+            return reduce(np.logical_or, [condition._mask(columns) for condition in self._value])
+
+        if self._key not in columns:
+            raise ValueError("Field {} does not exist.".format(self._key))
+
+        column = columns[self._key]
+        if self._op == Operator.Eq:
+            return column == self._value
+        elif self._op == Operator.Ne:
+            return column != self._value
+        elif self._op == Operator.Gt:
+            return column > self._value
+        elif self._op == Operator.Ge:
+            return column >= self._value
+        elif self._op == Operator.Lt:
+            return column < self._value
+        elif self._op == Operator.Le:
+            return column <= self._value
+        elif self._op == Operator.In:
+            return np.isin(column, self._value)
+        else:
+            return ~np.isin(column, self._value)
+
+
+class LocalVectorStore(VectorStore[T]):
+    r"""
+    An in-process vector store persisted to a directory, without a server to deploy.
+
+    The embeddings are appended to a float32 file read through a memory map, thus a store is opened lazily without
+    reading the matrix. The fields of the data are kept as columnar arrays and the conditions are evaluated as
+    vectorized masks. The search scans the matrix exactly by default, or walks an HNSW graph (requires hnswlib)
+    for large stores, the filtered searches matching a few rows are always exact.
+
+    The deleted rows are masked out, their space is reclaimed by creating the store again.
+    """
+
+    _chunk_size = 65536  # the rows of a matrix product of the exact scan
+    _exact_limit = 20000  # the filtered searches matching fewer rows scan them exactly
+    _dtypes = {"bool": "?", "int": "<i8", "float": "<f8"}
+
+    def __init__(
+        self,
+        name: str,
+        local_path: str = None,
+        embedder: Optional[Embedder] = None,
+        index: Optional[str] = None,
+    ) -> None:
+        r"""
+        Initializes a local vector store.
+
+        Args:
+            name: the name of the vector store, i.e. the sub-directory of the path.
+            local_path: the directory of the vector stores.
+            embedder: the embedder of the texts and queries.
+            index: the search index, flat (exact) or hnsw.
+        """
+        if not is_numpy_available():
+            raise ImportError("Please install numpy to use the local vector store.")
+
+        self.name = name
+        self.local_path = local_path if local_path else settings.local_vectorstore_path
+        self.store: Optional[str] = None
+        self._index_type = index if index is not None else settings.local_vectorstore_index
+        if self._index_type not in ["flat", "hnsw"]:
+            raise ValueError("Index should be flat or hnsw, got {}.".format(self._index_type))
+
+        if self._index_type == "hnsw" and not is_hnswlib_available():
+            raise ImportError("Please install hnswlib to use the HNSW index.")
+
+        self._vectorizer = embedder if embedder is not None else AutoEmbedder()
+        self._serializer = get_serializer(settings.serializer)
+        self._directory = os.path.join(self.local_path, self.name)
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.store = None
+        self._dim = 0
+        self._count = 0
+        self._fields: Dict[str, str] = {}
+        self._embeddings: Optional["NDArray"] = None
+        self._norms: Optional["NDArray"] = None
+        self._offsets: Optional["NDArray"] = None
+        self._deleted: Optional["NDArray"] = None
+        self._columns: "Columns" = {}
+        self._index: Optional["hnswlib.Index"] = None
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self._directory, filename)
+
+    def _column_file(self, key: str) -> str:
+        return "{}.{}".format(key, "jsonl" if self._fields[key] == "str" else "bin")
+
+    def _read_array(self, filename: str, dtype: str, count: int) -> "NDArray":
+        path = self._path(filename)
+        if count == 0 or not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+
+        with open(path, "rb+") as f:
+            f.truncate(count * np.dtype(dtype).itemsize)  # drops the rows of an interrupted insert
+            f.seek(0)
+            return np.fromfile(f, dtype=dtype, count=count)
+
+    def _read_strings(self, filename: str, count: int) -> "NDArray":
+        path = self._path(filename)
+        if count == 0 or not os.path.exists(path):
+            return np.empty(0, dtype=str)
+
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+
+        if len(lines) > count:  # drops the rows of an interrupted insert
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines[:count])
+
+        return np.array([json.loads(line) for line in lines[:count]], dtype=str)
+
+    def _map_embeddings(self, count: int) -> "NDArray":
+        if count == 0:
+            return np.empty((0, self._dim), dtype=np.float32)
+
+        return np.memmap(self._path("embeddings.f32"), dtype=np.float32, mode="r", shape=(count, self._dim))
+
+    def _write_meta(self) -> None:
+        meta = {"dim": self._dim, "count": self._count, "fields": self._fields}
+        with open(self._path("meta.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        os.replace(self._path("meta.json.tmp"), self._path("meta.json"))  # the count commits the appended rows
+
+    def _load(self) -> None:
+        with self._lock:
+            if self.store is not None or not os.path.exists(self._path("meta.json")):
+                return
+
+            with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            self._dim, self._count, self._fields = meta["dim"], meta["count"], meta["fields"]
+            with open(self._path("embeddings.f32"), "ab") as f:
+                f.truncate(self._count * self._dim * 4)
+
+            self._embeddings = self._map_embeddings(self._count)
+            self._norms = self._read_array("norms.f32", "<f4", self._count)
+            self._offsets = self._read_array("offsets.i64", "<i8", self._count)
+            self._deleted = self._read_array("deleted.u8", "?", self._count)
+            with open(self._path("data.bin"), "ab") as f:
+                f.truncate(int(self._offsets[-1]) if self._count else 0)
+
+            for key, kind in self._fields.items():
+                if kind == "str":
+                    self._columns[key] = self._read_strings(self._column_file(key), self._count)
+                else:
+                    self._columns[key] = self._read_array(self._column_file(key), self._dtypes[kind], self._count)
+
+            if self._index_type == "hnsw":
+                self._load_index()
+
+            self.store = self._directory
+
+    def _create(self, dim: int, example: T) -> None:
+        fields = {}
+        for key, value in example.model_dump().items():
+            if isinstance(value, bool):
+                fields[key] = "bool"
+            elif isinstance(value, int):
+                fields[key] = "int"
+            elif isinstance(value, float):
+                fields[key] = "float"
+            elif isinstance(value, str):
+                fields[key] = "str"
+            else:
+                raise ValueError("Expected str, int, float or bool, got {}".format(type(value)))
+
+        os.makedirs(self._directory, exist_ok=True)
+        self._dim, self._count, self._fields = dim, 0, fields
+        self._embeddings = self._map_embeddings(0)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._offsets = np.empty(0, dtype=np.int64)
+        self._deleted = np.empty(0, dtype=np.bool_)
+        self._columns = {
+            key: np.empty(0, dtype=str if kind == "str" else self._dtypes[kind]) for key, kind in fields.items()
+        }
+        if self._index_type == "hnsw":
+            self._load_index()
+
+        self._write_meta()
+        self.store = self._directory
+
+    def _load_index(self) -> None:
+        self._index = hnswlib.Index(space="l2", dim=self._dim)
+        max_elements = max(self._count, 1024)
+        if os.path.exists(self._path("hnsw.bin")):
+            self._index.load_index(self._path("hnsw.bin"), max_elements=max_elements)
+        else:
+            self._index.init_index(
+                max_elements=max_elements, M=settings.local_hnsw_m, ef_construction=settings.local_hnsw_ef_construction
+            )
+
+        # the rows inserted or deleted after the last flush are not in the saved graph
+        for start in range(self._index.get_current_count(), self._count, self._chunk_size):
+            stop = min(start + self._chunk_size, self._count)
+            self._index.add_items(np.asarray(self._embeddings[start:stop]), np.arange(start, stop))
+
+        for i in np.flatnonzero(self._deleted):
+            try:
+                self._index.mark_deleted(int(i))
+            except RuntimeError:  # already deleted in the saved graph
+                pass
+
+    def _try_init_and_check_exists(self) -> None:
+        self._load()
+        if self.store is None:
+            raise ValueError("Index {} does not exist.".format(self.name))
+
+    @classmethod
+    def create(cls, name: str, texts: Sequence[str], data: Sequence[T], drop_old: Optional[bool] = False) -> Self:
+        local = cls(name=name)
+        if drop_old and local.exists():
+            local.destroy()
+
+        local.insert(texts, data)
+        return local
+
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        if len(data) == 0:
+            return
+
+        if embeddings is None:
+            embeddings = self._vectorizer.batch_embed(texts)
+
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(data), -1))
+        with self._lock:
+            self._load()
+            if self.store is None:
+                self._create(matrix.shape[1], data[0])
+
+            if matrix.shape[1] != self._dim:
+                raise ValueError("Expected embeddings of dimension {}, got {}.".format(self._dim, matrix.shape[1]))
+
+            values = defaultdict(list)
+            for example in data:
+                for key, value in example.model_dump().items():
+                    values[key].append(value)
+
+            columns = {}
+            for key, kind in self._fields.items():
+                is_valid = kind != "str" or all(isinstance(value, str) for value in values[key])
+                if len(values[key]) != len(data) or not is_valid:
+                    raise ValueError("Expected the {} field of {} in every example.".format(kind, key))
+
+                columns[key] = values[key] if kind == "str" else np.asarray(values[key], dtype=self._dtypes[kind])
+
+            blobs = [self._serializer.dumps(example).encode("utf-8") for example in data]
+            start = int(self._offsets[-1]) if self._count else 0
+            offsets = start + np.cumsum([len(blob) for blob in blobs], dtype=np.int64)
+            norms = np.einsum("ij,ij->i", matrix, matrix)
+            deleted = np.zeros(len(data), dtype=np.bool_)
+
+            # the rows are appended to every file before the count is committed in the meta file
+            for filename, array in [
+                ("embeddings.f32", matrix),
+                ("norms.f32", norms),
+                ("offsets.i64", offsets),
+                ("deleted.u8", deleted),
+            ]:
+                with open(self._path(filename), "ab") as f:
+                    f.write(array.tobytes())
+
+            with open(self._path("data.bin"), "ab") as f:
+                f.write(b"".join(blobs))
+
+            for key, column in columns.items():
+                if self._fields[key] == "str":
+                    with open(self._path(self._column_file(key)), "a", encoding="utf-8") as f:
+                        f.writelines(json.dumps(value, ensure_ascii=False) + "\n" for value in column)
+                else:
+                    with open(self._path(self._column_file(key)), "ab") as f:
+                        f.write(column.tobytes())
+
+            if self._index is not None:
+                if self._count + len(data) > self._index.get_max_elements():
+                    self._index.resize_index(max(2 * self._index.get_max_elements(), self._count + len(data)))
+
+                self._index.add_items(matrix, np.arange(self._count, self._count + len(data)))
+
+            self._count += len(data)
+            self._write_meta()
+
+            # the arrays are replaced instead of updated in place, thus the running searches keep their snapshot
+            self._embeddings = self._map_embeddings(self._count)
+            self._norms = np.concatenate([self._norms, norms])
+            self._offsets = np.concatenate([self._offsets, offsets])
+            self._deleted = np.concatenate([self._deleted, deleted])
+            self._columns = {
+                key: np.concatenate([self._columns[key], np.asarray(column)]) for key, column in columns.items()
+            }
+
+    def delete(self, condition: "LocalCondition") -> None:
+        self._try_init_and_check_exists()
+        with self._lock:
+            ids = np.flatnonzero(condition.to_filter()(self._columns) & ~self._deleted)
+            if len(ids) == 0:
+                return
+
+            deleted = self._deleted.copy()
+            deleted[ids] = True
+            with open(self._path("deleted.u8.tmp"), "wb") as f:
+                f.write(deleted.tobytes())
+
+            os.replace(self._path("deleted.u8.tmp"), self._path("deleted.u8"))
+            self._deleted = deleted
+            if self._index is not None:
+                for i in ids:
+                    self._index.mark_deleted(int(i))
+
+    def search(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["LocalCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        return self._search_by_embeddings(self._vectorizer.batch_embed([query]), top_k, condition)[0]
+
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["LocalCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        # the search is computed in this process, thus only the query embedding is awaited natively
+        query_embeddings = await self._vectorizer.abatch_embed([query])
+        return (await asyncio.to_thread(self._search_by_embeddings, query_embeddings, top_k, condition))[0]
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["LocalCondition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        if len(queries) == 0:
+            return []
+
+        return self._search_by_embeddings(self._vectorizer.batch_embed(queries), top_k, condition)
+
+    def _search_by_embeddings(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int, condition: Optional["LocalCondition"]
+    ) -> List[List[Tuple[T, float]]]:
+        self._try_init_and_check_exists()
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        with self._lock:  # a snapshot of the store
+            embeddings, norms, offsets = self._embeddings, self._norms, self._offsets
+            deleted, columns = self._deleted, self._columns
+
+        mask = condition.to_filter()(columns) if condition is not None else None
+        hits = None
+        if self._index is not None and (mask is None or np.count_nonzero(mask) > self._exact_limit):
+            hits = self._search_index(queries, top_k, mask)
+
+        if hits is None:
+            if deleted.any():
+                mask = ~deleted if mask is None else mask & ~deleted
+
+            hits = self._scan(embeddings, norms, queries, top_k, mask)
+
+        ret = []
+        with open(self._path("data.bin"), "rb") as f:
+            for ids, scores in hits:  # the hits of each query
+                results = []
+                for i, score in zip(ids, scores):
+                    start = int(offsets[i - 1]) if i > 0 else 0
+                    f.seek(start)
+                    results.append((deserialize(f.read(int(offsets[i]) - start)), float(score)))
+
+                ret.append(results)
+
+        return ret
+
+    def _search_index(
+        self, queries: "NDArray", top_k: int, mask: Optional["NDArray"]
+    ) -> Optional[List[Tuple["NDArray", "NDArray"]]]:
+        with self._lock:  # the graph is not safe to query during an update
+            num_alive = self._index.get_current_count() - np.count_nonzero(self._deleted)
+            k = min(top_k, num_alive)
+            if k == 0:
+                return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))] * len(queries)
+
+            self._index.set_ef(max(settings.local_hnsw_ef_search, k))
+            try:
+                labels, distances = self._index.knn_query(
+                    queries, k=k, num_threads=1, filter=(lambda label: bool(mask[label])) if mask is not None else None
+                )
+            except RuntimeError:  # fewer than k rows reached in the graph, falls back to the exact scan
+                return None
+
+        return list(zip(labels, distances))
+
+    def _scan(
+        self, embeddings: "NDArray", norms: "NDArray", queries: "NDArray", top_k: int, mask: Optional["NDArray"]
+    ) -> List[Tuple["NDArray", "NDArray"]]:
+        # the squared L2 distance |x|^2 - 2 x.q + |q|^2, as the scores of Chroma and Milvus
+        ids = None
+        if mask is not None and np.count_nonzero(mask) * 8 < len(mask):  # gathers the few rows instead of masking
+            ids, mask = np.flatnonzero(mask), None
+
+        total = len(norms) if ids is None else len(ids)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, total, self._chunk_size):
+            stop = min(start + self._chunk_size, total)
+            rows = np.arange(start, stop) if ids is None else ids[start:stop]
+            block = embeddings[start:stop] if ids is None else embeddings[rows]
+            scores = norms[rows] - 2 * (queries @ np.asarray(block).T)  # a row for each query
+            if mask is not None:
+                scores[:, ~mask[start:stop]] = np.inf
+
+            if scores.shape[1] > top_k:
+                top = np.argpartition(scores, top_k, axis=1)[:, :top_k]
+                rows, scores = rows[top], np.take_along_axis(scores, top, axis=1)
+            else:
+                rows = np.broadcast_to(rows, scores.shape)
+
+            best_ids = np.concatenate([best_ids, rows], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_scores.shape[1] > top_k:
+                top = np.argpartition(best_scores, top_k, axis=1)[:, :top_k]
+                best_ids = np.take_along_axis(best_ids, top, axis=1)
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+
+        order = np.argsort(best_scores, axis=1, kind="stable")
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        hits = []
+        for j in range(len(queries)):
+            found = np.isfinite(best_scores[j])
+            hits.append((best_ids[j, found], np.maximum(best_scores[j, found] + query_norms[j], 0.0)))
+
+        return hits
+
+    def exists(self) -> bool:
+        try:
+            self._try_init_and_check_exists()
+            return True
+        except ValueError:
+            return False
+
+    def destroy(self) -> None:
+        self._try_init_and_check_exists()
+        with self._lock:
+            shutil.rmtree(self._directory)
+            self._reset()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.save_index(self._path("hnsw.bin.tmp"))
+                os.replace(self._path("hnsw.bin.tmp"), self._path("hnsw.bin"))
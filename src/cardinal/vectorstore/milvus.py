@@ -1,16 +1,24 @@
-import base64
-import pickle
+import asyncio
+import json
+import random
+import time
 from collections import defaultdict
-from typing import Any, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 from typing_extensions import Self
 
-from ..model import EmbedOpenAI
-from ..utils.import_utils import is_pymilvus_availble
+from ..logging import get_logger
+from ..model import AutoEmbedder, Embedder
+from ..utils.import_utils import is_numpy_available, is_pymilvus_availble
+from ..utils.serialize_utils import deserialize, get_serializer
 from .config import settings
 from .schema import Condition, Operator, T, VectorStore
 
 
+if is_numpy_available():
+    import numpy as np
+
+
 if is_pymilvus_availble():
     from pymilvus import Collection, CollectionSchema, Connections, DataType, FieldSchema, Hit, connections, utility
     from pymilvus.orm.types import infer_dtype_bydata
@@ -18,6 +26,9 @@ if is_pymilvus_availble():
     SearchResult = Sequence[Sequence[Hit]]
 
 
+logger = get_logger(__name__)
+
+
 class MilvusCondition(Condition):
     def __init__(self, key: str, value: Any, op: "Operator") -> None:
         self._key = key
@@ -42,8 +53,54 @@ class MilvusCondition(Condition):
         return " ".join((self._key, self._op, self._value))
 
 
+class MilvusTuning(NamedTuple):
+    search_params: Dict[str, Any]
+    recall: float  # the mean recall@k against the exact search of the collection
+    latency: float  # the mean milliseconds of a query
+
+
 class Milvus(VectorStore[T]):
-    def __init__(self, name: str, milvus_uri: str=None, milvus_token: str=None) -> None:
+    # the default index and search parameters of each index type
+    _index_defaults = {
+        "FLAT": ({}, {}),
+        "IVF_FLAT": ({"nlist": 1024}, {"nprobe": 10}),
+        "IVF_SQ8": ({"nlist": 1024}, {"nprobe": 10}),
+        "IVF_PQ": ({"nlist": 1024, "nbits": 8}, {"nprobe": 10}),
+        "HNSW": ({"M": 16, "efConstruction": 200}, {"ef": 64}),
+        "DISKANN": ({}, {"search_list": 100}),
+        "AUTOINDEX": ({}, {}),
+    }
+    # the search parameter trading the latency for the recall of each index type
+    _search_knobs = {
+        "IVF_FLAT": "nprobe",
+        "IVF_SQ8": "nprobe",
+        "IVF_PQ": "nprobe",
+        "HNSW": "ef",
+        "DISKANN": "search_list",
+    }
+
+    def __init__(
+        self,
+        name: str,
+        milvus_uri: str=None,
+        milvus_token: str=None,
+        embedder: Optional[Embedder] = None,
+        index_type: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        r"""
+        Initializes a Milvus vector store.
+
+        Args:
+            name: the name of the collection.
+            milvus_uri: the uri of the Milvus server.
+            milvus_token: the token of the Milvus server.
+            embedder: the embedder of the texts and queries.
+            index_type: the type of the index built on a new collection, e.g. IVF_FLAT, IVF_PQ, HNSW or DISKANN.
+            index_params: the parameters of the index, defaults to the ones of the index type.
+            search_params: the parameters of the search, defaults to the ones of the index type.
+        """
         self.name = name
         self.milvus_uri = milvus_uri if milvus_uri else settings.milvus_uri
         self.milvus_token = milvus_token if milvus_token else settings.milvus_token
@@ -51,12 +108,29 @@ class Milvus(VectorStore[T]):
         self._fields: List[str] = []
         self._alias = "default"
         self._batch_size = 1000
-        self._vectorizer = EmbedOpenAI(batch_size=self._batch_size)
+        self._vectorizer = embedder if embedder is not None else AutoEmbedder()
         self._primary_field = "_pk"
         self._embedding_field = "_embedding"
         self._data_field = "_data"
-        self._index_params = {"metric_type": "L2", "index_type": "IVF_FLAT", "params": {"nlist": 1024}}
-        self._search_params = {"metric_type": "L2", "params": {"nprobe": 10}}
+        self._serializer = get_serializer(settings.serializer)
+        self._set_params(
+            index_type if index_type else settings.milvus_index_type,
+            index_params if index_params is not None else settings.milvus_index_params,
+            search_params if search_params is not None else settings.milvus_search_params,
+        )
+
+    def _set_params(
+        self, index_type: str, index_params: Optional[Dict[str, Any]], search_params: Optional[Dict[str, Any]]
+    ) -> None:
+        index_type = index_type.upper()
+        if index_type not in self._index_defaults:
+            raise ValueError("Index type should be one of {}.".format(list(self._index_defaults.keys())))
+
+        default_index_params, default_search_params = self._index_defaults[index_type]
+        index_params = index_params if index_params is not None else default_index_params
+        search_params = search_params if search_params is not None else default_search_params
+        self._index_params = {"metric_type": "L2", "index_type": index_type, "params": dict(index_params)}
+        self._search_params = {"metric_type": "L2", "params": dict(search_params)}
 
     def _check_connection(self, conn: "Connections") -> None:
         if not conn.has_connection(self._alias):
@@ -66,7 +140,7 @@ class Milvus(VectorStore[T]):
         fields = [
             FieldSchema(name=self._primary_field, dtype=DataType.INT64, is_primary=True, auto_id=True),
             FieldSchema(name=self._embedding_field, dtype=DataType.FLOAT_VECTOR, dim=len(embedding)),
-            FieldSchema(name=self._data_field, dtype=DataType.VARCHAR, max_length=2048),
+            FieldSchema(name=self._data_field, dtype=DataType.VARCHAR, max_length=65535),
         ]
 
         for key, value in example.model_dump().items():
@@ -82,7 +156,14 @@ class Milvus(VectorStore[T]):
 
     def _create_index(self) -> None:
         if len(self.store.indexes) == 0:
-            self.store.create_index(field_name=self._embedding_field, index_params=self._index_params)
+            index_params = dict(self._index_params, params=dict(self._index_params["params"]))
+            params = index_params["params"]
+            if index_params["index_type"] == "IVF_PQ" and "m" not in params:
+                dim = next(f.params["dim"] for f in self.store.schema.fields if f.name == self._embedding_field)
+                # the number of sub-vectors should divide the dimension
+                params["m"] = max(m for m in range(1, min(64, max(dim // 4, 1)) + 1) if dim % m == 0)
+
+            self.store.create_index(field_name=self._embedding_field, index_params=index_params)
 
     def _extract_fields(self) -> None:
         if len(self._fields) == 0:
@@ -127,15 +208,19 @@ class Milvus(VectorStore[T]):
         milvus.insert(texts, data)
         return milvus
 
-    def insert(self, texts: Sequence[str], data: Sequence[T]) -> None:
-        embeddings = self._vectorizer.batch_embed(texts)
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
+        if embeddings is None:
+            embeddings = self._vectorizer.batch_embed(texts)
+
         if self.store is None:
             self._init(embedding=embeddings[0], example=data[0])
 
         insert_dict = defaultdict(list)
         for embedding, example in zip(embeddings, data):
             insert_dict[self._embedding_field].append(embedding)
-            insert_dict[self._data_field].append(base64.b64encode(pickle.dumps(example)).decode("ascii"))
+            insert_dict[self._data_field].append(self._serializer.dumps(example))
             for key, value in example.model_dump().items():
                 insert_dict[key].append(value)
 
@@ -150,10 +235,27 @@ class Milvus(VectorStore[T]):
     def search(
         self, query: str, top_k: Optional[int] = 4, condition: Optional["MilvusCondition"] = None
     ) -> List[Tuple[T, float]]:
+        return self._search_by_embeddings(self._vectorizer.batch_embed([query]), top_k, condition)[0]
+
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["MilvusCondition"] = None
+    ) -> List[Tuple[T, float]]:
+        # the client of pymilvus is blocking, thus only the query embedding is awaited natively
+        query_embeddings = await self._vectorizer.abatch_embed([query])
+        return (await asyncio.to_thread(self._search_by_embeddings, query_embeddings, top_k, condition))[0]
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["MilvusCondition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        return self._search_by_embeddings(self._vectorizer.batch_embed(queries), top_k, condition)
+
+    def _search_by_embeddings(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int, condition: Optional["MilvusCondition"]
+    ) -> List[List[Tuple[T, float]]]:
         self._try_init_and_check_exists()
 
         result: "SearchResult" = self.store.search(
-            data=self._vectorizer.batch_embed([query]),
+            data=query_embeddings,
             anns_field=self._embedding_field,
             param=self._search_params,
             limit=top_k,
@@ -162,12 +264,205 @@ class Milvus(VectorStore[T]):
         )
 
         ret = []
-        for hit in result[0]:
-            example = pickle.loads(base64.b64decode(hit.entity.get(self._data_field)))
-            ret.append((example, hit.score))
+        for hits in result:  # the hits of each query
+            ret.append([(deserialize(hit.entity.get(self._data_field)), hit.score) for hit in hits])
 
         return ret
 
+    def rebuild_index(
+        self,
+        index_type: str,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        r"""
+        Replaces the index of the collection, e.g. with the parameters fitting its current size.
+
+        Args:
+            index_type: the type of the new index.
+            index_params: the parameters of the index, defaults to the ones of the index type.
+            search_params: the parameters of the search, defaults to the ones of the index type.
+        """
+        self._try_init_and_check_exists()
+        self._set_params(index_type, index_params, search_params)
+        self.store.release()
+        self.store.drop_index()
+        self._create_index()
+        self.store.load()
+
+    def _get_index_params(self) -> Dict[str, Any]:
+        index_params = dict(self.store.indexes[0].params)
+        if isinstance(index_params.get("params"), str):  # serialized by some versions of pymilvus
+            index_params["params"] = json.loads(index_params["params"])
+
+        return index_params
+
+    def _sample_rows(self, sample_size: int) -> Tuple[List[int], List[Sequence[float]]]:
+        r"""
+        Samples the rows uniformly across the collection, by the reservoir sampling over the ids read in batches,
+        then queries the embeddings of the sampled rows.
+        """
+        rng = random.Random(0)
+        sampled_ids: List[int] = []
+        num_rows = 0
+        iterator = self.store.query_iterator(
+            batch_size=self._batch_size,
+            expr="{} >= 0".format(self._primary_field),
+            output_fields=[self._primary_field],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if len(rows) == 0:
+                    break
+
+                for row in rows:
+                    if len(sampled_ids) < sample_size:
+                        sampled_ids.append(row[self._primary_field])
+                    else:
+                        i = rng.randrange(num_rows + 1)
+                        if i < sample_size:
+                            sampled_ids[i] = row[self._primary_field]
+
+                    num_rows += 1
+        finally:
+            iterator.close()
+
+        if len(sampled_ids) == 0:
+            return [], []
+
+        rows = self.store.query(
+            expr="{} in {}".format(self._primary_field, sampled_ids),
+            output_fields=[self._primary_field, self._embedding_field],
+            limit=len(sampled_ids),
+        )
+        embeddings = {row[self._primary_field]: row[self._embedding_field] for row in rows}
+        sampled_ids = [pk for pk in sampled_ids if pk in embeddings]  # deleted in the meantime
+        return sampled_ids, [embeddings[pk] for pk in sampled_ids]
+
+    def _search_ids(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int, params: Dict[str, Any]
+    ) -> List[List[int]]:
+        result: "SearchResult" = self.store.search(
+            data=query_embeddings,
+            anns_field=self._embedding_field,
+            param={"metric_type": "L2", "params": params},
+            limit=top_k,
+        )
+        return [[hit.id for hit in hits] for hits in result]
+
+    def _exact_search_ids(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int, held_out_ids: Sequence[int]
+    ) -> List[List[int]]:
+        r"""
+        Searches the exact neighbors by the brute force over the embeddings of the collection, read in batches,
+        the held-out id of each query is excluded from its neighbors.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        held_out = np.asarray(held_out_ids, dtype=np.int64)[:, None]
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_dists = np.empty((len(queries), 0), dtype=np.float32)
+        iterator = self.store.query_iterator(
+            batch_size=self._batch_size,
+            expr="{} >= 0".format(self._primary_field),
+            output_fields=[self._primary_field, self._embedding_field],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if len(rows) == 0:
+                    break
+
+                ids = np.asarray([row[self._primary_field] for row in rows], dtype=np.int64)
+                embeddings = np.asarray([row[self._embedding_field] for row in rows], dtype=np.float32)
+                dists = (
+                    np.square(queries).sum(axis=1)[:, None]
+                    - 2 * queries @ embeddings.T
+                    + np.square(embeddings).sum(axis=1)[None, :]
+                )
+                dists[ids[None, :] == held_out] = np.inf
+                ids = np.concatenate([best_ids, np.broadcast_to(ids, dists.shape)], axis=1)
+                dists = np.concatenate([best_dists, dists], axis=1)
+                order = np.argsort(dists, axis=1, kind="stable")[:, :top_k]
+                best_ids = np.take_along_axis(ids, order, axis=1)
+                best_dists = np.take_along_axis(dists, order, axis=1)
+        finally:
+            iterator.close()
+
+        return [[int(i) for i, dist in zip(ids, dists) if dist < np.inf] for ids, dists in zip(best_ids, best_dists)]
+
+    def tune(
+        self,
+        queries: Optional[Sequence[str]] = None,
+        top_k: Optional[int] = 10,
+        target_recall: Optional[float] = 0.95,
+        sample_size: Optional[int] = 100,
+    ) -> MilvusTuning:
+        r"""
+        Tunes the search parameter of the index for the target recall with the lowest latency.
+
+        The queries are searched with the increasing values of the parameter (nprobe, ef or search_list), until
+        the recall@k against the exact search reaches the target, the exact neighbors are computed by the brute
+        force over the collection, thus the recall includes the quantization error of IVF_SQ8 and IVF_PQ.
+
+        Args:
+            queries: the query texts, defaults to the embeddings sampled from the collection, which are held out
+                from their own neighbors.
+            top_k: the number of results of the recall.
+            target_recall: the min recall@k.
+            sample_size: the number of embeddings sampled if the queries are not given.
+
+        Returns:
+            tuning: the selected search parameters with their recall and latency, used by the following searches.
+        """
+        if not is_numpy_available():
+            raise ImportError("Please install numpy to tune the index.")
+
+        self._try_init_and_check_exists()
+        index_params = self._get_index_params()
+        index_type = index_params["index_type"]
+        if index_type not in self._search_knobs:
+            raise ValueError("Index {} has no search parameter to tune.".format(index_type))
+
+        if queries is not None:
+            query_embeddings = self._vectorizer.batch_embed(queries)
+            held_out_ids = [-1] * len(query_embeddings)  # the auto ids are never negative
+        else:
+            held_out_ids, query_embeddings = self._sample_rows(sample_size)
+
+        if len(query_embeddings) == 0:
+            raise ValueError("Index {} is empty.".format(self.name))
+
+        knob = self._search_knobs[index_type]
+        if knob == "nprobe":
+            nlist = index_params["params"]["nlist"]  # all the clusters are probed
+            values = [2**i for i in range(nlist.bit_length()) if 2**i < nlist] + [nlist]
+        else:
+            # the candidate list holds the hits and the query itself
+            values = sorted(set([top_k + 1] + [2**i for i in range(4, 12) if 2**i > top_k + 1]))
+
+        exact_ids = self._exact_search_ids(query_embeddings, top_k, held_out_ids)
+        tuning = None
+        for value in values:
+            params = {knob: value}
+            hit_ids = []
+            start_time = time.perf_counter()
+            for embedding, held_out_id in zip(query_embeddings, held_out_ids):
+                # one more hit is searched in place of the query itself
+                ids = self._search_ids([embedding], top_k + 1, params)[0]
+                hit_ids.append([i for i in ids if i != held_out_id][:top_k])
+
+            latency = (time.perf_counter() - start_time) / len(query_embeddings) * 1000
+            recalls = [len(set(ids) & set(exact)) / max(len(exact), 1) for ids, exact in zip(hit_ids, exact_ids)]
+            recall = sum(recalls) / len(recalls)
+            tuning = MilvusTuning(search_params=params, recall=recall, latency=latency)
+            logger.info("{}={}: recall@{} {:.4f}, latency {:.2f} ms".format(knob, value, top_k, recall, latency))
+            if recall >= target_recall:
+                break
+
+        self._search_params = {"metric_type": "L2", "params": tuning.search_params}
+        return tuning
+
     def exists(self) -> bool:
         try:
             self._try_init_and_check_exists()
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from enum import IntEnum, unique
 from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
@@ -73,13 +74,16 @@ class VectorStore(Generic[T], ABC):
         ...
 
     @abstractmethod
-    def insert(self, texts: Sequence[str], data: Sequence[T]) -> None:
+    def insert(
+        self, texts: Sequence[str], data: Sequence[T], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> None:
         r"""
         Inserts data with embeddings into the vector store.
 
         Args:
             texts: the texts to embed.
             data: the data dict of the texts.
+            embeddings: the precomputed embeddings (vectors or a float32 matrix), the texts are embedded if not given.
         """
         ...
 
@@ -110,6 +114,44 @@ class VectorStore(Generic[T], ABC):
         """
         ...
 
+    async def asearch(
+        self, query: str, top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[Tuple[T, float]]:
+        r"""
+        Performs a search on an embedding without blocking the event loop, runs `search` in a thread by default.
+
+        Args:
+            query: the query text being searched.
+            top_k: the number of results to return.
+            condition: the conditional expression.
+
+        Returns:
+            hits_with_scores: the hit results with scores (smaller is better).
+        """
+        return await asyncio.to_thread(self.search, query, top_k, condition)
+
+    async def aclose(self) -> None:
+        r"""
+        Closes the async connections of the vectorstore, the ones of a previous event loop are closed on that loop.
+        """
+        return None
+
+    def batch_search(
+        self, queries: Sequence[str], top_k: Optional[int] = 4, condition: Optional["Condition"] = None
+    ) -> List[List[Tuple[T, float]]]:
+        r"""
+        Performs a search on the embeddings of multiple queries, searches them one by one by default.
+
+        Args:
+            queries: the query texts being searched.
+            top_k: the number of results to return for each query.
+            condition: the conditional expression shared by the queries.
+
+        Returns:
+            batch_hits_with_scores: the hit results with scores of each query (smaller is better).
+        """
+        return [self.search(query, top_k, condition) for query in queries]
+
     @abstractmethod
     def exists(self) -> bool:
         r"""
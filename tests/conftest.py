@@ -0,0 +1,5 @@
+import os
+import sys
+
+
+sys.path.insert(0, os.path.dirname(__file__))  # the shared fakes in tests/fakes.py
@@ -0,0 +1,24 @@
+from typing import Dict, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from cardinal.model.schema import Embedder
+
+
+class Animal(BaseModel):
+    name: str
+    legs: int = 4
+
+
+class FakeEmbedder(Embedder):
+    r"""
+    Embeds the texts by the table, or by their lengths if not in the table, and records the calls.
+    """
+
+    def __init__(self, table: Optional[Dict[str, List[float]]] = None) -> None:
+        self.table = table if table is not None else {}
+        self.calls: List[Sequence[str]] = []
+
+    def batch_embed(self, texts: Sequence[str]) -> List[List[float]]:
+        self.calls.append(texts)
+        return [self.table.get(text, [float(len(text)), 0.0]) for text in texts]
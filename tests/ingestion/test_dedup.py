@@ -0,0 +1,33 @@
+from cardinal.ingestion import Deduplicator
+
+
+text = (
+    "The document presents FastEdit, a repository aimed at efficiently injecting "
+    "fresh and customized knowledge into large language models using a single command."
+)
+
+
+def test_deduplicator():
+    deduplicator = Deduplicator()
+    assert(deduplicator.add(text))
+    assert(not deduplicator.add("  " + text.upper() + "\n"))
+    assert(deduplicator.add(text.replace("FastEdit", "FastEditor")))
+    assert(deduplicator.stats().num_exact == 1)
+
+
+def test_deduplicator_near_duplicate():
+    deduplicator = Deduplicator(near_duplicate=True)
+    assert(deduplicator.add(text))
+    assert(not deduplicator.add(text.replace("FastEdit", "FastEditor")))
+    assert(deduplicator.add("It also includes a case study on editing language models and outlines future goals."))
+    assert(deduplicator.stats().num_near == 1)
+
+
+def test_deduplicator_entries():
+    deduplicator = Deduplicator(near_duplicate=True)
+    assert(deduplicator.add(text))
+    resumed = Deduplicator(near_duplicate=True)
+    resumed.load_entries(deduplicator.dump_entries([text]))
+    assert(not resumed.add(text.upper()))
+    assert(not resumed.add(text.replace("FastEdit", "FastEditor")))
+    assert(resumed.stats().num_chunks == 2)
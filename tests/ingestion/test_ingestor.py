@@ -0,0 +1,146 @@
+from typing import List, Optional
+
+import pytest
+from fakes import Animal, FakeEmbedder
+
+from cardinal.ingestion import Deduplicator, Ingestor, Manifest
+from cardinal.storage.schema import Storage
+from cardinal.vectorstore.schema import VectorStore
+
+
+class LineSplitter:
+    def split_file(self, path) -> List[str]:
+        with open(path, encoding="utf-8") as f:
+            return [line for line in f.read().split("\n") if line]
+
+
+class FakeVectorStore(VectorStore[Animal]):
+    def __init__(self, name: str, fail_at: Optional[int] = None) -> None:
+        self.name = name
+        self.texts: List[str] = []
+        self.data: List[Animal] = []
+        self.embeddings: List[List[float]] = []
+        self._num_inserts = 0
+        self._fail_at = fail_at
+
+    @classmethod
+    def create(cls, name, texts, data, drop_old=False):
+        vectorstore = cls(name)
+        vectorstore.insert(texts, data)
+        return vectorstore
+
+    def insert(self, texts, data, embeddings=None) -> None:
+        self._num_inserts += 1
+        if self._num_inserts == self._fail_at:
+            raise RuntimeError("The writer crashed.")
+
+        self.texts.extend(texts)
+        self.data.extend(data)
+        self.embeddings.extend(embeddings)
+
+    def delete(self, condition) -> None:
+        pass
+
+    def search(self, query, top_k=4, condition=None):
+        return []
+
+    def exists(self) -> bool:
+        return len(self.texts) > 0
+
+    def destroy(self) -> None:
+        self.texts, self.data, self.embeddings = [], [], []
+
+
+class FakeStorage(Storage[Animal]):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.values = {}
+
+    def insert(self, keys, values) -> None:
+        self.values.update(zip(keys, values))
+
+    def delete(self, key) -> None:
+        self.values.pop(key, None)
+
+    def query(self, key):
+        return self.values.get(key)
+
+    def search(self, query, top_k=10):
+        return []
+
+    def exists(self) -> bool:
+        return len(self.values) > 0
+
+    def destroy(self) -> None:
+        self.values = {}
+
+    def unique_get(self) -> int:
+        return 0
+
+    def unique_incr(self) -> None:
+        pass
+
+    def unique_reset(self) -> None:
+        pass
+
+
+def get_ingestor(
+    vectorstore: FakeVectorStore,
+    manifest: Manifest,
+    storage: Optional[FakeStorage] = None,
+    embedder: Optional[FakeEmbedder] = None,
+) -> Ingestor[Animal]:
+    return Ingestor(
+        vectorstore=vectorstore,
+        build_index=lambda text: Animal(name=text),
+        storage=storage,
+        build_document=lambda text, index: (text, Animal(name=index.name, legs=len(text))),
+        splitter=LineSplitter(),
+        embedder=embedder if embedder is not None else FakeEmbedder(),
+        batch_size=2,
+        num_split_workers=2,
+        manifest=manifest,
+        deduplicator=Deduplicator(),
+    )
+
+
+def write_files(tmp_path) -> list:
+    paths = [tmp_path / "a.txt", tmp_path / "b.txt"]
+    paths[0].write_text("alpha\none\nalpha\nbeta\ntwo\nalpha", encoding="utf-8")
+    paths[1].write_text("gamma\nthree\none", encoding="utf-8")
+    return paths
+
+
+def test_ingestor_resume(tmp_path):
+    paths = write_files(tmp_path)
+    crashed = FakeVectorStore("test", fail_at=2)
+    with pytest.raises(RuntimeError):
+        get_ingestor(crashed, Manifest(tmp_path / "manifest.db")).ingest(paths)
+
+    resumed = FakeVectorStore("test")
+    get_ingestor(resumed, Manifest(tmp_path / "manifest.db")).ingest(paths)
+    written = crashed.texts + resumed.texts  # the repeats within a file are written once, before or after the crash
+    assert(sorted(written) == ["alpha", "beta", "gamma", "one", "three", "two"])
+
+
+def test_ingestor(tmp_path):
+    paths = write_files(tmp_path)
+    vectorstore, storage, embedder = FakeVectorStore("test"), FakeStorage("test"), FakeEmbedder()
+    stats = get_ingestor(vectorstore, Manifest(tmp_path / "manifest.db"), storage, embedder).ingest(paths)
+    unique_texts = ["alpha", "beta", "gamma", "one", "three", "two"]
+    assert([stage_stats.name for stage_stats in stats] == ["split", "dedup", "batch", "embed", "write"])
+    assert(stats[-1].num_units == 6)
+    assert(sorted(vectorstore.texts) == unique_texts)
+    assert([example.name for example in vectorstore.data] == vectorstore.texts)
+    assert(vectorstore.embeddings == [[float(len(text)), 0.0] for text in vectorstore.texts])
+    assert(storage.query("three") == Animal(name="three", legs=5))
+    assert(sorted(storage.values.keys()) == unique_texts)
+
+    paths.append(tmp_path / "c.txt")
+    paths[-1].write_text("alpha\nfour", encoding="utf-8")
+    resumed = FakeVectorStore("test")
+    embedder.calls.clear()
+    get_ingestor(resumed, Manifest(tmp_path / "manifest.db"), storage, embedder).ingest(paths)
+    assert(resumed.texts == ["four"])  # the written files are skipped and the written chunks are still deduplicated
+    assert([text for texts in embedder.calls for text in texts] == ["four"])
+    assert(sorted(storage.values.keys()) == sorted(unique_texts + ["four"]))
@@ -0,0 +1,27 @@
+from cardinal.ingestion import Deduplicator, Manifest
+
+
+def test_manifest(tmp_path):
+    manifest = Manifest(tmp_path / "manifest.db")
+    assert(manifest.begin_file(b"file", "file.txt", [b"a", b"b"]) == set())
+    manifest.commit([(b"file", b"a")])
+    assert(not manifest.is_done(b"file"))
+    manifest.close()
+
+    manifest = Manifest(tmp_path / "manifest.db")  # resumes from the last commit
+    assert(manifest.begin_file(b"file", "file.txt", [b"a", b"b"]) == {b"a"})
+    manifest.commit([(b"file", b"b")])
+    assert(manifest.is_done(b"file"))
+
+
+def test_manifest_dedup(tmp_path):
+    deduplicator = Deduplicator(near_duplicate=True)
+    assert(deduplicator.add("I am alice."))
+    manifest = Manifest(tmp_path / "manifest.db")
+    manifest.begin_file(b"file", "file.txt", [b"a"])
+    manifest.commit([(b"file", b"a")], deduplicator.dump_entries(["I am alice."]))
+    manifest.close()
+
+    deduplicator = Deduplicator(near_duplicate=True)  # resumes from the last commit
+    deduplicator.load_entries(Manifest(tmp_path / "manifest.db").dedup_entries())
+    assert(not deduplicator.add("i am  Alice."))
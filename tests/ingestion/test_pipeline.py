@@ -0,0 +1,25 @@
+import pytest
+
+from cardinal.ingestion import Pipeline, Stage
+
+
+def test_pipeline():
+    results = []
+    stages = [
+        Stage("double", lambda x: [x, x], num_workers=2),
+        Stage("square", lambda x: [x * x], num_workers=3),
+        Stage("collect", results.append),
+    ]
+    stats = Pipeline(stages, queue_size=2).run(range(100))
+    assert(sorted(results) == sorted([i * i for i in range(100)] * 2))
+    assert([stage_stats.num_items for stage_stats in stats] == [100, 200, 200])
+
+
+def test_pipeline_error():
+    def fail(x):
+        if x == 50:
+            raise ValueError("bad item")
+        return [x]
+
+    with pytest.raises(ValueError):
+        Pipeline([Stage("fail", fail), Stage("sink", lambda x: None)], queue_size=1).run(range(1000))
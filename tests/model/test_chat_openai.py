@@ -1,3 +1,5 @@
+import asyncio
+
 from cardinal.common import HumanMessage
 from cardinal.model import ChatOpenAI
 
@@ -6,4 +8,9 @@ def test_chat_openai():
     chat_openai = ChatOpenAI()
     messages = [HumanMessage(content="Say 'This is a test.'")]
     assert(chat_openai.chat(messages) == 'This is a test.')
-    
\ No newline at end of file
+    
+
+def test_achat_openai():
+    chat_openai = ChatOpenAI()
+    messages = [HumanMessage(content="Say 'This is a test.'")]
+    assert(asyncio.run(chat_openai.achat(messages)) == 'This is a test.')
@@ -0,0 +1,19 @@
+from cardinal.common import AssistantMessage, HumanMessage, SystemMessage, Template
+from cardinal.model import ContextPacker, TokenCounter
+
+
+def test_context_packer():
+    counter = TokenCounter()
+    history = []
+    for i in range(10):
+        history += [HumanMessage(content="question {} ".format(i) * 5), AssistantMessage(content="answer. " * 20)]
+
+    messages = [SystemMessage(content="You are helpful.")] + history + [HumanMessage(content="What is it?")]
+    documents = ["It is a test. " * 10, "It is a very long test. " * 200]
+    packer = ContextPacker(max_tokens=300, counter=counter)
+    packed_prompt = packer.pack(messages, documents, Template("{context}\n\n{query}"))
+    num_tokens = 3 + sum(4 + counter(message.content) for message in packed_prompt.messages)
+    assert(num_tokens <= 300)
+    assert(packed_prompt.num_documents == 2 and packed_prompt.truncated)
+    assert(packed_prompt.messages[0] == messages[0])
+    assert(packed_prompt.messages[-1].content.endswith("What is it?"))
@@ -0,0 +1,12 @@
+from cardinal.model.embed_cache import EmbedCache
+
+
+def test_embed_cache(tmp_path):
+    cache = EmbedCache(maxsize=2, path=str(tmp_path / "embed_cache.db"))
+    keys = [EmbedCache.key("model", text) for text in ["a", "b", "c"]]
+    assert(cache.get_many(keys) == [None, None, None])
+    cache.put_many([(keys[0], [0.5, 1.0]), (keys[1], [0.25, 2.0]), (keys[2], [1.0, 0.0])])
+    assert(cache.get_many(keys[:1])[0].tolist() == [0.5, 1.0])  # evicted from memory, found on disk
+    assert(cache.info().disk_hits == 1)
+    results = EmbedCache(maxsize=0, path=str(tmp_path / "embed_cache.db")).get_many(keys[1:])
+    assert([result.tolist() for result in results] == [[0.25, 2.0], [1.0, 0.0]])
@@ -0,0 +1,34 @@
+import pytest
+
+import cardinal.model.embed_local as embed_local_module
+from cardinal.model import EmbedLocal
+
+
+np = pytest.importorskip("numpy")  # required by the local embedding models
+
+
+def test_embed_local():
+    pytest.importorskip("sentence_transformers")
+    embed_local = EmbedLocal()
+    embeddings = embed_local.batch_embed(["This is a test", "dog", "a" * 100])
+    assert(len(embeddings) == 3)
+    assert(abs(sum(value * value for value in embeddings[0]) - 1.0) < 1e-4)
+
+
+class StubSentenceTransformer:
+    def __init__(self, name: str, device: str) -> None:
+        self.batches = []
+
+    def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings, show_progress_bar):
+        self.batches.append(texts)
+        return np.array([[float(len(text)), 0.0] for text in texts], dtype=np.float64)
+
+
+def test_embed_local_stub(monkeypatch):
+    monkeypatch.setattr(embed_local_module, "is_sentence_transformers_available", lambda: True)
+    monkeypatch.setattr(embed_local_module, "SentenceTransformer", StubSentenceTransformer, raising=False)
+    embed_local = EmbedLocal(batch_size=2, backend="sentence_transformers", num_workers=2, as_numpy=False)
+    texts = ["a" * 5, "a", "a" * 3, "a" * 2, "a" * 4]
+    assert(embed_local.batch_embed(texts) == [[float(len(text)), 0.0] for text in texts])
+    assert(sorted(map(tuple, embed_local._model.batches)) == [("a", "aa"), ("aaa", "aaaa"), ("aaaaa",)])
+    assert(embed_local.batch_embed([]) == [])
@@ -1,7 +1,129 @@
+import asyncio
+import random
+from types import SimpleNamespace
+
+import pytest
+from openai import RateLimitError
+
+import cardinal.model.embed_openai as embed_openai_module
 from cardinal.model import EmbedOpenAI
+from cardinal.model.embed_openai import _AdaptiveLimiter, pack_by_tokens
 
 
 def test_embed_openai():
     embed_openai = EmbedOpenAI()
     assert(embed_openai.batch_embed(["This is a test"]) is not None)
-    
\ No newline at end of file
+
+
+def test_aembed_openai():
+    embed_openai = EmbedOpenAI()
+    assert(len(asyncio.run(embed_openai.abatch_embed(["This is a test", "This is another test"]))) == 2)
+
+
+def test_pack_by_tokens():
+    assert(pack_by_tokens([5, 5, 5, 20, 1, 1], max_tokens=10, max_items=2) == [(0, 2), (2, 3), (3, 4), (4, 6)])
+
+
+class FakeRateLimitError(RateLimitError):
+    def __init__(self) -> None:
+        Exception.__init__(self, "Rate limited")  # without the http response
+
+
+def test_adaptive_limiter():
+    limiter = _AdaptiveLimiter(8)
+    with pytest.raises(RateLimitError):
+        with limiter.slot():
+            raise FakeRateLimitError()
+
+    assert(limiter._limit == 4.0)  # halved
+    with limiter.slot():
+        pass
+
+    assert(limiter._limit == 4.25)  # increased by 1 / limit
+    for _ in range(100):
+        with limiter.slot():
+            pass
+
+    assert(limiter._limit == 8.0)  # never exceeds the max concurrency
+    assert(limiter._in_flight == 0)
+
+
+def test_adaptive_limiter_async():
+    limiter = _AdaptiveLimiter(4)
+    in_flight, max_in_flight = 0, 0
+
+    async def request(rate_limited: bool) -> None:
+        nonlocal in_flight, max_in_flight
+        async with limiter.aslot():
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if rate_limited:
+                raise FakeRateLimitError()
+
+    async def main() -> None:
+        await asyncio.gather(*[request(rate_limited=False) for _ in range(16)])
+        assert(max_in_flight == 4)
+        results = await asyncio.gather(*[request(rate_limited=True) for _ in range(4)], return_exceptions=True)
+        assert(all(isinstance(result, RateLimitError) for result in results))
+
+    asyncio.run(main())
+    assert(limiter._limit == 1.0)  # halved by each of the rate limit errors
+    assert(limiter._in_flight == 0)
+
+
+def test_pack_by_tokens_budget():
+    assert(pack_by_tokens([3, 3, 3, 3], max_tokens=6, max_items=100) == [(0, 2), (2, 4)])
+    assert(pack_by_tokens([3, 30, 3], max_tokens=6, max_items=100) == [(0, 1), (1, 2), (2, 3)])
+    assert(pack_by_tokens([], max_tokens=6, max_items=100) == [])
+
+
+class FakeEmbeddings:
+    def __init__(self) -> None:
+        self.in_flight, self.max_in_flight = 0, 0
+
+    async def create(self, input, model):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(random.random() * 0.01)  # the responses arrive out of order
+        self.in_flight -= 1
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text))]) for text in input])
+
+
+def test_aembed_openai_order(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    client = SimpleNamespace(embeddings=FakeEmbeddings())
+    monkeypatch.setattr(embed_openai_module, "get_async_client", lambda max_retries, timeout: client)
+    embed_openai = EmbedOpenAI(batch_size=2, cache_size=0, cache_path=None, concurrency=3, max_tokens_per_request=0)
+    texts = ["a" * i for i in range(1, 41)]
+    embeddings = asyncio.run(embed_openai.abatch_embed(texts))
+    assert(embeddings == [[float(i)] for i in range(1, 41)])
+    assert(client.embeddings.max_in_flight == 3)
+
+
+class FakeSyncEmbeddings:
+    def __init__(self) -> None:
+        self.inputs = []
+
+    def create(self, input, model):
+        self.inputs.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text))]) for text in input])
+
+
+def test_embed_openai_oversized(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    texts = ["short", "word " * 20, "tiny"]
+    for oversized in ["truncate", "split"]:  # without a token budget of requests by default
+        embed_openai = EmbedOpenAI(batch_size=2, cache_size=0, cache_path=None, max_tokens_per_input=8, oversized=oversized)
+        embed_openai._client = SimpleNamespace(embeddings=FakeSyncEmbeddings())
+        embeddings = embed_openai.batch_embed(texts)
+        inputs = embed_openai._client.embeddings.inputs
+        assert(all(len(batch) <= 2 for batch in inputs))
+        assert(all(embed_openai._get_counter()(text) <= 8 for batch in inputs for text in batch))
+        assert(embeddings[0] == [5.0] and embeddings[2] == [4.0])
+        if oversized == "truncate":
+            assert(sum(len(batch) for batch in inputs) == 3)
+        else:
+            assert(sum(len(batch) for batch in inputs) > 3)
+            assert(embeddings[1] == [1.0])  # the normalized average of the pieces
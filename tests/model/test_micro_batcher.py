@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes import FakeEmbedder
+
+from cardinal.model import MicroBatcher
+
+
+def test_micro_batcher():
+    embedder = FakeEmbedder()
+    batcher = MicroBatcher(embedder, max_wait=0.05, max_batch_size=64)
+    queries = ["q" * (i % 10 + 1) for i in range(40)]
+    with ThreadPoolExecutor(max_workers=40) as executor:
+        results = list(executor.map(lambda query: batcher.batch_embed([query]), queries))
+
+    assert(results == [[[float(len(query)), 0.0]] for query in queries])
+    assert(len(embedder.calls) < len(queries))
+    assert(sum(len(texts) for texts in embedder.calls) <= 10 * len(embedder.calls))  # deduplicated
+
+
+def test_micro_batcher_async():
+    embedder = FakeEmbedder()
+    batcher = MicroBatcher(embedder, max_wait=0.05, max_batch_size=4)
+
+    async def embed_all():
+        return await asyncio.gather(*[batcher.abatch_embed([str(i)]) for i in range(8)])
+
+    assert(asyncio.run(embed_all()) == [[[1.0, 0.0]]] * 8)
+    assert(batcher.batch_embed(["a", "b", "c", "d"]) == [[1.0, 0.0]] * 4)  # not batched
+    assert(len(embedder.calls) < 8)
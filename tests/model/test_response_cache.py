@@ -0,0 +1,96 @@
+import asyncio
+
+from cardinal.common import HumanMessage
+from cardinal.model import ResponseCache
+from cardinal.model.response_cache import CachedResponse, replay_stream
+from cardinal.storage.schema import Storage
+from cardinal.vectorstore.schema import VectorStore
+
+
+def test_response_cache():
+    cache = ResponseCache(name="test_response_cache", ttl=3600)
+    messages = [HumanMessage(content="What is the capital of France?")]
+    assert(cache.lookup("gpt-3.5-turbo", messages) is None)
+    cache.put("gpt-3.5-turbo", messages, "Paris.")
+    assert(cache.lookup("gpt-3.5-turbo", messages) == "Paris.")
+    assert(cache.lookup("gpt-3.5-turbo", messages, temperature=0.5) is None)
+    cache.invalidate("gpt-3.5-turbo", messages)
+    assert(cache.lookup("gpt-3.5-turbo", messages) is None)
+    cache.clear()
+
+
+def test_replay_stream():
+    assert(list(replay_stream("Paris is the capital.")) == ["Paris", " is", " the", " capital."])
+
+
+class FakeStorage(Storage[CachedResponse]):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.database = {}
+
+    def insert(self, keys, values) -> None:
+        self.database.update(zip(keys, values))
+
+    def delete(self, key: str) -> None:
+        self.database.pop(key, None)
+
+    def query(self, key: str):
+        return self.database.get(key)
+
+    def search(self, query: str, top_k=10):
+        return []
+
+    def exists(self) -> bool:
+        return len(self.database) > 0
+
+    def destroy(self) -> None:
+        self.database.clear()
+
+    def unique_get(self) -> int:
+        return 0
+
+    def unique_incr(self) -> None:
+        pass
+
+    def unique_reset(self) -> None:
+        pass
+
+
+class FakeVectorStore(VectorStore[CachedResponse]):
+    def __init__(self, name: str) -> None:
+        self.searches = 0
+
+    @classmethod
+    def create(cls, name, texts, data, drop_old=False):
+        return cls(name)
+
+    def insert(self, texts, data, embeddings=None) -> None:
+        pass
+
+    def delete(self, condition) -> None:
+        pass
+
+    def search(self, query: str, top_k=4, condition=None):
+        self.searches += 1
+        return []
+
+    def exists(self) -> bool:
+        return False
+
+    def destroy(self) -> None:
+        pass
+
+
+def test_response_cache_restart():
+    storage, vectorstore = FakeStorage("test"), FakeVectorStore("test")
+    messages = [HumanMessage(content="What is the capital of France?")]
+    ResponseCache(name="test", vectorstore=vectorstore, storage=storage).put("gpt-3.5-turbo", messages, "Paris.")
+    cache = ResponseCache(name="test", vectorstore=vectorstore, storage=storage)  # a fresh instance
+    assert(cache.lookup("gpt-3.5-turbo", messages) == "Paris.")
+    assert(cache.info().exact_hits == 1)
+    async_cache = ResponseCache(name="test", vectorstore=vectorstore, storage=storage)
+    assert(asyncio.run(async_cache.alookup("gpt-3.5-turbo", messages)) == "Paris.")
+    assert(async_cache.info().exact_hits == 1)
+    assert(vectorstore.searches == 0)  # found by the exact key before the semantic search
+    cache.invalidate("gpt-3.5-turbo", messages)
+    assert(ResponseCache(name="test", vectorstore=vectorstore, storage=storage).lookup("gpt-3.5-turbo", messages) is None)
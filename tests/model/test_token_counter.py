@@ -1,6 +1,29 @@
-from cardinal.model import TokenCounter
+from cardinal.model import TokenCounter, TokenEstimator
 
 
 def test_token_counter():
     counter = TokenCounter()
     assert(counter("This is a test") == 4)
+
+
+def test_token_counter_count_many():
+    counter = TokenCounter()
+    texts = ["This is a test", "This is another test", ""]
+    assert(counter.count_many(texts) == [counter(text) for text in texts])
+
+
+def test_token_counter_cache():
+    counter = TokenCounter(cache_size=16)
+    assert(counter("This is a test") == 4)
+    assert(counter.count_many(["This is a test", "This is a test"]) == [4, 4])
+    assert(counter.cache_info().hits >= 2)
+
+
+def test_token_estimator():
+    counter = TokenCounter()
+    estimator = TokenEstimator(counter)
+    samples = ["This is a test sentence number {}. ".format(i) * 8 for i in range(16)]
+    error = estimator.calibrate(samples)
+    assert(estimator.calibrated)
+    assert(error < 0.2)
+    assert(abs(estimator(samples[0]) - counter(samples[0])) <= 0.2 * counter(samples[0]))
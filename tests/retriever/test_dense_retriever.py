@@ -1,3 +1,5 @@
+import asyncio
+
 from pydantic import BaseModel
 from cardinal.vectorstore import AutoVectorStore
 from cardinal.retriever import DenseRetriever
@@ -14,5 +16,6 @@ def test_dense_retriever():
     vectorStore = AutoVectorStore[Animal].create(name="test", texts=texts, data=data, drop_old=True)
     retriever = DenseRetriever[Animal](vectorstore_name="test", verbose=True)
     assert(retriever.retrieve(query="dog", top_k=1) == [data[1]])
+    assert(asyncio.run(retriever.aretrieve(query="dog", top_k=1)) == [data[1]])
     vectorStore.destroy()
     
\ No newline at end of file
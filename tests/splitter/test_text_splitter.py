@@ -1,4 +1,6 @@
-from cardinal.splitter import CJKTextSplitter
+import random
+
+from cardinal.splitter import CJKTextSplitter, TextSplitter
 
 
 def test_text_splitter():
@@ -12,4 +14,122 @@ def test_text_splitter():
         "and outlines future implementation goals."
     )
     texts = splitter.split(text)
-    assert(len(texts) == 3)
\ No newline at end of file
+    assert(len(texts) == 3)
+
+def test_text_splitter_chunk_size():
+    splitter = CJKTextSplitter(chunk_size=30, chunk_overlap=10, count_separators=True)
+    text = " ".join(["The document presents FastEdit, a repository for model editing."] * 20)
+    texts = splitter.split(text)
+    assert(all(splitter._count(text) <= 30 for text in texts))
+
+
+def test_text_splitter_offsets():
+    splitter = TextSplitter(chunk_size=30, chunk_overlap=10)
+    text = "\n\n".join(["The document presents FastEdit, a repository for model editing."] * 10)
+    offsets = splitter.split_offsets(text)
+    assert([text[start:end] for start, end in offsets] == splitter.split(text))
+
+
+def test_text_splitter_stream():
+    splitter = CJKTextSplitter(chunk_size=30, chunk_overlap=10)
+    text = "\n\n".join(["The document presents FastEdit, a repository for model editing."] * 50)
+    pieces = [text[i : i + 100] for i in range(0, len(text), 100)]
+    assert(list(splitter.split_stream(pieces, window_size=500)) == splitter.split(text))
+
+
+def test_cjk_text_splitter():
+    splitter = CJKTextSplitter(chunk_size=30, chunk_overlap=0)
+    text = "我们提出了一个新的方法。它可以高效地编辑大语言模型中的知识！你想试试吗？“当然。”\n\n" * 5
+    offsets = splitter.split_offsets(text)
+    assert(all(text[end - 1] in "。！？”" for _, end in offsets))
+
+
+def test_cjk_text_splitter_normalize():
+    splitter = CJKTextSplitter(chunk_size=30, chunk_overlap=0)
+    text = "我们提出了一个新的方法。\n\n\n\n它可以高效地编辑知识，     你想试试吗？\n\n" * 20
+    normalized = text.replace("\n\n\n\n", "\n").replace("     ", " ").rstrip()
+    texts = splitter.split(text)
+    assert(all("\n\n\n" not in text and "   " not in text for text in texts))
+    assert([normalized[start:end] for start, end in splitter.split_offsets(text)] == texts)
+    pieces = [text[i : i + 50] for i in range(0, len(text), 50)]
+    assert(list(splitter.split_stream(pieces, window_size=200)) == texts)
+
+
+def test_text_splitter_approximate():
+    splitter = TextSplitter(chunk_size=30, chunk_overlap=10, approximate=True, count_separators=True)
+    text = " ".join(["The document presents FastEdit, a repository for model editing."] * 20)
+    texts = splitter.split(text)
+    assert(all(splitter._count(text) <= 30 for text in texts))
+
+
+class LegacyTextSplitter(TextSplitter):
+    r"""
+    The text splitter before the character offsets and the incremental counting, it re-counts the joined text
+    for every split and every pop.
+    """
+
+    @staticmethod
+    def _join_docs(docs, separator):
+        return separator.join(docs).strip()
+
+    def _merge(self, splits, separator):
+        merged_docs = []
+        inprocess_docs = []
+        for split in splits:
+            text = self._join_docs(inprocess_docs, separator)
+            if self._count(text + split) > self._chunk_size:
+                if len(inprocess_docs) > 0:
+                    merged_docs.append(text)
+
+                    if self._chunk_overlap == 0:
+                        inprocess_docs = []
+                    else:
+                        while self._count(text) > self._chunk_overlap:
+                            inprocess_docs.pop(0)
+                            text = self._join_docs(inprocess_docs, separator)
+
+            inprocess_docs.append(split)
+
+        if len(inprocess_docs) > 0:
+            text = self._join_docs(inprocess_docs, separator)
+            merged_docs.append(text)
+
+        return merged_docs
+
+    def split(self, text):
+        return self._legacy_split(text, self._separators)
+
+    def _legacy_split(self, text, separators):
+        separators = separators[:]
+        separator = separators.pop(0)
+        splits = [split for split in (text.split(separator) if separator else list(text)) if split]
+        final_chunks = []
+        good_splits = []
+        for split in splits:
+            if self._count(split) < self._chunk_size:
+                good_splits.append(split)
+            else:
+                if good_splits:
+                    final_chunks.extend(self._merge(good_splits, separator))
+                    good_splits = []
+                if not separators:
+                    final_chunks.append(split)
+                else:
+                    final_chunks.extend(self._legacy_split(split, separators))
+
+        if good_splits:
+            final_chunks.extend(self._merge(good_splits, separator))
+        return final_chunks
+
+
+def test_text_splitter_legacy_merge():
+    rng = random.Random(0)
+    syllables = ["the", "ment", "ing", "tion", "in", "ter", "na", "al", "iz", "a", "re", "un", "de", "4", "2"]
+    for chunk_size, chunk_overlap in [(12, 0), (12, 4), (30, 10)]:
+        splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        legacy_splitter = LegacyTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        for _ in range(40):
+            words = ["".join(rng.choices(syllables, k=rng.choice([1, 2, 3, 30]))) for _ in range(60)]
+            text = "".join(word + rng.choice([" ", " ", ", ", ". ", "\n", "\n\n", "\n  ", " \n"]) for word in words)
+            assert(splitter.split(text) == legacy_splitter.split(text))
+
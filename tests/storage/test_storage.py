@@ -1,3 +1,5 @@
+import asyncio
+
 from pydantic import BaseModel
 from cardinal.storage import AutoStorage
 
@@ -16,6 +18,7 @@ def test_storage():
     storage.insert(keys=["doc1", "doc2"], values=[doc1, doc2])
     assert(storage.exists())  # True
     assert(storage.query("doc1") == doc1)  # content='I am alice.' title='test'
+    assert(asyncio.run(storage.aquery("doc2")) == doc2)  # content='I am bob.' title='test'
     storage.delete("doc1")
     assert(storage.query("doc1") is None)  # None
     storage.unique_reset()
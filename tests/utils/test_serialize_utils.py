@@ -0,0 +1,68 @@
+import base64
+import pickle
+import sys
+
+import pytest
+from pydantic import BaseModel
+
+from cardinal.utils import serialize_utils
+from cardinal.utils.serialize_utils import deserialize, get_serializer, register_model
+
+
+class Document(BaseModel):
+    doc_id: str
+    content: str
+    index: int = 0
+
+
+doc = Document(doc_id="doc1", content="I am alice. 我是爱丽丝。", index=3)
+
+
+def test_serialize():
+    payload = get_serializer("json").dumps(doc)
+    assert(payload.startswith("j|"))
+    assert(deserialize(payload) == doc)
+    assert(deserialize(payload.encode("utf-8")) == doc)
+    assert(len(payload) < len(get_serializer("pickle").dumps(doc)))
+
+
+def test_deserialize_legacy():
+    assert(deserialize(base64.b64encode(pickle.dumps(doc)).decode("ascii")) == doc)  # the vector stores
+    assert(deserialize(pickle.dumps(doc)) == doc)  # the redis storage
+    assert(deserialize(get_serializer("pickle").dumps(doc)) == doc)
+
+
+class MainDocument(BaseModel):
+    content: str
+
+
+MainDocument.__module__ = "__main__"  # defined in a script
+
+
+def test_deserialize_unregistered(monkeypatch):
+    payload = get_serializer("json").dumps(doc)
+    monkeypatch.delitem(serialize_utils._models, payload.split("|")[1])
+    assert(deserialize(payload) == doc)  # found among the models defined in this process
+    with pytest.raises(ValueError):
+        deserialize('j|cardinal_missing_module:Document|{"content": "I am alice."}')
+
+    assert("cardinal_missing_module" not in sys.modules)  # never imported
+    with pytest.raises(ValueError):
+        deserialize("j|subprocess:Popen|{}")  # not a model
+
+    with pytest.raises(TypeError):
+        register_model(dict)
+
+
+def test_serialize_unimportable(monkeypatch):
+    class LocalDocument(BaseModel):
+        content: str
+
+    with pytest.raises(ValueError):
+        get_serializer("json").dumps(LocalDocument(content="I am alice."))
+
+    monkeypatch.setattr(sys.modules["__main__"], "MainDocument", MainDocument, raising=False)
+    main_doc = MainDocument(content="I am alice.")
+    payload = get_serializer("json").dumps(main_doc)
+    assert(not payload.startswith("j|"))  # falls back to pickle
+    assert(deserialize(payload) == main_doc)
@@ -0,0 +1,117 @@
+import asyncio
+import math
+
+import pytest
+from fakes import Animal, FakeEmbedder
+
+import cardinal.vectorstore.elasticsearch as elasticsearch_module
+from cardinal.utils.serialize_utils import get_serializer
+from cardinal.vectorstore.elasticsearch import Elasticsearch, ESCondition
+from cardinal.vectorstore.schema import Operator
+
+
+class StubIndices:
+    def exists(self, index: str) -> bool:
+        return True
+
+
+class StubES:
+    def __init__(self, responses) -> None:
+        self.indices = StubIndices()
+        self.responses = responses
+        self.searches = None
+
+    def msearch(self, searches):
+        self.searches = searches
+        return {"responses": self.responses}
+
+
+def get_hits(*scores: float):
+    serializer = get_serializer("json")
+    hits = [{"_source": {"_data": serializer.dumps(Animal(name=str(score)))}, "_score": score} for score in scores]
+    return {"hits": {"hits": hits}}
+
+
+def get_elasticsearch(knn: bool, responses=None) -> Elasticsearch[Animal]:
+    es = Elasticsearch[Animal](name="test", embedder=FakeEmbedder())
+    es._knn = knn
+    es._num_candidates = 100
+    es.store = StubES(responses)
+    return es
+
+
+def test_elasticsearch_knn_query():
+    es = get_elasticsearch(knn=True)
+    condition = ESCondition(key="name", value="dog", op=Operator.Eq)
+    query = es._build_search_query([1.0, 0.0], top_k=4, condition=condition)
+    assert(list(query.keys()) == ["knn"])  # the filter is applied inside the knn search
+    assert(query["knn"]["k"] == 4)
+    assert(query["knn"]["num_candidates"] == 100)
+    assert(query["knn"]["filter"] == {"term": {"name": "dog"}})
+    assert(es._build_search_query([1.0, 0.0], top_k=500)["knn"]["num_candidates"] == 500)
+    assert("filter" not in es._build_search_query([1.0, 0.0], top_k=4)["knn"])
+
+
+def test_elasticsearch_script_query():
+    es = get_elasticsearch(knn=False)
+    query = es._build_search_query([1.0, 0.0], top_k=4)
+    assert("knn" not in query)
+    assert(query["query"]["script_score"]["script"]["params"]["query_vector"] == [1.0, 0.0])
+    assert(query["sort"] == [{"_score": {"order": "asc"}}])
+    condition = ESCondition(key="name", value="dog", op=Operator.Eq)
+    query = es._build_search_query([1.0, 0.0], top_k=4, condition=condition)
+    assert(query["query"]["bool"]["must"][0] == {"term": {"name": "dog"}})
+    assert(get_elasticsearch(knn=False)._parse_hits(get_hits(2.5))[0][1] == 2.5)  # the L2 distance of the script
+
+
+def test_elasticsearch_score():
+    es = get_elasticsearch(knn=True)
+    hits = es._parse_hits(get_hits(1.0, 0.2, 0.5))
+    assert([example.name for example, _ in hits] == ["1.0", "0.2", "0.5"])
+    assert(hits[0][1] == 0.0)  # the exact match
+    assert(math.isclose(hits[1][1], 2.0))  # 1 / (1 + 2^2) = 0.2
+    assert(math.isclose(hits[2][1], 1.0))
+
+
+def test_elasticsearch_batch_search():
+    es = get_elasticsearch(knn=True, responses=[get_hits(1.0), get_hits(0.5)])
+    results = es.batch_search(["dog", "llama"], top_k=1)
+    assert([[example.name for example, _ in hits] for hits in results] == [["1.0"], ["0.5"]])
+    assert(es.store.searches[0] == {"index": "test"})
+    assert(es.store.searches[1]["size"] == 1)
+    assert(es.store.searches[3]["knn"]["query_vector"] == [5.0, 0.0])
+    es = get_elasticsearch(knn=True, responses=[get_hits(1.0), {"error": {"type": "search_phase_execution_exception"}}])
+    with pytest.raises(Exception, match="Search failed"):
+        es.batch_search(["dog", "llama"], top_k=1)
+
+
+class StubAsyncES:
+    def __init__(self, hosts) -> None:
+        self.closed = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_elasticsearch_aclose(monkeypatch):
+    monkeypatch.setattr(elasticsearch_module, "AsyncElasticsearch", StubAsyncES, raising=False)
+    es = get_elasticsearch(knn=True)
+
+    async def get_store() -> StubAsyncES:
+        return es._get_async_store()
+
+    loop = asyncio.new_event_loop()
+    store = loop.run_until_complete(get_store())
+    new_store = asyncio.run(get_store())  # the loop changes
+    loop.run_until_complete(asyncio.sleep(0))
+    assert(store.closed)  # closed on its own loop
+    assert(not new_store.closed)
+    loop.close()
+
+    async def get_and_close() -> StubAsyncES:
+        store = es._get_async_store()
+        await es.aclose()
+        return store
+
+    assert(asyncio.run(get_and_close()).closed)
+    assert(es._async_store is None)
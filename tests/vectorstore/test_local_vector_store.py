@@ -0,0 +1,28 @@
+from fakes import Animal, FakeEmbedder
+
+from cardinal.vectorstore.local import LocalCondition, LocalVectorStore
+from cardinal.vectorstore.schema import Operator
+
+
+table = {"dog": [1.0, 0.0], "llama": [0.0, 1.0], "puppy": [0.9, 0.1], "bird": [0.5, 0.5]}
+texts = ["dog", "llama", "puppy", "bird"]
+data = [Animal(name=text, legs=2 if text == "bird" else 4) for text in texts]
+
+
+def test_local_vector_store(tmp_path):
+    vectorstore = LocalVectorStore[Animal](name="test", local_path=str(tmp_path), embedder=FakeEmbedder(table))
+    assert(not vectorstore.exists())  # False
+    vectorstore.insert(texts=texts, data=data)
+    vectorstore.delete(LocalCondition(key="name", value="dog", op=Operator.Eq))
+    vectorstore.flush()
+    assert(vectorstore.search(query="dog", top_k=2)[0][0] == data[2])
+    assert(vectorstore.search(query="dog", top_k=2)[1][0] == data[3])
+    batch_hits = vectorstore.batch_search(queries=["dog", "llama"], top_k=1)
+    assert([hits[0][0] for hits in batch_hits] == [data[2], data[1]])
+    condition = LocalCondition(key="legs", value=4, op=Operator.Eq)
+    assert(vectorstore.search(query="bird", top_k=1, condition=condition)[0][0] == data[2])
+    reopened = LocalVectorStore[Animal](name="test", local_path=str(tmp_path), embedder=FakeEmbedder(table))
+    assert(reopened.exists())  # True
+    assert(len(reopened.search(query="dog", top_k=4)) == 3)
+    reopened.destroy()
+    assert(not reopened.exists())  # False
@@ -0,0 +1,141 @@
+import json
+import random
+from typing import List
+
+import pytest
+from fakes import Animal, FakeEmbedder
+
+from cardinal.vectorstore.milvus import Milvus
+
+
+class FakeHit:
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+
+class FakeField:
+    def __init__(self, name: str, dim: int) -> None:
+        self.name = name
+        self.params = {"dim": dim}
+
+
+class FakeIndex:
+    def __init__(self, params) -> None:
+        self.params = params
+
+
+class FakeIterator:
+    def __init__(self, rows, batch_size: int) -> None:
+        self._batches = [rows[i : i + batch_size] for i in range(0, len(rows), batch_size)] + [[]]
+        self.closed = False
+
+    def next(self):
+        return self._batches.pop(0)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeCollection:
+    r"""
+    Searches the rows whose id is less than the search parameter, thus the index is exact for the large values.
+    """
+
+    def __init__(self, embeddings: List[List[float]], index_type: str, index_params) -> None:
+        self.rows = [{"_pk": i, "_embedding": embedding} for i, embedding in enumerate(embeddings)]
+        self.schema = type("Schema", (), {"fields": [FakeField("_embedding", len(embeddings[0]))]})
+        self.indexes = [FakeIndex({"index_type": index_type, "metric_type": "L2", "params": index_params})]
+        self.calls = []
+        self.iterators = []
+        self.max_id = len(self.rows)
+
+    def query(self, expr, output_fields, limit):
+        ids = set(json.loads(expr.split(" in ")[1]))
+        return [{field: row[field] for field in output_fields} for row in self.rows if row["_pk"] in ids][:limit]
+
+    def query_iterator(self, batch_size, expr, output_fields):
+        self.iterators.append(FakeIterator(self.rows, batch_size))
+        return self.iterators[-1]
+
+    def search(self, data, anns_field, param, limit):
+        (value,) = param["params"].values()
+        rows = [row for row in self.rows if row["_pk"] < min(value * 8, self.max_id)]
+        ret = []
+        for query in data:
+            dists = [sum((a - b) ** 2 for a, b in zip(query, row["_embedding"])) for row in rows]
+            order = sorted(range(len(rows)), key=lambda i: dists[i])[:limit]
+            ret.append([FakeHit(rows[i]["_pk"]) for i in order])
+
+        return ret
+
+    def release(self) -> None:
+        self.calls.append("release")
+
+    def drop_index(self) -> None:
+        self.calls.append("drop_index")
+        self.indexes = []
+
+    def create_index(self, field_name, index_params) -> None:
+        self.calls.append("create_index")
+        self.indexes = [FakeIndex(index_params)]
+
+    def load(self) -> None:
+        self.calls.append("load")
+
+
+def get_milvus(index_type: str, index_params, num_rows: int = 64) -> Milvus[Animal]:
+    rng = random.Random(0)
+    milvus = Milvus[Animal](name="test", embedder=FakeEmbedder(), index_type=index_type)
+    milvus.store = FakeCollection([[rng.random(), rng.random()] for _ in range(num_rows)], index_type, index_params)
+    return milvus
+
+
+def test_milvus_index_defaults():
+    for index_type, knob in Milvus._search_knobs.items():
+        assert(knob in Milvus._index_defaults[index_type][1])
+
+    milvus = Milvus[Animal](name="test", embedder=FakeEmbedder(), index_type="hnsw")
+    assert(milvus._index_params == {"metric_type": "L2", "index_type": "HNSW", "params": {"M": 16, "efConstruction": 200}})
+    assert(milvus._search_params == {"metric_type": "L2", "params": {"ef": 64}})
+    with pytest.raises(ValueError):
+        Milvus[Animal](name="test", embedder=FakeEmbedder(), index_type="ANNOY")
+
+
+def test_milvus_rebuild_index():
+    milvus = get_milvus("IVF_FLAT", {"nlist": 1024})
+    milvus.rebuild_index("IVF_PQ", index_params={"nlist": 8, "nbits": 8}, search_params={"nprobe": 4})
+    assert(milvus.store.calls == ["release", "drop_index", "create_index", "load"])
+    assert(milvus._get_index_params() == {"metric_type": "L2", "index_type": "IVF_PQ", "params": {"nlist": 8, "nbits": 8, "m": 1}})
+    assert(milvus._search_params == {"metric_type": "L2", "params": {"nprobe": 4}})
+    assert(milvus._index_params["params"] == {"nlist": 8, "nbits": 8})  # not mutated by the default of m
+
+
+def test_milvus_tune():
+    milvus = get_milvus("IVF_FLAT", {"nlist": 8})
+    tuning = milvus.tune(top_k=5, target_recall=0.95, sample_size=10)
+    assert(tuning.search_params == {"nprobe": 8})
+    assert(tuning.recall == 1.0)  # the sampled queries are held out from their own neighbors
+    assert(milvus._search_params == {"metric_type": "L2", "params": {"nprobe": 8}})
+    assert(all(iterator.closed for iterator in milvus.store.iterators))
+    tuning = milvus.tune(queries=["dog"], top_k=5, target_recall=0.0)
+    assert(tuning.search_params == {"nprobe": 1})
+
+
+def test_milvus_sample_rows():
+    milvus = get_milvus("IVF_FLAT", {"nlist": 8}, num_rows=1000)
+    ids, embeddings = milvus._sample_rows(10)
+    assert(len(set(ids)) == 10)
+    assert(max(ids) >= 500)  # not biased toward the earliest inserts
+    assert(embeddings == [milvus.store.rows[i]["_embedding"] for i in ids])
+    assert(all(iterator.closed for iterator in milvus.store.iterators))
+    assert(len(get_milvus("IVF_FLAT", {"nlist": 8}, num_rows=4)._sample_rows(10)[0]) == 4)
+
+
+def test_milvus_tune_exact():
+    milvus = get_milvus("HNSW", {"M": 16, "efConstruction": 200})
+    milvus.store.max_id = 32  # the index misses half of the rows at any ef
+    tuning = milvus.tune(top_k=5, target_recall=0.95, sample_size=10)
+    assert(tuning.search_params == {"ef": 2048})
+    assert(tuning.recall < 0.95)
+    with pytest.raises(ValueError):
+        get_milvus("FLAT", {}).tune()
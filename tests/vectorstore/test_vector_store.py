@@ -18,6 +18,7 @@ def test_vector_store():
     vectorstore.flush()
     assert(vectorstore.search(query="dog", top_k=2)[0][0] == data[2])
     assert(vectorstore.search(query="dog", top_k=2)[1][0] == data[1])
+    assert(vectorstore.batch_search(queries=["dog", "llama"], top_k=1)[1][0][0] == data[1])
     # [(Animal(name='puppy'), 0.8510237336158752), (Animal(name='llama'), 1.1970627307891846)]
     assert(vectorstore.exists())  # True
     vectorstore.destroy()